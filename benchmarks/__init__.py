@@ -0,0 +1 @@
+# Operation benchmarks: synthetic corpus generator (corpus) and runner (run)
@@ -0,0 +1,262 @@
+"""
+Deterministic synthetic input corpus for the operation benchmarks.
+
+The same seed always produces byte-identical images and PDFs, so timings from
+different commits are measured on the same inputs. Videos are rendered by the
+ffmpeg binary with bit-exact flags and are stable for a given ffmpeg version.
+
+Usage: python -m benchmarks.corpus --out benchmarks/corpus [--quick]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+SEED = 1729
+
+# (name, width, height); quick mode keeps only the first entry of each list
+IMAGE_SIZES = [('small', 640, 480), ('hd', 1920, 1080), ('large', 4000, 3000)]
+IMAGE_MODES = ['RGB', 'RGBA', 'L', 'P']
+PDF_PAGE_COUNTS = [1, 10, 100, 500]
+LOCKED_PDF_PASSWORD = 'benchmark'
+VIDEO_SIZES = [('360p', 640, 360), ('720p', 1280, 720)]
+VIDEO_FORMATS = {
+    'mp4': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac'],
+    'mov': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac'],
+    'mkv': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac'],
+    'ts': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac'],
+    'webm': ['-c:v', 'libvpx-vp9', '-b:v', '1M', '-c:a', 'libopus']
+}
+
+def _rng(*parts) -> random.Random:
+    # One independent stream per fixture, so adding fixtures never shifts existing ones
+    return random.Random(f"{SEED}:" + ':'.join(str(part) for part in parts))
+
+def _pattern_image(width: int, height: int, rng: random.Random):
+    """Gradients, shapes and noise: compressible areas next to detailed ones, like photos"""
+    from PIL import Image, ImageDraw
+    
+    image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(width // 4 + 1), y0 + rng.randrange(height // 4 + 1)
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        if rng.random() < 0.5:
+            draw.rectangle([x0, y0, x1, y1], fill=color)
+        else:
+            draw.ellipse([x0, y0, x1, y1], fill=color)
+    
+    # Noise over the bottom third
+    noise_height = height // 3
+    noise = Image.frombytes('RGB', (width, noise_height), rng.randbytes(width * noise_height * 3))
+    image.paste(noise, (0, height - noise_height))
+    return image
+
+def generate_images(out_dir: str, quick: bool = False) -> list:
+    """JPEG, PNG, WebP and SVG inputs for the image operations"""
+    from PIL import Image
+    
+    fixtures = []
+    sizes = IMAGE_SIZES[:1] if quick else IMAGE_SIZES
+    modes = IMAGE_MODES[:1] if quick else IMAGE_MODES
+    
+    for size_name, width, height in sizes:
+        base = _pattern_image(width, height, _rng('image', size_name))
+        for mode in modes:
+            image = base.convert(mode) if mode != 'P' else base.quantize(256)
+            stem = f"{size_name}_{mode.lower()}"
+            
+            # JPEG and WebP cannot hold every mode; they get the RGB variant only
+            targets = [('png', 'PNG', {'optimize': False})]
+            if mode in ('RGB', 'L'):
+                targets.append(('jpg', 'JPEG', {'quality': 90}))
+            if mode in ('RGB', 'RGBA'):
+                targets.append(('webp', 'WEBP', {'quality': 90}))
+            
+            for ext, fmt, options in targets:
+                path = os.path.join(out_dir, f"{stem}.{ext}")
+                image.save(path, fmt, **options)
+                fixtures.append(_fixture(path, 'image', ext, width=width, height=height, mode=mode))
+    
+    for size_name, width, height in sizes:
+        path = os.path.join(out_dir, f"{size_name}.svg")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(_svg(width, height, _rng('svg', size_name)))
+        fixtures.append(_fixture(path, 'image', 'svg', width=width, height=height))
+    
+    # HEIF needs the pillow-heif plugin to write; skipped without it
+    try:
+        import pillow_heif
+        pillow_heif.register_heif_opener()
+        size_name, width, height = sizes[0]
+        path = os.path.join(out_dir, f"{size_name}.heic")
+        _pattern_image(width, height, _rng('heic', size_name)).save(path, 'HEIF', quality=90)
+        fixtures.append(_fixture(path, 'image', 'heic', width=width, height=height))
+    except ImportError:
+        logger.warning("pillow-heif not installed, skipping HEIC fixtures")
+    
+    return fixtures
+
+def _svg(width: int, height: int, rng: random.Random) -> str:
+    shapes = []
+    for _ in range(200):
+        color = f"#{rng.randrange(0x1000000):06x}"
+        shapes.append(
+            f'<circle cx="{rng.randrange(width)}" cy="{rng.randrange(height)}" '
+            f'r="{rng.randrange(5, 80)}" fill="{color}" fill-opacity="0.6"/>'
+        )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">\n' + '\n'.join(shapes) + '\n</svg>\n'
+    )
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud"
+).split()
+
+def generate_pdfs(out_dir: str, quick: bool = False) -> list:
+    """Text PDFs with an embedded image every few pages, plus a locked copy and a Word file"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+    
+    fixtures = []
+    page_counts = PDF_PAGE_COUNTS[:2] if quick else PDF_PAGE_COUNTS
+    page_width, page_height = A4
+    picture = ImageReader(_pattern_image(800, 600, _rng('pdf-image')))
+    
+    for pages in page_counts:
+        rng = _rng('pdf', pages)
+        path = os.path.join(out_dir, f"text_{pages}p.pdf")
+        # invariant=1 drops timestamps and ids, so the bytes depend on the seed only
+        pdf = canvas.Canvas(path, pagesize=A4, invariant=1)
+        for page in range(pages):
+            y = page_height - 60
+            # Every fourth page opens with a picture, the rest is text
+            if page % 4 == 0:
+                pdf.drawImage(picture, 50, y - 300, width=400, height=300)
+                y -= 320
+            pdf.setFont('Helvetica', 10)
+            while y > 60:
+                pdf.drawString(50, y, ' '.join(rng.choice(WORDS) for _ in range(14)))
+                y -= 14
+            pdf.showPage()
+        pdf.save()
+        fixtures.append(_fixture(path, 'pdf', 'pdf', pages=pages))
+    
+    # unlock_pdf needs an encrypted input
+    try:
+        import PyPDF2
+        source = fixtures[0]['path']
+        reader = PyPDF2.PdfReader(source)
+        writer = PyPDF2.PdfWriter()
+        for page in reader.pages:
+            writer.add_page(page)
+        writer.encrypt(LOCKED_PDF_PASSWORD)
+        path = os.path.join(out_dir, f"locked_{len(reader.pages)}p.pdf")
+        with open(path, 'wb') as f:
+            writer.write(f)
+        fixtures.append(_fixture(path, 'pdf', 'pdf', pages=len(reader.pages), locked=True))
+    except ImportError:
+        logger.warning("PyPDF2 not installed, skipping the locked PDF fixture")
+    
+    try:
+        import docx
+        document = docx.Document()
+        rng = _rng('docx')
+        for _ in range(200):
+            document.add_paragraph(' '.join(rng.choice(WORDS) for _ in range(40)))
+        path = os.path.join(out_dir, "document.docx")
+        document.save(path)
+        fixtures.append(_fixture(path, 'document', 'docx'))
+    except ImportError:
+        logger.warning("python-docx not installed, skipping the Word fixture")
+    
+    return fixtures
+
+def generate_videos(out_dir: str, quick: bool = False, duration: int = 3) -> list:
+    """Short test-pattern clips with a sine tone, rendered by the ffmpeg binary"""
+    if not shutil.which('ffmpeg'):
+        logger.warning("ffmpeg not found on PATH, skipping video fixtures")
+        return []
+    
+    fixtures = []
+    sizes = VIDEO_SIZES[:1] if quick else VIDEO_SIZES
+    formats = {'mp4': VIDEO_FORMATS['mp4']} if quick else VIDEO_FORMATS
+    
+    for size_name, width, height in sizes:
+        for ext, codec_args in formats.items():
+            path = os.path.join(out_dir, f"{size_name}.{ext}")
+            _ffmpeg([
+                '-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate=25:duration={duration}",
+                '-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration}",
+                *codec_args, '-shortest', path
+            ])
+            fixtures.append(_fixture(path, 'video', ext, width=width, height=height, duration=duration))
+        
+        path = os.path.join(out_dir, f"{size_name}.gif")
+        _ffmpeg([
+            '-f', 'lavfi', '-i', f"testsrc2=size={width // 2}x{height // 2}:rate=10:duration={duration}", path
+        ])
+        fixtures.append(_fixture(path, 'video', 'gif', width=width // 2, height=height // 2, duration=duration))
+    
+    return fixtures
+
+def _ffmpeg(args: list):
+    # args ends with the output path; bit-exact flags keep encoder versions out of the file
+    *options, output = args
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', *options, '-map_metadata', '-1',
+         '-fflags', '+bitexact', '-flags:v', '+bitexact', '-flags:a', '+bitexact', output],
+        check=True, timeout=300
+    )
+
+def _fixture(path: str, kind: str, ext: str, **params) -> dict:
+    return {
+        'name': os.path.basename(path),
+        'path': path,
+        'kind': kind,
+        'ext': ext,
+        'bytes': os.path.getsize(path),
+        'params': params
+    }
+
+def generate_corpus(out_dir: str, quick: bool = False) -> list:
+    """Build every fixture family whose dependencies are installed and write manifest.json"""
+    fixtures = []
+    for family, generate in (('images', generate_images), ('pdf', generate_pdfs), ('videos', generate_videos)):
+        family_dir = os.path.join(out_dir, family)
+        os.makedirs(family_dir, exist_ok=True)
+        try:
+            fixtures.extend(generate(family_dir, quick=quick))
+        except ImportError as e:
+            logger.warning(f"Skipping {family} fixtures: {e}")
+    
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'seed': SEED, 'quick': quick, 'fixtures': fixtures}, f, indent=2)
+    logger.info(f"Generated {len(fixtures)} fixtures in {out_dir}")
+    return fixtures
+
+def load_manifest(corpus_dir: str) -> list:
+    with open(os.path.join(corpus_dir, 'manifest.json'), encoding='utf-8') as f:
+        return json.load(f)['fixtures']
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the benchmark input corpus")
+    parser.add_argument('--out', default=os.path.join('benchmarks', 'corpus'), help="Output directory")
+    parser.add_argument('--quick', action='store_true', help="Smallest fixture of each family only")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    generate_corpus(args.out, quick=args.quick)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Benchmark runner: times every exported operation on the synthetic corpus.
+
+Each (operation, fixture) pair runs in its own interpreter (benchmarks.worker)
+and records wall time, CPU time, peak RSS and output size. Results are
+written as JSON and can be compared against a saved baseline.
+
+Usage:
+    python -m benchmarks.corpus --out benchmarks/corpus
+    python -m benchmarks.run --corpus benchmarks/corpus --output results.json
+    python -m benchmarks.run --output new.json --baseline results.json --tolerance 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+from .corpus import LOCKED_PDF_PASSWORD, load_manifest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# inputs: extensions a fixture may have; output: extension, 'same' as the input, or 'dir'
+Case = namedtuple('Case', 'package function inputs output kwargs copies locked', defaults=({}, 1, False))
+
+CASES = [
+    Case('images', 'convert_jpg_to_png', ('jpg',), 'png'),
+    Case('images', 'convert_png_to_jpg', ('png',), 'jpg'),
+    Case('images', 'convert_jpg_to_webp', ('jpg',), 'webp'),
+    Case('images', 'convert_webp_to_jpg', ('webp',), 'jpg'),
+    Case('images', 'convert_svg_to_png', ('svg',), 'png'),
+    Case('images', 'compress_image', ('jpg', 'png', 'webp'), 'same'),
+    Case('images', 'convert_hevc_to_jpg', ('heic',), 'jpg'),
+    Case('images', 'convert_jpg_to_hevc', ('jpg',), 'heic'),
+    
+    Case('pdf', 'merge_pdfs', ('pdf',), 'pdf', copies=2),
+    Case('pdf', 'convert_pdf_to_images', ('pdf',), 'dir'),
+    Case('pdf', 'convert_image_to_pdf', ('jpg',), 'pdf'),
+    Case('pdf', 'convert_images_to_pdf', ('jpg',), 'pdf', copies=3),
+    Case('pdf', 'compress_pdf', ('pdf',), 'pdf'),
+    Case('pdf', 'lock_pdf', ('pdf',), 'pdf', {'password': LOCKED_PDF_PASSWORD}),
+    Case('pdf', 'unlock_pdf', ('pdf',), 'pdf', {'password': LOCKED_PDF_PASSWORD}, locked=True),
+    Case('pdf', 'add_page_numbers', ('pdf',), 'pdf'),
+    Case('pdf', 'delete_pdf_page', ('pdf',), 'pdf', {'page_number': 1}),
+    Case('pdf', 'rotate_pdf', ('pdf',), 'pdf'),
+    Case('pdf', 'convert_word_to_pdf', ('docx',), 'pdf'),
+    Case('pdf', 'convert_pdf_to_word', ('pdf',), 'docx'),
+    
+    Case('videos', 'convert_mp4_to_mov', ('mp4',), 'mov'),
+    Case('videos', 'convert_mov_to_mp4', ('mov',), 'mp4'),
+    Case('videos', 'convert_ts_to_mp4', ('ts',), 'mp4'),
+    Case('videos', 'convert_mp4_to_ts', ('mp4',), 'ts'),
+    Case('videos', 'convert_mkv_to_mp4', ('mkv',), 'mp4'),
+    Case('videos', 'convert_mp4_to_mkv', ('mp4',), 'mkv'),
+    Case('videos', 'convert_webm_to_mp4', ('webm',), 'mp4'),
+    Case('videos', 'convert_mp4_to_webm', ('mp4',), 'webm'),
+    Case('videos', 'compress_video', ('mp4',), 'mp4'),
+    Case('videos', 'convert_gif_to_mp4', ('gif',), 'mp4'),
+    Case('videos', 'convert_gif_to_webm', ('gif',), 'webm'),
+    Case('videos', 'convert_mp4_to_gif', ('mp4',), 'gif'),
+    Case('videos', 'convert_mov_to_gif', ('mov',), 'gif'),
+    Case('videos', 'convert_webm_to_gif', ('webm',), 'gif')
+]
+
+# Measurements compared against the baseline; higher is worse for all of them
+COMPARED = ('wall_s', 'cpu_s', 'peak_rss_kib', 'output_bytes')
+
+def check_coverage():
+    """Warn about exported operations the case table does not cover yet"""
+    covered = {case.function for case in CASES}
+    sys.path.insert(0, REPO_ROOT)
+    for package in ('images', 'pdf', 'videos'):
+        try:
+            module = __import__(f"operations.{package}", fromlist=['__all__'])
+        except ImportError as e:
+            print(f"warning: operations.{package} not importable ({e})", file=sys.stderr)
+            continue
+        for name in getattr(module, '__all__', []):
+            if name not in covered:
+                print(f"warning: operations.{package}.{name} has no benchmark case", file=sys.stderr)
+
+def plan(fixtures: list, only=None):
+    """Yield (case, fixture) pairs to measure"""
+    for case in CASES:
+        if only and not only.search(case.function):
+            continue
+        for fixture in fixtures:
+            if fixture['ext'] in case.inputs and bool(fixture['params'].get('locked')) == case.locked:
+                yield case, fixture
+
+def measure(case: Case, fixture: dict, work_dir: str, timeout: float) -> dict:
+    """Run one case in a fresh interpreter and return the worker's measurements"""
+    if case.output == 'dir':
+        output = os.path.join(work_dir, 'output')
+    else:
+        ext = fixture['ext'] if case.output == 'same' else case.output
+        output = os.path.join(work_dir, f"output.{ext}")
+    
+    spec = {
+        'package': case.package,
+        'function': case.function,
+        'inputs': [os.path.abspath(fixture['path'])] * case.copies,
+        'output': output,
+        'kwargs': case.kwargs
+    }
+    try:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.worker', json.dumps(spec)],
+            cwd=REPO_ROOT, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout', 'result': f"Timed out after {timeout}s"}
+    
+    lines = completed.stdout.strip().splitlines()
+    try:
+        return json.loads(lines[-1])
+    except (IndexError, ValueError):
+        return {'status': 'error', 'result': (completed.stderr or completed.stdout).strip()[-300:]}
+
+def run_benchmarks(fixtures: list, repeat: int = 3, timeout: float = 600, only=None) -> list:
+    results = []
+    for case, fixture in plan(fixtures, only):
+        runs = []
+        for _ in range(repeat):
+            work_dir = tempfile.mkdtemp(prefix='bench_')
+            try:
+                runs.append(measure(case, fixture, work_dir, timeout))
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            if runs[-1]['status'] != 'ok':
+                break
+        
+        entry = {'operation': case.function, 'package': case.package, 'fixture': fixture['name'],
+                 'input_bytes': fixture['bytes'], 'runs': len(runs)}
+        if all(run['status'] == 'ok' for run in runs):
+            entry['status'] = 'ok'
+            # Medians damp one-off scheduler noise; sizes are the same every run
+            for key in ('wall_s', 'cpu_s', 'child_cpu_s', 'peak_rss_kib', 'child_peak_rss_kib', 'import_rss_kib'):
+                entry[key] = round(statistics.median(run[key] for run in runs), 4)
+            entry['cpu_s'] = round(entry['cpu_s'] + entry['child_cpu_s'], 4)
+            entry['peak_rss_kib'] = max(entry['peak_rss_kib'], entry['child_peak_rss_kib'])
+            entry['output_bytes'] = runs[-1]['output_bytes']
+        else:
+            entry['status'] = runs[-1]['status']
+            entry['error'] = runs[-1].get('result')
+        
+        print(_format_entry(entry), flush=True)
+        results.append(entry)
+    return results
+
+def _format_entry(entry: dict) -> str:
+    name = f"{entry['operation']} [{entry['fixture']}]"
+    if entry['status'] != 'ok':
+        return f"{name:<60} {entry['status'].upper()}: {entry.get('error')}"
+    return (f"{name:<60} wall {entry['wall_s']:>8.3f}s  cpu {entry['cpu_s']:>8.3f}s  "
+            f"rss {entry['peak_rss_kib'] / 1024:>7.1f}MiB  out {entry['output_bytes']:>11,}B")
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Describe every measurement that got worse than the baseline by more than tolerance"""
+    previous = {(entry['operation'], entry['fixture']): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry['operation'], entry['fixture']))
+        if old is None:
+            continue
+        name = f"{entry['operation']} [{entry['fixture']}]"
+        if old['status'] == 'ok' and entry['status'] != 'ok':
+            regressions.append(f"{name}: now {entry['status']} ({entry.get('error')})")
+            continue
+        if entry['status'] != 'ok' or old['status'] != 'ok':
+            continue
+        for key in COMPARED:
+            if old[key] and entry[key] > old[key] * (1 + tolerance):
+                change = (entry[key] - old[key]) / old[key] * 100
+                regressions.append(f"{name}: {key} {old[key]} -> {entry[key]} (+{change:.1f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every operation on the synthetic corpus")
+    parser.add_argument('--corpus', default=os.path.join('benchmarks', 'corpus'), help="Corpus directory")
+    parser.add_argument('--output', default='benchmark-results.json', help="Where to write the results")
+    parser.add_argument('--baseline', help="Results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Allowed slowdown/growth (0.15 = 15%%)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case; the median is reported")
+    parser.add_argument('--timeout', type=float, default=600, help="Seconds before a run is abandoned")
+    parser.add_argument('--only', help="Regular expression selecting operations by name")
+    args = parser.parse_args()
+    
+    check_coverage()
+    fixtures = load_manifest(args.corpus)
+    started = time.time()
+    results = run_benchmarks(fixtures, repeat=args.repeat, timeout=args.timeout,
+                             only=re.compile(args.only) if args.only else None)
+    
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'started': started,
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Runs one operation on one input in a fresh interpreter and prints its measurements.
+
+Each measurement gets its own process so peak RSS belongs to that operation
+alone and imports or caches from earlier runs cannot skew it. Spawned by
+benchmarks.run; the last line of stdout is a JSON object.
+"""
+
+import importlib
+import json
+import os
+import resource
+import sys
+import time
+
+def _rss_kib(value: int) -> int:
+    # ru_maxrss is in KiB on Linux but in bytes on macOS
+    return value // 1024 if sys.platform == 'darwin' else value
+
+def _output_bytes(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def run(package: str, function: str, inputs: list, output: str, kwargs: dict) -> dict:
+    module = importlib.import_module(f"operations.{package}")
+    operation = getattr(module, function)
+    rss_after_import = _rss_kib(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    
+    argument = inputs if len(inputs) > 1 else inputs[0]
+    before_self = resource.getrusage(resource.RUSAGE_SELF)
+    before_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    result = operation(argument, output, **kwargs)
+    wall = time.perf_counter() - start
+    after_self = resource.getrusage(resource.RUSAGE_SELF)
+    after_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    
+    return {
+        'status': 'error' if 'Error' in str(result) else 'ok',
+        'result': str(result)[:300],
+        'wall_s': wall,
+        'cpu_s': (after_self.ru_utime - before_self.ru_utime) + (after_self.ru_stime - before_self.ru_stime),
+        # ffmpeg and other helper processes report separately
+        'child_cpu_s': (after_children.ru_utime - before_children.ru_utime)
+                       + (after_children.ru_stime - before_children.ru_stime),
+        'peak_rss_kib': _rss_kib(after_self.ru_maxrss),
+        'import_rss_kib': rss_after_import,
+        'child_peak_rss_kib': _rss_kib(after_children.ru_maxrss),
+        'output_bytes': _output_bytes(output)
+    }
+
+def main():
+    spec = json.loads(sys.argv[1])
+    try:
+        measurement = run(spec['package'], spec['function'], spec['inputs'], spec['output'], spec.get('kwargs', {}))
+    except Exception as e:
+        measurement = {'status': 'error', 'result': f"{type(e).__name__}: {e}"[:300]}
+    print(json.dumps(measurement))
+
+if __name__ == '__main__':
+    main()
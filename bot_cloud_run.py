@@ -3,8 +3,10 @@ import os
 import threading
 import time
 import zipfile
-from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
-from flask import Flask, request, jsonify
+from telebot import apihelper
+from telebot.apihelper import ApiTelegramException
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from flask import Flask, Response, request, jsonify
 import logging
 
 # Configure logging for Cloud Run
@@ -16,39 +18,111 @@ logger = logging.getLogger(__name__)
 
 # Import our modules
 from config import (
-    BOT_TOKEN, MAX_FILE_SIZE_MB, ERROR_MESSAGES, SUCCESS_MESSAGES,
-    SUPPORTED_IMAGE_EXTENSIONS, SUPPORTED_PDF_EXTENSIONS, SUPPORTED_VIDEO_EXTENSIONS
+    BOT_TOKEN, TELEGRAM_API_BASE_URL, MAX_FILE_SIZE_MB, ERROR_MESSAGES, SUCCESS_MESSAGES,
+    SUPPORTED_IMAGE_EXTENSIONS, SUPPORTED_PDF_EXTENSIONS, SUPPORTED_VIDEO_EXTENSIONS,
+    TELEGRAM_CONNECT_TIMEOUT, TELEGRAM_READ_TIMEOUT, TELEGRAM_MAX_RETRIES, TELEGRAM_POOL_SIZE,
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST, TELEGRAM_GROUP_RATE_PER_MINUTE,
+    TELEGRAM_SENDER_THREADS, PROGRESS_EDIT_INTERVAL, RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB,
+    SENT_FILE_INDEX_SIZE, INPUT_CACHE_DIR, INPUT_CACHE_MAX_MB, TELEGRAM_FILE_PATH_TTL,
+    TEMP_FAST_DIR, TEMP_FAST_MAX_MB, TEMP_FAST_BUDGET_MB, TEMP_MAX_MB, TEMP_WAIT_SECONDS,
+    SESSION_TTL_SECONDS, SESSION_MAX_ENTRIES, SESSION_LOCK_STRIPES,
+    STATE_BACKEND, STATE_DB_PATH, JOB_JOURNAL_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS,
+    STATS_DB_PATH, STATS_FLUSH_INTERVAL, CONVERSION_PROCESSES, CONVERSION_MAX_TASKS, CONVERSION_TIMEOUT,
+    CONVERSION_RESERVED_LIGHT, MEMORY_BUDGET_MB, MEMORY_ADMISSION_WAIT
 )
-from utils import temp_manager, download_telegram_file, get_file_info, validate_file_size
-
-# Import operation functions with enhanced error handling
-try:
-    from operations.images import *
-    logger.info("✅ Image operations loaded successfully")
-except ImportError as e:
-    logger.warning(f"⚠️ Could not import all image operations: {e}")
-
-try:
-    from operations.pdf import *
-    logger.info("✅ PDF operations loaded successfully")
-except ImportError as e:
-    logger.warning(f"⚠️ Could not import all PDF operations: {e}")
-
-try:
-    from operations.videos import *
-    logger.info("✅ Video operations loaded successfully")
-except ImportError as e:
-    logger.warning(f"⚠️ Could not import all video operations: {e}")
+from utils import (
+    temp_manager, download_telegram_file, get_file_info, get_file_unique_id, validate_file_size, TempSpaceError
+)
+from utils.telegram_api import TelegramBotAPI, configure_telebot
+from utils.outbound_scheduler import OutboundScheduler
+from utils.progress import ProgressReporter
+from utils.disk_cache import DiskLRUCache, conversion_cache_key
+from utils.sent_files import SentFileIndex, extract_file_id
+from utils.session_store import SessionRecord, create_session_store
+from utils.stats_store import UserStatsStore
+from utils.job_journal import (
+    JobJournal, JOB_DOWNLOADING, JOB_CONVERTING, JOB_UPLOADING
+)
+from utils.metrics import (
+    REGISTRY, JOB_STAGE_SECONDS, JOB_BYTES_IN, JOB_BYTES_OUT, JOB_ERRORS, JOBS_COMPLETED, JOBS_ACTIVE,
+    register_cache_metrics
+)
+from utils.tracing import trace, span, current_trace_id
+
+# Operations resolve through the registry and import their backends on first use
+from operations.registry import available_operations, find_operation, is_available, operations_for
+from utils.process_pool import ConversionPool, ConversionResult
+
+# Small jobs get their scratch directory on tmpfs when one is configured;
+# the rest share a byte budget on disk
+temp_manager.set_fast_dir(TEMP_FAST_DIR, TEMP_FAST_MAX_MB * 1024 * 1024, TEMP_FAST_BUDGET_MB * 1024 * 1024)
+temp_manager.set_budget(TEMP_MAX_MB * 1024 * 1024, wait_seconds=TEMP_WAIT_SECONDS)
 
 # Initialize Flask app for health checks (Cloud Run requirement)
 app = Flask(__name__)
+START_TIME = time.time()
+
+# Shared keep-alive Telegram Bot API client; telebot sends through its pool,
+# paced by the outbound scheduler so bursts stay inside Telegram's flood limits
+telegram_api = TelegramBotAPI(
+    BOT_TOKEN,
+    base_url=TELEGRAM_API_BASE_URL,
+    connect_timeout=TELEGRAM_CONNECT_TIMEOUT,
+    read_timeout=TELEGRAM_READ_TIMEOUT,
+    max_retries=TELEGRAM_MAX_RETRIES,
+    pool_size=TELEGRAM_POOL_SIZE,
+    file_path_ttl=TELEGRAM_FILE_PATH_TTL
+)
+outbound = OutboundScheduler(
+    telegram_api,
+    global_rate=TELEGRAM_GLOBAL_RATE,
+    chat_rate=TELEGRAM_CHAT_RATE,
+    chat_burst=TELEGRAM_CHAT_BURST,
+    group_rate_per_minute=TELEGRAM_GROUP_RATE_PER_MINUTE,
+    senders=TELEGRAM_SENDER_THREADS,
+    rate_limit_retries=TELEGRAM_MAX_RETRIES
+)
+apihelper.CUSTOM_REQUEST_SENDER = outbound.request_sender
+configure_telebot(TELEGRAM_API_BASE_URL)
 
 # Initialize bot
 bot = telebot.TeleBot(BOT_TOKEN)
 
 # Enhanced user sessions with engagement tracking
-user_sessions = {}
-user_stats = {}
+user_sessions = create_session_store(
+    STATE_BACKEND,
+    db_path=STATE_DB_PATH,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_entries=SESSION_MAX_ENTRIES,
+    stripes=SESSION_LOCK_STRIPES
+)
+user_stats = UserStatsStore(STATS_DB_PATH, flush_interval=STATS_FLUSH_INTERVAL)
+
+# Repeat conversions of the same input are served from disk
+result_cache = DiskLRUCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB * 1024 * 1024)
+
+# Downloaded inputs, so "Try Again" and follow-up operations skip the download
+input_cache = DiskLRUCache(INPUT_CACHE_DIR, INPUT_CACHE_MAX_MB * 1024 * 1024)
+
+# Outputs Telegram already stores are resent by file_id instead of uploaded again
+sent_files = SentFileIndex(max_entries=SENT_FILE_INDEX_SIZE)
+
+# CPU-bound conversions run in worker processes, so polling and the
+# health server keep responding while a PDF is converted to Word
+conversion_pool = ConversionPool(
+    processes=CONVERSION_PROCESSES, max_tasks=CONVERSION_MAX_TASKS, timeout=CONVERSION_TIMEOUT,
+    reserved_light=CONVERSION_RESERVED_LIGHT, memory_mb=MEMORY_BUDGET_MB, admission_wait=MEMORY_ADMISSION_WAIT
+)
+
+# Accepted jobs are journaled so a restart can resume them
+job_journal = JobJournal(JOB_JOURNAL_PATH, lease_seconds=JOB_LEASE_SECONDS)
+
+# Scrape-time gauges for /metrics; job counters are updated by the handlers
+REGISTRY.gauge('bot_outbound_pending', 'Telegram calls waiting for rate-limit capacity',
+               callback=lambda: outbound.stats()['pending'])
+REGISTRY.gauge('bot_conversion_workers_busy', 'Conversion worker processes running a job',
+               callback=conversion_pool.busy)
+register_cache_metrics({'result': result_cache, 'input': input_cache, 'sent_files': sent_files})
 
 # UI/UX Constants
 EMOJIS = {
@@ -64,59 +138,19 @@ EMOJIS = {
     'thumbs_up': '👍'
 }
 
-# Enhanced operation lists with better descriptions
-IMAGE_OPERATIONS = [
-    "🎨 Convert JPG to PNG",
-    "🖼️ Convert PNG to JPG", 
-    "⚡ Convert JPG to WebP",
-    "📱 Convert WebP to JPG",
-    "🗜️ Smart Compress Image"
-]
-
-# Check if SVG support is available
-try:
-    from operations.images.svg_to_png import CAIROSVG_AVAILABLE
-    if CAIROSVG_AVAILABLE:
-        IMAGE_OPERATIONS.append("🎭 Convert SVG to PNG")
-        logger.info("✅ SVG support available")
-except ImportError:
+# Operations installed here, by group; labels and inputs come from the registry
+IMAGE_OPERATIONS = available_operations('images')
+PDF_OPERATIONS = available_operations('pdf')
+VIDEO_OPERATIONS = available_operations('videos')
+
+if is_available('convert_svg_to_png'):
+    logger.info("✅ SVG support available")
+else:
     logger.warning("⚠️ SVG support not available")
 
-PDF_OPERATIONS = [
-    "📑 Merge Multiple PDFs",
-    "🖼️ Convert PDF to Images", 
-    "📄 Convert Image to PDF",
-    "🗜️ Compress PDF Size",
-    "🔒 Lock PDF with Password",
-    "🔓 Unlock Protected PDF",
-    "🔢 Add Page Numbers",
-    "✂️ Delete Specific Page",
-    "🔄 Rotate PDF Pages",
-    "📝 Convert PDF to Word"
-]
-
-VIDEO_OPERATIONS = []
-
-# Check if video processing is available
-try:
-    from operations.videos import MOVIEPY_AVAILABLE
-    if MOVIEPY_AVAILABLE:
-        VIDEO_OPERATIONS = [
-            "🎬 Convert MP4 to MOV",
-            "📱 Convert MOV to MP4",
-            "📺 Convert TS to MP4", 
-            "🎞️ Convert MKV to MP4",
-            "🌐 Convert MP4 to WebM",
-            "📹 Convert WebM to MP4",
-            "🎪 Convert GIF to MP4",
-            "🌐 Convert GIF to WebM", 
-            "😂 Convert MP4 to GIF",
-            "🎭 Convert MOV to GIF",
-            "✨ Convert WebM to GIF",
-            "🗜️ Smart Compress Video"
-        ]
-        logger.info("✅ Video operations available")
-except ImportError:
+if VIDEO_OPERATIONS:
+    logger.info("✅ Video operations available")
+else:
     logger.warning("⚠️ Video operations not available")
 
 # Flask routes for Cloud Run health checks
@@ -156,10 +190,21 @@ def health_check():
 def get_stats():
     """Get bot statistics"""
     try:
+        user_sessions.purge_expired()
+        totals = user_stats.totals()
         return jsonify({
             "active_sessions": len(user_sessions),
-            "total_users": len(user_stats),
-            "uptime": time.time(),
+            "total_users": totals['total_users'],
+            "files_processed": totals['files_processed'],
+            "total_size_saved": totals['total_size_saved'],
+            "top_operations": totals['top_operations'],
+            "result_cache": result_cache.stats(),
+            "input_cache": input_cache.stats(),
+            "temp_files": temp_manager.stats(),
+            "sent_files": sent_files.stats(),
+            "job_journal": job_journal.stats(),
+            "conversion_pool": conversion_pool.stats(),
+            "uptime": time.time() - START_TIME,
             "operations_available": {
                 "image": len(IMAGE_OPERATIONS),
                 "pdf": len(PDF_OPERATIONS), 
@@ -169,6 +214,11 @@ def get_stats():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), content_type=REGISTRY.CONTENT_TYPE)
+
 @app.route('/')
 def root():
     """Root endpoint"""
@@ -186,25 +236,12 @@ def root():
     })
 
 def get_user_stats(user_id):
-    """Get or create user statistics"""
-    if user_id not in user_stats:
-        user_stats[user_id] = {
-            'files_processed': 0,
-            'favorite_operation': None,
-            'total_size_saved': 0,
-            'first_use': time.time()
-        }
-    return user_stats[user_id]
+    """Get user statistics; favorite_operation is the most used one"""
+    return user_stats.get(user_id)
 
 def update_user_stats(user_id, operation, size_saved=0):
     """Update user statistics"""
-    stats = get_user_stats(user_id)
-    stats['files_processed'] += 1
-    stats['total_size_saved'] += size_saved
-    
-    # Track favorite operation
-    if not stats['favorite_operation']:
-        stats['favorite_operation'] = operation
+    user_stats.record(user_id, operation, size_saved)
 
 def create_progress_bar(percentage):
     """Create visual progress bar"""
@@ -212,6 +249,19 @@ def create_progress_bar(percentage):
     empty = 10 - filled
     return f"{'█' * filled}{'░' * empty} {percentage}%"
 
+def render_processing_text(operation_display, file_name, status, percentage=None):
+    """Render the processing status message for the current stage"""
+    progress_line = f"\n{create_progress_bar(percentage)}\n" if percentage is not None else ""
+    return f"""
+{EMOJIS['processing']} **Processing Your File...**
+
+🎯 **Operation:** {operation_display}
+📁 **File:** `{file_name}`
+⏱️ **Status:** {status}
+{progress_line}
+*This may take a moment. Please wait...* ⏳
+    """
+
 def get_file_type(file_name):
     """Enhanced file type detection with better messaging"""
     ext = os.path.splitext(file_name)[1].lower()
@@ -219,8 +269,8 @@ def get_file_type(file_name):
     # Check if SVG support is available for .svg files
     if ext == '.svg':
         try:
-            from operations.images.svg_to_png import CAIROSVG_AVAILABLE
-            if CAIROSVG_AVAILABLE:
+            from operations.images import SVG_AVAILABLE
+            if SVG_AVAILABLE:
                 return "image"
             else:
                 return "unsupported"
@@ -235,32 +285,20 @@ def get_file_type(file_name):
         return "video"
     return "unsupported"
 
-def create_operation_buttons(file_type):
+def create_operation_buttons(file_type, file_name=None):
     """Create enhanced operation buttons with better UX"""
     markup = InlineKeyboardMarkup(row_width=2)
-    operations = []
-    
-    if file_type == "image":
-        operations = IMAGE_OPERATIONS
-    elif file_type == "pdf":
-        operations = PDF_OPERATIONS
-    elif file_type == "video":
-        operations = VIDEO_OPERATIONS
-    else:
+    
+    if file_type not in ("image", "pdf", "video"):
         return None
-
-    # Add operations in rows of 2
+    
+    # Operations that accept this file, in rows of 2
+    operations = operations_for(file_name)
     for i in range(0, len(operations), 2):
-        row_buttons = []
-        for j in range(2):
-            if i + j < len(operations):
-                op = operations[i + j]
-                # Convert display name to callback data
-                callback_data = op.lower().replace(' ', '_').replace('🎨', '').replace('🖼️', '').replace('⚡', '').replace('📱', '').replace('🗜️', '').replace('🎭', '').replace('📑', '').replace('📄', '').replace('🔒', '').replace('🔓', '').replace('🔢', '').replace('✂️', '').replace('🔄', '').replace('📝', '').replace('🎬', '').replace('📺', '').replace('🎞️', '').replace('🌐', '').replace('📹', '').replace('🎪', '').replace('😂', '').replace('🎭', '').replace('✨', '').strip()
-                callback_data = callback_data.replace('convert_', '').replace('smart_', '').replace('multiple_', '')
-                callback_data = f"convert_{callback_data}"
-                row_buttons.append(InlineKeyboardButton(op, callback_data=callback_data))
-        markup.add(*row_buttons)
+        markup.add(*[
+            InlineKeyboardButton(operation.label, callback_data=operation.name)
+            for operation in operations[i:i + 2]
+        ])
     
     # Add utility buttons
     markup.add(
@@ -277,7 +315,7 @@ def welcome(message):
     user_id = message.from_user.id
     
     # Initialize user stats
-    get_user_stats(user_id)
+    user_stats.touch(user_id)
     
     welcome_text = f"""
 🌟 *Welcome {user_name}!* 🌟
@@ -447,17 +485,18 @@ def handle_file(message):
             return
         
         # Store file information in user session
-        user_sessions[user_id] = {
-            'file_id': file_id,
-            'file_name': file_name,
-            'file_type': file_type,
-            'file_size': file_size,
-            'message_id': message.message_id,
-            'upload_time': time.time()
-        }
+        user_sessions.put(user_id, SessionRecord(
+            file_id=file_id,
+            file_unique_id=get_file_unique_id(message),
+            file_name=file_name,
+            file_type=file_type,
+            file_size=file_size,
+            message_id=message.message_id,
+            upload_time=time.time()
+        ))
         
         # Generate enhanced buttons for operations
-        markup = create_operation_buttons(file_type)
+        markup = create_operation_buttons(file_type, file_name)
         
         # File size in readable format
         size_mb = file_size / (1024 * 1024)
@@ -494,50 +533,111 @@ def handle_file(message):
 
 def perform_conversion(operation, input_path, output_path, **kwargs):
     """Enhanced conversion function with better error handling"""
-    operation_map = {
-        # Image operations
-        'convert_jpg_to_png': convert_jpg_to_png,
-        'convert_png_to_jpg': convert_png_to_jpg,
-        'convert_jpg_to_webp': convert_jpg_to_webp,
-        'convert_webp_to_jpg': convert_webp_to_jpg,
-        'convert_svg_to_png': convert_svg_to_png,
-        'compress_image': lambda inp, out: compress_image(inp, out, quality=60),
+    return conversion_pool.run(operation, input_path, output_path, params=kwargs, progress=kwargs.get('progress'))
+
+def send_result(call, session, operation, document, new_size, file_name=None):
+    """Send a conversion result (open file or Telegram file_id) and record the user's stats"""
+    operation_display = operation.replace('convert_', '').replace('_', ' ').title()
+    
+    # Calculate file size savings
+    original_size = session['file_size']
+    size_saved = original_size - new_size
+    percentage_saved = (size_saved / original_size * 100) if original_size > 0 else 0
+    
+    success_text = f"""
+{EMOJIS['success']} **Conversion Complete!**
+
+🎯 **Operation:** {operation_display}
+📁 **Original:** {original_size / (1024*1024):.1f}MB
+📁 **New Size:** {new_size / (1024*1024):.1f}MB
+💾 **Saved:** {abs(size_saved) / (1024*1024):.1f}MB ({abs(percentage_saved):.1f}%)
+
+{EMOJIS['fire']} *Ready for download!*
+    """
+    
+    # Create success markup with options
+    success_markup = InlineKeyboardMarkup()
+    success_markup.add(
+        InlineKeyboardButton("🔄 Convert Another", callback_data="upload_new"),
+        InlineKeyboardButton("📊 My Stats", callback_data="show_stats")
+    )
+    success_markup.add(InlineKeyboardButton(f"{EMOJIS['star']} Rate This Bot", url="https://t.me/share/url?url=Amazing file converter bot!"))
+    
+    sent_message = bot.send_document(
+        call.message.chat.id,
+        document,
+        visible_file_name=file_name,
+        caption=success_text,
+        parse_mode='Markdown',
+        reply_markup=success_markup
+    )
+    
+    # Update user statistics
+    update_user_stats(call.from_user.id, operation, size_saved)
+    return sent_message
+
+def complete_processing_message(call, processing_msg):
+    """Replace the processing message with the delivery confirmation"""
+    bot.edit_message_text(
+        f"{EMOJIS['success']} **File converted and sent successfully!**\n\n*Check the document above.* {EMOJIS['thumbs_up']}",
+        call.message.chat.id,
+        processing_msg.message_id,
+        parse_mode='Markdown'
+    )
+
+def callback_payload(call):
+    """Minimal Bot API callback_query dict from which a journaled job can be replayed"""
+    return {
+        'id': call.id,
+        'from': {'id': call.from_user.id, 'is_bot': False, 'first_name': call.from_user.first_name},
+        'chat_instance': call.chat_instance,
+        'data': call.data,
+        'message': {
+            'message_id': call.message.message_id,
+            'date': call.message.date,
+            'chat': {'id': call.message.chat.id, 'type': call.message.chat.type}
+        }
+    }
+
+def recover_unfinished_jobs():
+    """Resume jobs interrupted by the last shutdown, or tell their users they failed"""
+    resumable = []
+    for job in job_journal.claim_unfinished():
+        if job['job_dir']:
+            temp_manager.release(job['job_dir'])
         
-        # PDF operations  
-        'merge_pdfs': lambda inp, out: merge_pdfs([inp], out),
-        'convert_pdf_to_images': convert_pdf_to_images,
-        'convert_image_to_pdf': convert_image_to_pdf,
-        'compress_pdf': compress_pdf,
-        'lock_pdf': lambda inp, out: lock_pdf(inp, out, kwargs.get('password', 'default123')),
-        'unlock_pdf': lambda inp, out: unlock_pdf(inp, out, kwargs.get('password', 'default123')),
-        'add_page_numbers': add_page_numbers,
-        'delete_a_page': lambda inp, out: delete_pdf_page(inp, out, kwargs.get('page_number', 1)),
-        'rotate_pdf': rotate_pdf,
-        'convert_pdf_to_word': convert_pdf_to_word,
+        if job['callback'] and job['session'] and job['attempts'] <= JOB_MAX_ATTEMPTS:
+            user_sessions.put(job['callback']['from']['id'], SessionRecord.from_dict(job['session']))
+            resumable.append(job)
+            continue
         
-        # Video operations
-        'convert_mp4_to_mov': convert_mp4_to_mov,
-        'convert_mov_to_mp4': convert_mov_to_mp4,
-        'convert_ts_to_mp4': convert_ts_to_mp4,
-        'convert_mkv_to_mp4': convert_mkv_to_mp4,
-        'convert_mp4_to_webm': convert_mp4_to_webm,
-        'convert_webm_to_mp4': convert_webm_to_mp4,
-        'convert_gif_to_mp4': convert_gif_to_mp4,
-        'convert_gif_to_webm': convert_gif_to_webm,
-        'convert_mp4_to_gif': convert_mp4_to_gif,
-        'convert_mov_to_gif': convert_mov_to_gif,
-        'convert_webm_to_gif': convert_webm_to_gif,
-        'compress_video': compress_video,
-    }
+        job_journal.fail(job['job_id'], "Interrupted by a restart")
+        try:
+            bot.send_message(
+                job['chat_id'],
+                f"{EMOJIS['error']} Your {job['operation'].replace('_', ' ').title()} conversion was "
+                f"interrupted by a server restart. Please send the file again."
+            )
+        except Exception as e:
+            logger.warning(f"Could not notify chat {job['chat_id']} about job {job['job_id']}: {e}")
     
-    if operation in operation_map:
-        return operation_map[operation](input_path, output_path)
-    else:
-        return f"Operation {operation} not implemented yet"
+    def resume():
+        for job in resumable:
+            logger.info(f"Resuming {job['operation']} job {job['job_id']} (was {job['state']})")
+            handle_callback_query(CallbackQuery.de_json(job['callback']), job_id=job['job_id'])
+    
+    if resumable:
+        threading.Thread(target=resume, name="job-recovery", daemon=True).start()
 
 # Enhanced callback handler with progress tracking
 @bot.callback_query_handler(func=lambda call: True)
-def handle_callback_query(call):
+def handle_callback_query(call, job_id=None):
+    # Resumed jobs keep their journal id; new ones are journaled under the trace id
+    with trace(job_id), span('callback', operation=call.data):
+        process_callback_query(call, job_id)
+
+def process_callback_query(call, job_id=None):
+    """Run a button press; job_id is set when resuming a journaled job"""
     user_id = call.from_user.id
     operation = call.data
     
@@ -551,8 +651,19 @@ def handle_callback_query(call):
         handle_utility_callback(call)
         return
     
+    # Anything else must be a registered operation; older keyboards may send an alias
+    spec = find_operation(operation)
+    # Missing backends are reported before anything is downloaded
+    if spec is None or not spec.available:
+        job_journal.fail(job_id, spec.missing if spec else f"Unknown operation: {operation}")
+        bot.answer_callback_query(call.id, "This operation is not available")
+        return
+    operation = spec.name
+    
     # Check if user has a file session
-    if user_id not in user_sessions:
+    with span('session.lookup'):
+        session = user_sessions.get(user_id)
+    if session is None:
         bot.answer_callback_query(call.id, "Please send a file first! 📁")
         markup = InlineKeyboardMarkup()
         markup.add(InlineKeyboardButton("🔙 Start Over", callback_data="back_to_start"))
@@ -564,155 +675,192 @@ def handle_callback_query(call):
         )
         return
     
-    session = user_sessions[user_id]
     operation_display = operation.replace('convert_', '').replace('_', ' ').title()
     
-    bot.answer_callback_query(call.id, f"🔄 Starting: {operation_display}")
+    # Journal the job before any work; a resumed job already has an entry
+    if job_id is None:
+        job_id = job_journal.record(
+            user_id, call.message.chat.id, operation,
+            callback=callback_payload(call),
+            session=session.to_dict(),
+            job_id=current_trace_id()
+        )
     
-    # Enhanced processing message with progress
-    processing_text = f"""
-{EMOJIS['processing']} **Processing Your File...**
-
-🎯 **Operation:** {operation_display}
-📁 **File:** `{session['file_name']}`
-⏱️ **Status:** Initializing...
-
-{create_progress_bar(0)}
-
-*This may take a moment. Please wait...* ⏳
-    """
+    try:
+        bot.answer_callback_query(call.id, f"🔄 Starting: {operation_display}")
+    except ApiTelegramException as e:
+        # Queries of jobs resumed after a restart have expired
+        logger.warning(f"Failed to answer callback query: {e}")
     
+    # Enhanced processing message with progress
     processing_msg = bot.edit_message_text(
-        processing_text,
+        render_processing_text(operation_display, session['file_name'], "Initializing..."),
         call.message.chat.id,
         call.message.message_id,
         parse_mode='Markdown'
     )
     
+    # Real download/encode progress, debounced and queued without blocking the job
+    def publish_progress(text):
+        job_journal.heartbeat(job_id)
+        outbound.edit_message_text(call.message.chat.id, processing_msg.message_id, text, parse_mode='Markdown')
+    
+    progress = ProgressReporter(
+        publish=publish_progress,
+        render=lambda status, percentage: render_processing_text(
+            operation_display, session['file_name'], status, percentage
+        ),
+        min_interval=PROGRESS_EDIT_INTERVAL
+    )
+    
+    stage = 'setup'
+    # Result cache entry held while it is being sent, released when the job ends
+    pinned_key = None
+    JOBS_ACTIVE.inc()
     try:
-        # Update progress - Download phase
-        bot.edit_message_text(
-            processing_text.replace("Initializing...", "Downloading file...").replace(create_progress_bar(0), create_progress_bar(25)),
-            call.message.chat.id,
-            processing_msg.message_id,
-            parse_mode='Markdown'
-        )
-        
-        # Download the original file
-        input_path = temp_manager.create_temp_file(
-            extension=os.path.splitext(session['file_name'])[1],
-            prefix="input_"
-        )
-        
-        if not download_telegram_file(bot, session['file_id'], input_path):
-            raise Exception("Failed to download file")
-        
-        # Update progress - Processing phase
-        bot.edit_message_text(
-            processing_text.replace("Downloading file...", "Converting file...").replace(create_progress_bar(25), create_progress_bar(50)),
-            call.message.chat.id,
-            processing_msg.message_id,
-            parse_mode='Markdown'
-        )
-        
-        # Create output file path
         output_filename = temp_manager.get_output_filename(session['file_name'], operation)
-        output_path = temp_manager.create_temp_file(
-            extension=os.path.splitext(output_filename)[1],
-            prefix="output_"
-        )
         
-        # Update progress - Final processing
-        bot.edit_message_text(
-            processing_text.replace("Converting file...", "Finalizing...").replace(create_progress_bar(50), create_progress_bar(75)),
-            call.message.chat.id,
-            processing_msg.message_id,
-            parse_mode='Markdown'
-        )
+        # Repeat conversions of the same input skip download and conversion entirely
+        cache_key = conversion_cache_key(session.get('file_unique_id'), operation, spec.resolve_params())
         
-        # Perform the conversion
-        result = perform_conversion(operation, input_path, output_path)
-        
-        # Check if conversion was successful
-        if "Error" in result:
-            error_markup = InlineKeyboardMarkup()
-            error_markup.add(
-                InlineKeyboardButton("🔄 Try Again", callback_data=operation),
-                InlineKeyboardButton("📤 New File", callback_data="upload_new")
-            )
-            bot.edit_message_text(
-                f"{EMOJIS['error']} **Conversion Failed**\n\n{result}\n\n*Try again or upload a different file.*",
-                call.message.chat.id,
-                processing_msg.message_id,
-                reply_markup=error_markup,
-                parse_mode='Markdown'
-            )
-            return
-        
-        # Update progress - Complete
-        bot.edit_message_text(
-            processing_text.replace("Finalizing...", "Upload complete!").replace(create_progress_bar(75), create_progress_bar(100)),
-            call.message.chat.id,
-            processing_msg.message_id,
-            parse_mode='Markdown'
-        )
+        # Outputs delivered before only need a file_id reference, no upload
+        known_file = sent_files.get(cache_key)
+        if known_file:
+            try:
+                with span('upload', source='file_id'):
+                    send_result(call, session, operation, known_file.file_id, known_file.file_size)
+            except ApiTelegramException as e:
+                logger.warning(f"Stored file_id rejected, uploading again: {e}")
+                sent_files.forget(cache_key)
+            else:
+                logger.info(f"Resent {operation} result by file_id")
+                JOBS_COMPLETED.inc(operation=operation, source='file_id')
+                complete_processing_message(call, processing_msg)
+                job_journal.finish(job_id)
+                return
         
-        # Send the converted file with enhanced message
-        if os.path.exists(output_path):
-            # Calculate file size savings
-            original_size = session['file_size']
-            new_size = os.path.getsize(output_path)
-            size_saved = original_size - new_size
-            percentage_saved = (size_saved / original_size * 100) if original_size > 0 else 0
-            
-            # Update user statistics
-            update_user_stats(user_id, operation, size_saved)
-            
-            success_text = f"""
-{EMOJIS['success']} **Conversion Complete!**
-
-🎯 **Operation:** {operation_display}
-📁 **Original:** {original_size / (1024*1024):.1f}MB
-📁 **New Size:** {new_size / (1024*1024):.1f}MB
-💾 **Saved:** {abs(size_saved) / (1024*1024):.1f}MB ({abs(percentage_saved):.1f}%)
-
-{EMOJIS['fire']} *Ready for download!*
-            """
+        # Everything this job writes lives in its own directory, removed when it ends
+        with temp_manager.job_dir(size_hint=session.get('file_size')) as job_dir:
+            output_path = result_cache.acquire(cache_key)
             
-            # Create success markup with options
-            success_markup = InlineKeyboardMarkup()
-            success_markup.add(
-                InlineKeyboardButton("🔄 Convert Another", callback_data="upload_new"),
-                InlineKeyboardButton("📊 My Stats", callback_data="show_stats")
-            )
-            success_markup.add(InlineKeyboardButton(f"{EMOJIS['star']} Rate This Bot", url="https://t.me/share/url?url=Amazing file converter bot!"))
+            if output_path:
+                pinned_key = cache_key
+                logger.info(f"Result cache hit for {operation}")
+                result = ConversionResult(True, "Served from result cache", os.path.getsize(output_path), 0.0, 0.0, None)
+            else:
+                # The input stays checked out of the cache until the conversion is done
+                input_key = session.get('file_unique_id')
+                input_path = input_cache.acquire(input_key)
+                
+                try:
+                    if input_path:
+                        logger.info(f"Input cache hit for {session['file_name']}")
+                    else:
+                        progress.stage("Downloading file...")
+                        
+                        # Download the original file
+                        download_path = os.path.join(
+                            job_dir, f"input{os.path.splitext(session['file_name'])[1]}"
+                        )
+                        job_journal.update(job_id, JOB_DOWNLOADING, job_dir=job_dir, input_path=download_path)
+                        
+                        stage = 'download'
+                        with span('download') as transfer, JOB_STAGE_SECONDS.time(operation=operation, stage=stage):
+                            downloaded = download_telegram_file(bot, session['file_id'], download_path,
+                                                                progress=progress, api=telegram_api)
+                            if not downloaded:
+                                transfer.fail("Download failed")
+                        if not downloaded:
+                            raise Exception("Failed to download file")
+                        
+                        input_path = input_cache.put(input_key, download_path, pin=True, move=True) or download_path
+                    
+                    progress.stage("Converting file...")
+                    
+                    # Create output file path
+                    output_path = os.path.join(job_dir, f"output{os.path.splitext(output_filename)[1]}")
+                    job_journal.update(
+                        job_id, JOB_CONVERTING, job_dir=job_dir, input_path=input_path, output_path=output_path
+                    )
+                    
+                    # Perform the conversion
+                    stage = 'convert'
+                    JOB_BYTES_IN.inc(os.path.getsize(input_path), operation=operation)
+                    with span('convert') as conversion, JOB_STAGE_SECONDS.time(operation=operation, stage=stage):
+                        result = perform_conversion(operation, input_path, output_path, progress=progress)
+                        conversion.set(pid=result.pid, cpu_s=result.cpu_s)
+                        if not result.ok:
+                            conversion.fail(result.message)
+                    # Account for what the job actually wrote, not just its reservation
+                    temp_manager.touch(job_dir)
+                finally:
+                    input_cache.release(input_key)
+                
+                # Output made with lowered settings is not what the cache key describes
+                if result.degraded:
+                    cache_key = None
+                elif result.ok:
+                    result_cache.put(cache_key, output_path)
             
-            with open(output_path, 'rb') as file:
-                bot.send_document(
+            # Check if conversion was successful
+            if not result.ok:
+                JOB_ERRORS.inc(operation=operation, stage=stage)
+                job_journal.fail(job_id, result.message)
+                error_markup = InlineKeyboardMarkup()
+                error_markup.add(
+                    InlineKeyboardButton("🔄 Try Again", callback_data=operation),
+                    InlineKeyboardButton("📤 New File", callback_data="upload_new")
+                )
+                bot.edit_message_text(
+                    f"{EMOJIS['error']} **Conversion Failed**\n\n{result.message}\n\n*Try again or upload a different file.*",
                     call.message.chat.id,
-                    file,
-                    caption=success_text,
-                    parse_mode='Markdown',
-                    reply_markup=success_markup
+                    processing_msg.message_id,
+                    reply_markup=error_markup,
+                    parse_mode='Markdown'
                 )
+                return
             
-            bot.edit_message_text(
-                f"{EMOJIS['success']} **File converted and sent successfully!**\n\n*Check the document above.* {EMOJIS['thumbs_up']}",
-                call.message.chat.id,
-                processing_msg.message_id,
-                parse_mode='Markdown'
-            )
+            progress.stage("Uploading result...")
+            job_journal.update(job_id, JOB_UPLOADING)
             
-        else:
-            bot.edit_message_text(
-                f"{EMOJIS['error']} Conversion completed but file not found. Please try again.",
-                call.message.chat.id,
-                processing_msg.message_id,
-                parse_mode='Markdown'
-            )
+            # Send the converted file with enhanced message
+            if os.path.exists(output_path):
+                new_size = os.path.getsize(output_path)
+                source = 'converted' if stage == 'convert' else 'result_cache'
+                stage = 'upload'
+                with open(output_path, 'rb') as file, span('upload', source=source), \
+                        JOB_STAGE_SECONDS.time(operation=operation, stage=stage):
+                    sent_message = send_result(call, session, operation, file, new_size, output_filename)
+                sent_files.remember(cache_key, extract_file_id(sent_message), output_filename, new_size)
+                JOB_BYTES_OUT.inc(new_size, operation=operation)
+                JOBS_COMPLETED.inc(operation=operation, source=source)
+                
+                complete_processing_message(call, processing_msg)
+                job_journal.finish(job_id)
+            
+            else:
+                JOB_ERRORS.inc(operation=operation, stage=stage)
+                job_journal.fail(job_id, "Output file not found")
+                bot.edit_message_text(
+                    f"{EMOJIS['error']} Conversion completed but file not found. Please try again.",
+                    call.message.chat.id,
+                    processing_msg.message_id,
+                    parse_mode='Markdown'
+                )
 
+    except TempSpaceError as e:
+        logger.warning(f"Refusing {operation}: {e}")
+        JOB_ERRORS.inc(operation=operation, stage='temp_space')
+        job_journal.fail(job_id, e)
+        bot.edit_message_text(
+            f"{EMOJIS['error']} {ERROR_MESSAGES['server_busy']}",
+            call.message.chat.id,
+            processing_msg.message_id
+        )
     except Exception as e:
         logger.error(f"Error in conversion: {e}")
+        JOB_ERRORS.inc(operation=operation, stage=stage)
+        job_journal.fail(job_id, e)
         error_markup = InlineKeyboardMarkup()
         error_markup.add(
             InlineKeyboardButton("🔄 Try Again", callback_data=operation),
@@ -725,6 +873,9 @@ def handle_callback_query(call):
             reply_markup=error_markup,
             parse_mode='Markdown'
         )
+    finally:
+        result_cache.release(pinned_key)
+        JOBS_ACTIVE.dec()
 
 def handle_demo_callback(call):
     """Handle demo button callbacks"""
@@ -876,12 +1027,16 @@ Upload any supported file (image, PDF, or video)
 def cleanup():
     """Clean up temporary files on shutdown"""
     temp_manager.cleanup_old_files()
+    user_stats.flush()
 
 def run_bot():
     """Run the bot with proper error handling"""
     try:
         logger.info(f"{EMOJIS['rocket']} Starting Enhanced File Converter Bot for Cloud Run...")
         logger.info(f"Available operations: {len(IMAGE_OPERATIONS + PDF_OPERATIONS + VIDEO_OPERATIONS)}")
+        
+        # Pick up conversions the previous instance accepted but never delivered
+        recover_unfinished_jobs()
         logger.info(f"{EMOJIS['success']} Bot is running! Waiting for messages...")
         
         # Start the bot with error recovery
@@ -7,100 +7,46 @@ from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 # Import our modules
 from config import (
-    BOT_TOKEN, MAX_FILE_SIZE_MB, ERROR_MESSAGES, SUCCESS_MESSAGES,
-    SUPPORTED_IMAGE_EXTENSIONS, SUPPORTED_PDF_EXTENSIONS, SUPPORTED_VIDEO_EXTENSIONS
+    BOT_TOKEN, TELEGRAM_API_BASE_URL, MAX_FILE_SIZE_MB, ERROR_MESSAGES, SUCCESS_MESSAGES,
+    SUPPORTED_IMAGE_EXTENSIONS, SUPPORTED_PDF_EXTENSIONS, SUPPORTED_VIDEO_EXTENSIONS,
+    SESSION_TTL_SECONDS, SESSION_MAX_ENTRIES, SESSION_LOCK_STRIPES,
+    STATE_BACKEND, STATE_DB_PATH, CONVERSION_PROCESSES, CONVERSION_MAX_TASKS, CONVERSION_TIMEOUT,
+    CONVERSION_RESERVED_LIGHT, MEMORY_BUDGET_MB, MEMORY_ADMISSION_WAIT
 )
-from utils import temp_manager, download_telegram_file, get_file_info, validate_file_size
+from utils import temp_manager, download_telegram_file, get_file_info, validate_file_size, TempSpaceError
+from utils.session_store import SessionRecord, create_session_store
+from utils.telegram_api import configure_telebot
+from utils.process_pool import ConversionPool
 
-# Import operation functions
-try:
-    from operations.images import *
-except ImportError as e:
-    print(f"Warning: Could not import all image operations: {e}")
-
-try:
-    from operations.pdf import *
-except ImportError as e:
-    print(f"Warning: Could not import all PDF operations: {e}")
-
-try:
-    from operations.videos import *
-except ImportError as e:
-    print(f"Warning: Could not import all video operations: {e}")
+# Operations resolve through the registry and import their backends on first use
+from operations.registry import find_operation, is_available, operations_for
 
 # Initialize bot
+configure_telebot(TELEGRAM_API_BASE_URL)
 bot = telebot.TeleBot(BOT_TOKEN)
 
 # Store user sessions for multi-step operations
-user_sessions = {}
-
-# Supported file types and their operations
-IMAGE_OPERATIONS = [
-    "Convert JPG to PNG",
-    "Convert PNG to JPG", 
-    "Convert JPG to WebP",
-    "Convert WebP to JPG",
-    "Compress Image"
-]
-
-# Check if SVG support is available
-try:
-    from operations.images.svg_to_png import CAIROSVG_AVAILABLE
-    if CAIROSVG_AVAILABLE:
-        IMAGE_OPERATIONS.append("Convert SVG to PNG")
-except ImportError:
-    pass
-
-PDF_OPERATIONS = [
-    "Merge PDFs",
-    "Convert PDF to Images",
-    "Convert Image to PDF",
-    "Compress PDF",
-    "Lock PDF",
-    "Unlock PDF",
-    "Add Page Numbers",
-    "Delete a Page",
-    "Rotate PDF",
-    "Convert PDF to Word"
-]
-
-VIDEO_OPERATIONS = []
-
-# Check if video processing is available
-try:
-    from operations.videos import MOVIEPY_AVAILABLE
-    if MOVIEPY_AVAILABLE:
-        VIDEO_OPERATIONS = [
-            "Convert MP4 to MOV",
-            "Convert MOV to MP4",
-            "Convert TS to MP4",
-            "Convert MKV to MP4",
-            "Convert MP4 to WebM",
-            "Convert WebM to MP4",
-            "Convert GIF to MP4",
-            "Convert GIF to WebM",
-            "Convert MP4 to GIF",
-            "Convert MOV to GIF",
-            "Convert WebM to GIF",
-            "Compress Video"
-        ]
-except ImportError:
-    pass
+user_sessions = create_session_store(
+    STATE_BACKEND,
+    db_path=STATE_DB_PATH,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_entries=SESSION_MAX_ENTRIES,
+    stripes=SESSION_LOCK_STRIPES
+)
+
+# Conversions run in worker processes so the polling thread stays responsive
+conversion_pool = ConversionPool(
+    processes=CONVERSION_PROCESSES, max_tasks=CONVERSION_MAX_TASKS, timeout=CONVERSION_TIMEOUT,
+    reserved_light=CONVERSION_RESERVED_LIGHT, memory_mb=MEMORY_BUDGET_MB, admission_wait=MEMORY_ADMISSION_WAIT
+)
 
 # Helper function to identify file type
 def get_file_type(file_name):
     ext = os.path.splitext(file_name)[1].lower()
     
-    # Check if SVG support is available for .svg files
+    # SVG files are only accepted when a rasterizer is installed
     if ext == '.svg':
-        try:
-            from operations.images.svg_to_png import CAIROSVG_AVAILABLE
-            if CAIROSVG_AVAILABLE:
-                return "image"
-            else:
-                return "unsupported"
-        except ImportError:
-            return "unsupported"
+        return "image" if is_available('convert_svg_to_png') else "unsupported"
     
     if ext in SUPPORTED_IMAGE_EXTENSIONS:
         return "image"
@@ -110,141 +56,40 @@ def get_file_type(file_name):
         return "video"
     return "unsupported"
 
+# Helper buttons shown under each file type's operations
+HELP_BUTTONS = {
+    "image": ("💡 What's Best?", "suggest_image"),
+    "pdf": ("💡 PDF Tips", "pdf_tips"),
+    "video": ("💡 Video Tips", "video_tips")
+}
+
 # Function to create dynamic buttons based on file type
-def create_operation_buttons(file_type):
-    markup = InlineKeyboardMarkup(row_width=2)
-    operations = []
-
-    if file_type == "image":
-        operations = IMAGE_OPERATIONS
-        # Add emoji-rich buttons for images with descriptions
-        for i, op in enumerate(operations):
-            if "JPG to PNG" in op:
-                markup.add(InlineKeyboardButton("🔄 JPG → PNG (Transparent)", callback_data="convert_jpg_to_png"))
-            elif "PNG to JPG" in op:
-                markup.add(InlineKeyboardButton("🔄 PNG → JPG (Smaller)", callback_data="convert_png_to_jpg"))
-            elif "JPG to WebP" in op:
-                markup.add(InlineKeyboardButton("🚀 JPG → WebP (Ultra Small)", callback_data="convert_jpg_to_webp"))
-            elif "WebP to JPG" in op:
-                markup.add(InlineKeyboardButton("🔄 WebP → JPG (Universal)", callback_data="convert_webp_to_jpg"))
-            elif "Compress" in op:
-                markup.add(InlineKeyboardButton("🗜️ Smart Compress (60% smaller)", callback_data="compress_image"))
-            elif "SVG to PNG" in op:
-                markup.add(InlineKeyboardButton("🎨 SVG → PNG (Raster)", callback_data="convert_svg_to_png"))
-        
-        # Add helpful action buttons
-        markup.add(
-            InlineKeyboardButton("💡 What's Best?", callback_data="suggest_image"),
-            InlineKeyboardButton("🔙 Upload Different", callback_data="upload_new")
-        )
-        
-    elif file_type == "pdf":
-        operations = PDF_OPERATIONS
-        # Group PDF operations by category
-        markup.add(InlineKeyboardButton("🔄 Convert PDF → Word", callback_data="convert_pdf_to_word"))
-        markup.add(InlineKeyboardButton("🖼️ Convert PDF → Images", callback_data="convert_pdf_to_images"))
-        markup.add(InlineKeyboardButton("📄 Convert Image → PDF", callback_data="convert_image_to_pdf"))
-        markup.add(
-            InlineKeyboardButton("🗜️ Compress PDF", callback_data="compress_pdf"),
-            InlineKeyboardButton("🔒 Lock PDF", callback_data="lock_pdf")
-        )
-        markup.add(
-            InlineKeyboardButton("🔓 Unlock PDF", callback_data="unlock_pdf"),
-            InlineKeyboardButton("🔄 Rotate PDF", callback_data="rotate_pdf")
-        )
-        markup.add(
-            InlineKeyboardButton("📑 Merge PDFs", callback_data="merge_pdfs"),
-            InlineKeyboardButton("🔢 Add Page Numbers", callback_data="add_page_numbers")
-        )
-        markup.add(InlineKeyboardButton("🗑️ Delete Page", callback_data="delete_a_page"))
-        
-        # Add helper buttons
-        markup.add(
-            InlineKeyboardButton("💡 PDF Tips", callback_data="pdf_tips"),
-            InlineKeyboardButton("🔙 Upload Different", callback_data="upload_new")
-        )
-        
-    elif file_type == "video":
-        operations = VIDEO_OPERATIONS
-        # Create visually appealing video operation buttons
-        markup.add(InlineKeyboardButton("🎬 MP4 → MOV (Apple)", callback_data="convert_mp4_to_mov"))
-        markup.add(InlineKeyboardButton("🎬 MOV → MP4 (Universal)", callback_data="convert_mov_to_mp4"))
-        markup.add(
-            InlineKeyboardButton("📺 → MP4", callback_data="convert_ts_to_mp4"),
-            InlineKeyboardButton("🎥 MKV → MP4", callback_data="convert_mkv_to_mp4")
-        )
-        markup.add(
-            InlineKeyboardButton("🌐 MP4 → WebM", callback_data="convert_mp4_to_webm"),
-            InlineKeyboardButton("🌐 WebM → MP4", callback_data="convert_webm_to_mp4")
-        )
-        
-        # GIF operations with special styling
-        markup.add(InlineKeyboardButton("✨ === GIF MAGIC === ✨", callback_data="gif_header"))
-        markup.add(
-            InlineKeyboardButton("🎭 GIF → MP4", callback_data="convert_gif_to_mp4"),
-            InlineKeyboardButton("🎭 GIF → WebM", callback_data="convert_gif_to_webm")
-        )
-        markup.add(
-            InlineKeyboardButton("🎊 MP4 → GIF", callback_data="convert_mp4_to_gif"),
-            InlineKeyboardButton("🎊 MOV → GIF", callback_data="convert_mov_to_gif")
-        )
-        markup.add(InlineKeyboardButton("🎊 WebM → GIF", callback_data="convert_webm_to_gif"))
-        
-        markup.add(InlineKeyboardButton("🗜️ Compress Video", callback_data="compress_video"))
-        
-        # Add helper buttons
-        markup.add(
-            InlineKeyboardButton("💡 Video Tips", callback_data="video_tips"),
-            InlineKeyboardButton("🔙 Upload Different", callback_data="upload_new")
-        )
-    else:
+def create_operation_buttons(file_type, file_name=None):
+    if file_type not in HELP_BUTTONS:
         return None
-
+    
+    markup = InlineKeyboardMarkup(row_width=2)
+    
+    # Operations the registry has for this file, in rows of 2
+    operations = operations_for(file_name)
+    for i in range(0, len(operations), 2):
+        markup.add(*[
+            InlineKeyboardButton(operation.label, callback_data=operation.name)
+            for operation in operations[i:i + 2]
+        ])
+    
+    label, callback_data = HELP_BUTTONS[file_type]
+    markup.add(
+        InlineKeyboardButton(label, callback_data=callback_data),
+        InlineKeyboardButton("🔙 Upload Different", callback_data="upload_new")
+    )
+    
     return markup
 
 # Function to perform the actual conversion
 def perform_conversion(operation, input_path, output_path, **kwargs):
     """Route to appropriate conversion function based on operation"""
-    operation_map = {
-        # Image operations
-        'convert_jpg_to_png': convert_jpg_to_png,
-        'convert_png_to_jpg': convert_png_to_jpg,
-        'convert_jpg_to_webp': convert_jpg_to_webp,
-        'convert_webp_to_jpg': convert_webp_to_jpg,
-        'convert_svg_to_png': convert_svg_to_png,
-        'compress_image': lambda inp, out: compress_image(inp, out, quality=60),
-        
-        # PDF operations
-        'merge_pdfs': lambda inp, out: merge_pdfs([inp], out),
-        'convert_pdf_to_images': convert_pdf_to_images,
-        'convert_image_to_pdf': convert_image_to_pdf,
-        'compress_pdf': compress_pdf,
-        'lock_pdf': lambda inp, out: lock_pdf(inp, out, kwargs.get('password', 'default123')),
-        'unlock_pdf': lambda inp, out: unlock_pdf(inp, out, kwargs.get('password', 'default123')),
-        'add_page_numbers': add_page_numbers,
-        'delete_a_page': lambda inp, out: delete_pdf_page(inp, out, kwargs.get('page_number', 1)),
-        'rotate_pdf': rotate_pdf,
-        'convert_pdf_to_word': convert_pdf_to_word,
-        
-        # Video operations
-        'convert_mp4_to_mov': convert_mp4_to_mov,
-        'convert_mov_to_mp4': convert_mov_to_mp4,
-        'convert_ts_to_mp4': convert_ts_to_mp4,
-        'convert_mkv_to_mp4': convert_mkv_to_mp4,
-        'convert_mp4_to_webm': convert_mp4_to_webm,
-        'convert_webm_to_mp4': convert_webm_to_mp4,
-        'convert_gif_to_mp4': convert_gif_to_mp4,
-        'convert_gif_to_webm': convert_gif_to_webm,
-        'convert_mp4_to_gif': convert_mp4_to_gif,
-        'convert_mov_to_gif': convert_mov_to_gif,
-        'convert_webm_to_gif': convert_webm_to_gif,
-        'compress_video': compress_video,
-    }
-    
-    if operation in operation_map:
-        return operation_map[operation](input_path, output_path)
-    else:
-        return f"Operation {operation} not implemented yet"
+    return conversion_pool.run(operation, input_path, output_path, params=kwargs, progress=kwargs.get('progress'))
 
 # Start command handler
 @bot.message_handler(commands=['start'])
@@ -376,15 +221,16 @@ def handle_file(message):
             return
         
         # Store file information in user session
-        user_sessions[message.from_user.id] = {
-            'file_id': file_id,
-            'file_name': file_name,
-            'file_type': file_type,
-            'message_id': message.message_id
-        }
+        user_sessions.put(message.from_user.id, SessionRecord(
+            file_id=file_id,
+            file_name=file_name,
+            file_type=file_type,
+            file_size=file_size,
+            message_id=message.message_id
+        ))
         
         # Generate buttons for operations
-        markup = create_operation_buttons(file_type)
+        markup = create_operation_buttons(file_type, file_name)
         
         bot.reply_to(
             message, 
@@ -404,11 +250,21 @@ def handle_callback_query(call):
     operation = call.data
     
     # Check if user has a file session
-    if user_id not in user_sessions:
+    session = user_sessions.get(user_id)
+    if session is None:
         bot.answer_callback_query(call.id, "Please send a file first!")
         return
     
-    session = user_sessions[user_id]
+    # Helper buttons are not conversions; keep the session for the next choice
+    spec = find_operation(operation)
+    if spec is None:
+        bot.answer_callback_query(call.id, "Pick one of the conversions above.")
+        return
+    # Missing backends are reported before anything is downloaded
+    if not spec.available:
+        bot.answer_callback_query(call.id, "This operation is not available")
+        return
+    
     bot.answer_callback_query(call.id, f"🔄 Processing: {operation.replace('_', ' ').title()}")
     
     # Send processing message
@@ -418,59 +274,61 @@ def handle_callback_query(call):
     )
     
     try:
-        # Download the original file
-        input_path = temp_manager.create_temp_file(
-            extension=os.path.splitext(session['file_name'])[1],
-            prefix="input_"
-        )
-        
-        if not download_telegram_file(bot, session['file_id'], input_path):
-            raise Exception("Failed to download file")
-        
-        # Create output file path
-        output_filename = temp_manager.get_output_filename(session['file_name'], operation)
-        output_path = temp_manager.create_temp_file(
-            extension=os.path.splitext(output_filename)[1],
-            prefix="output_"
-        )
-        
-        # Perform the conversion
-        result = perform_conversion(operation, input_path, output_path)
-        
-        # Check if conversion was successful
-        if "Error" in result:
-            bot.edit_message_text(
-                f"❌ {result}",
-                call.message.chat.id,
-                processing_msg.message_id
-            )
-            return
-        
-        # Send the converted file
-        if os.path.exists(output_path):
-            with open(output_path, 'rb') as file:
-                bot.send_document(
+        # Everything this job writes lives in its own directory, removed when it ends
+        with temp_manager.job_dir(size_hint=session.get('file_size')) as job_dir:
+            # Download the original file
+            input_path = os.path.join(job_dir, f"input{os.path.splitext(session['file_name'])[1]}")
+            
+            if not download_telegram_file(bot, session['file_id'], input_path):
+                raise Exception("Failed to download file")
+            
+            # Create output file path
+            output_filename = temp_manager.get_output_filename(session['file_name'], operation)
+            output_path = os.path.join(job_dir, f"output{os.path.splitext(output_filename)[1]}")
+            
+            # Perform the conversion
+            result = perform_conversion(operation, input_path, output_path)
+            temp_manager.touch(job_dir)
+            
+            # Check if conversion was successful
+            if not result.ok:
+                bot.edit_message_text(
+                    f"❌ {result.message}",
                     call.message.chat.id,
-                    file,
-                    caption=f"✅ {SUCCESS_MESSAGES['conversion_complete']}\n\n📎 {output_filename}",
-                    parse_mode='Markdown'
+                    processing_msg.message_id
                 )
+                return
             
-            bot.edit_message_text(
-                "✅ File converted and sent successfully!",
-                call.message.chat.id,
-                processing_msg.message_id
-            )
-            
-            # Clean up files
-            cleanup_files([input_path, output_path])
+            # Send the converted file
+            if os.path.exists(output_path):
+                with open(output_path, 'rb') as file:
+                    bot.send_document(
+                        call.message.chat.id,
+                        file,
+                        caption=f"✅ {SUCCESS_MESSAGES['conversion_complete']}\n\n📎 {output_filename}",
+                        parse_mode='Markdown'
+                    )
+                
+                bot.edit_message_text(
+                    "✅ File converted and sent successfully!",
+                    call.message.chat.id,
+                    processing_msg.message_id
+                )
             
-        else:
-            bot.edit_message_text(
-                "❌ Conversion failed - output file not created",
-                call.message.chat.id,
-                processing_msg.message_id
-            )
+            else:
+                bot.edit_message_text(
+                    "❌ Conversion failed - output file not created",
+                    call.message.chat.id,
+                    processing_msg.message_id
+                )
+    
+    except TempSpaceError as e:
+        print(f"Refusing conversion: {e}")
+        bot.edit_message_text(
+            f"❌ {ERROR_MESSAGES['server_busy']}",
+            call.message.chat.id,
+            processing_msg.message_id
+        )
     
     except Exception as e:
         print(f"Error in conversion: {e}")
@@ -482,8 +340,7 @@ def handle_callback_query(call):
     
     finally:
         # Clean up session
-        if user_id in user_sessions:
-            del user_sessions[user_id]
+        user_sessions.pop(user_id)
 
 def cleanup_files(file_paths):
     """Clean up temporary files"""
@@ -499,6 +356,7 @@ def periodic_cleanup():
     while True:
         try:
             temp_manager.cleanup_old_files()
+            user_sessions.purge_expired()
             time.sleep(3600)  # Run every hour
         except Exception as e:
             print(f"Error in periodic cleanup: {e}")
@@ -3,6 +3,16 @@ from .settings import *
 
 __all__ = [
     'BOT_TOKEN',
+    'TELEGRAM_API_BASE_URL',
+    'TELEGRAM_CONNECT_TIMEOUT',
+    'TELEGRAM_READ_TIMEOUT',
+    'TELEGRAM_MAX_RETRIES',
+    'TELEGRAM_POOL_SIZE',
+    'TELEGRAM_GLOBAL_RATE',
+    'TELEGRAM_CHAT_RATE',
+    'TELEGRAM_CHAT_BURST',
+    'TELEGRAM_GROUP_RATE_PER_MINUTE',
+    'TELEGRAM_SENDER_THREADS',
     'MAX_FILE_SIZE_MB',
     'SUPPORTED_IMAGE_EXTENSIONS',
     'SUPPORTED_PDF_EXTENSIONS', 
@@ -10,7 +20,43 @@ __all__ = [
     'IMAGE_QUALITY',
     'VIDEO_QUALITY',
     'TEMP_DIR',
+    'TEMP_MAX_MB',
+    'TEMP_WAIT_SECONDS',
+    'TEMP_FAST_DIR',
+    'TEMP_FAST_MAX_MB',
+    'TEMP_FAST_BUDGET_MB',
     'CLEANUP_INTERVAL_HOURS',
+    'RESULT_CACHE_DIR',
+    'RESULT_CACHE_MAX_MB',
+    'SENT_FILE_INDEX_SIZE',
+    'INPUT_CACHE_DIR',
+    'INPUT_CACHE_MAX_MB',
+    'TELEGRAM_FILE_PATH_TTL',
+    'SESSION_TTL_SECONDS',
+    'SESSION_MAX_ENTRIES',
+    'SESSION_LOCK_STRIPES',
+    'STATE_BACKEND',
+    'STATE_DB_PATH',
+    'JOB_JOURNAL_PATH',
+    'JOB_LEASE_SECONDS',
+    'JOB_MAX_ATTEMPTS',
+    'STATS_DB_PATH',
+    'STATS_FLUSH_INTERVAL',
+    'JOB_WORKERS',
+    'JOB_QUEUE_SIZE',
+    'JOB_LIGHT_WORKERS',
+    'JOB_MEDIUM_WORKERS',
+    'JOB_HEAVY_WORKERS',
+    'GUNICORN_WORKERS',
+    'CONVERSION_PROCESSES',
+    'CONVERSION_MAX_TASKS',
+    'CONVERSION_TIMEOUT',
+    'CONVERSION_RESERVED_LIGHT',
+    'MEMORY_BUDGET_MB',
+    'MEMORY_ADMISSION_WAIT',
+    'PROGRESS_EDIT_INTERVAL',
+    'UPDATE_DEDUP_TTL_SECONDS',
+    'UPDATE_DEDUP_MAX_ENTRIES',
     'ERROR_MESSAGES',
     'SUCCESS_MESSAGES'
 ]
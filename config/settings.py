@@ -7,6 +7,21 @@ load_dotenv()
 # Bot configuration
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 
+# Telegram Bot API client settings; point the base URL at a local stand-in
+# (tools/fake_telegram_api.py) for load and integration testing
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org').rstrip('/')
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', 5))
+TELEGRAM_READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', 60))
+TELEGRAM_MAX_RETRIES = int(os.getenv('TELEGRAM_MAX_RETRIES', 3))
+TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', 16))
+
+# Outbound flood control (Telegram allows ~30 msg/s overall, ~1 msg/s per chat, 20 msg/min per group)
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+TELEGRAM_CHAT_BURST = float(os.getenv('TELEGRAM_CHAT_BURST', 3))
+TELEGRAM_GROUP_RATE_PER_MINUTE = float(os.getenv('TELEGRAM_GROUP_RATE_PER_MINUTE', 20))
+TELEGRAM_SENDER_THREADS = int(os.getenv('TELEGRAM_SENDER_THREADS', 4))
+
 # File size limits (in MB)
 MAX_FILE_SIZE_MB = 50
 
@@ -33,6 +48,91 @@ VIDEO_QUALITY = {
 TEMP_DIR = 'temp'
 CLEANUP_INTERVAL_HOURS = 24
 
+# Byte budget for the temp directory, enforced when jobs allocate space (0 = unlimited).
+# Jobs that do not fit wait up to TEMP_WAIT_SECONDS for running jobs, then are refused.
+TEMP_MAX_MB = int(os.getenv('TEMP_MAX_MB', 2048))
+TEMP_WAIT_SECONDS = float(os.getenv('TEMP_WAIT_SECONDS', 30))
+
+# Optional RAM-backed scratch root (e.g. /dev/shm) for jobs up to TEMP_FAST_MAX_MB,
+# holding at most TEMP_FAST_BUDGET_MB at once (further jobs use TEMP_DIR)
+TEMP_FAST_DIR = os.getenv('TEMP_FAST_DIR', '')
+TEMP_FAST_MAX_MB = int(os.getenv('TEMP_FAST_MAX_MB', 16))
+TEMP_FAST_BUDGET_MB = int(os.getenv('TEMP_FAST_BUDGET_MB', 128))
+
+# Conversion result cache (keyed by file_unique_id + operation + params).
+# Cache budgets are per container: with GUNICORN_WORKERS > 1 each worker keeps
+# its own slot directory under the cache dir with 1/GUNICORN_WORKERS of the budget.
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join(TEMP_DIR, 'cache', 'results'))
+RESULT_CACHE_MAX_MB = int(os.getenv('RESULT_CACHE_MAX_MB', 256))
+
+# Downloaded inputs are kept so retries and follow-up operations skip the download
+INPUT_CACHE_DIR = os.getenv('INPUT_CACHE_DIR', os.path.join(TEMP_DIR, 'cache', 'inputs'))
+INPUT_CACHE_MAX_MB = int(os.getenv('INPUT_CACHE_MAX_MB', 512))
+
+# Seconds a getFile file_path is reused (Telegram keeps links valid for an hour)
+TELEGRAM_FILE_PATH_TTL = int(os.getenv('TELEGRAM_FILE_PATH_TTL', 3500))
+
+# How many delivered output file_ids to remember for zero-upload resends
+SENT_FILE_INDEX_SIZE = int(os.getenv('SENT_FILE_INDEX_SIZE', 10000))
+
+# Pending uploads awaiting an operation choice
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', 3600))
+SESSION_MAX_ENTRIES = int(os.getenv('SESSION_MAX_ENTRIES', 10000))
+SESSION_LOCK_STRIPES = int(os.getenv('SESSION_LOCK_STRIPES', 16))
+
+# Where session state lives: 'memory' (single process) or 'sqlite' (shared by
+# every worker on this host; keep STATE_DB_PATH on local disk)
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')
+STATE_DB_PATH = os.getenv('STATE_DB_PATH', os.path.join(TEMP_DIR, 'state', 'state.db'))
+
+# Write-ahead journal of accepted jobs, replayed after a restart. Keep it on
+# disk that survives the instance (e.g. a mounted volume) to resume across instances.
+JOB_JOURNAL_PATH = os.getenv('JOB_JOURNAL_PATH', os.path.join(TEMP_DIR, 'state', 'jobs.db'))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 900))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 2))
+
+# Persistent per-user statistics, flushed to SQLite in batches
+STATS_DB_PATH = os.getenv('STATS_DB_PATH', os.path.join(TEMP_DIR, 'state', 'stats.db'))
+STATS_FLUSH_INTERVAL = int(os.getenv('STATS_FLUSH_INTERVAL', 10))
+
+# Background job queue settings (webhook mode)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', 100))
+
+# Jobs run in one lane per operation cost class (light/medium/heavy), each with
+# its own worker cap, so video transcodes cannot hold up image conversions.
+# JOB_QUEUE_SIZE bounds each lane's backlog.
+JOB_LIGHT_WORKERS = int(os.getenv('JOB_LIGHT_WORKERS', JOB_WORKERS))
+JOB_MEDIUM_WORKERS = int(os.getenv('JOB_MEDIUM_WORKERS', 2))
+JOB_HEAVY_WORKERS = int(os.getenv('JOB_HEAVY_WORKERS', 2))
+
+# Conversion worker processes; 0 starts one per available core, a negative
+# value runs conversions on the job thread. Workers are replaced after
+# CONVERSION_MAX_TASKS conversions or one running past CONVERSION_TIMEOUT.
+# CONVERSION_PROCESSES and MEMORY_BUDGET_MB are per container: with
+# GUNICORN_WORKERS > 1 each gunicorn worker gets 1/GUNICORN_WORKERS of the
+# processes (at least one) and of the memory budget.
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', 1))
+CONVERSION_PROCESSES = int(os.getenv('CONVERSION_PROCESSES', 0))
+CONVERSION_MAX_TASKS = int(os.getenv('CONVERSION_MAX_TASKS', 100))
+CONVERSION_TIMEOUT = float(os.getenv('CONVERSION_TIMEOUT', 600))
+# Worker processes only light operations may use while others are busy
+CONVERSION_RESERVED_LIGHT = int(os.getenv('CONVERSION_RESERVED_LIGHT', 1))
+
+# Memory admission control: conversions reserve their estimated peak memory
+# from this budget (0 takes 75% of the container limit, negative disables).
+# Jobs wait up to MEMORY_ADMISSION_WAIT seconds before lowered settings are tried,
+# and are refused (the user is asked to retry) after twice that.
+MEMORY_BUDGET_MB = int(os.getenv('MEMORY_BUDGET_MB', 0))
+MEMORY_ADMISSION_WAIT = float(os.getenv('MEMORY_ADMISSION_WAIT', 30))
+
+# Minimum seconds between progress message edits
+PROGRESS_EDIT_INTERVAL = float(os.getenv('PROGRESS_EDIT_INTERVAL', 3))
+
+# Webhook redelivery protection
+UPDATE_DEDUP_TTL_SECONDS = int(os.getenv('UPDATE_DEDUP_TTL_SECONDS', 3600))
+UPDATE_DEDUP_MAX_ENTRIES = int(os.getenv('UPDATE_DEDUP_MAX_ENTRIES', 10000))
+
 # Error messages
 ERROR_MESSAGES = {
     'unsupported_file': "Unsupported file type. Please send an image, PDF, or video file.",
@@ -40,6 +140,7 @@ ERROR_MESSAGES = {
     'download_failed': "Failed to download the file. Please try again.",
     'conversion_failed': "Conversion failed. Please check the file and try again.",
     'invalid_operation': "Invalid operation selected.",
+    'server_busy': "The server is busy right now. Please try again in a few minutes.",
 }
 
 # Success messages
@@ -6,9 +6,8 @@ Webhook-based architecture with Flask for optimal performance
 import os
 import json
 import logging
-import tempfile
 import threading
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import requests
 from datetime import datetime
 
@@ -19,73 +18,136 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Import our modules with fallback handling
-try:
-    from config import (
-        BOT_TOKEN, MAX_FILE_SIZE_MB, ERROR_MESSAGES, SUCCESS_MESSAGES,
-        SUPPORTED_IMAGE_EXTENSIONS, SUPPORTED_PDF_EXTENSIONS, SUPPORTED_VIDEO_EXTENSIONS
-    )
-    logger.info("✅ Config module imported successfully")
-except ImportError as e:
-    logger.error(f"❌ Failed to import config module: {e}")
-    # Fallback configuration for deployment
-    BOT_TOKEN = os.getenv('BOT_TOKEN')
-    MAX_FILE_SIZE_MB = 50
-    ERROR_MESSAGES = {'unsupported_file': 'Unsupported file type'}
-    SUCCESS_MESSAGES = {'file_received': 'File received successfully'}
-    SUPPORTED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
-    SUPPORTED_PDF_EXTENSIONS = ['.pdf']
-    SUPPORTED_VIDEO_EXTENSIONS = ['.mp4', '.mov', '.webm']
+# Import our modules
+from config import (
+    BOT_TOKEN, TELEGRAM_API_BASE_URL, MAX_FILE_SIZE_MB, ERROR_MESSAGES, SUCCESS_MESSAGES,
+    SUPPORTED_IMAGE_EXTENSIONS, SUPPORTED_PDF_EXTENSIONS, SUPPORTED_VIDEO_EXTENSIONS,
+    JOB_WORKERS, JOB_QUEUE_SIZE, UPDATE_DEDUP_TTL_SECONDS, UPDATE_DEDUP_MAX_ENTRIES,
+    TELEGRAM_CONNECT_TIMEOUT, TELEGRAM_READ_TIMEOUT, TELEGRAM_MAX_RETRIES, TELEGRAM_POOL_SIZE,
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST, TELEGRAM_GROUP_RATE_PER_MINUTE,
+    TELEGRAM_SENDER_THREADS, RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB, SENT_FILE_INDEX_SIZE,
+    INPUT_CACHE_DIR, INPUT_CACHE_MAX_MB, TELEGRAM_FILE_PATH_TTL, TEMP_FAST_DIR, TEMP_FAST_MAX_MB,
+    TEMP_FAST_BUDGET_MB, TEMP_MAX_MB, TEMP_WAIT_SECONDS,
+    SESSION_TTL_SECONDS, SESSION_MAX_ENTRIES, SESSION_LOCK_STRIPES,
+    STATE_BACKEND, STATE_DB_PATH, JOB_JOURNAL_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS,
+    CONVERSION_PROCESSES, CONVERSION_MAX_TASKS, CONVERSION_TIMEOUT, CONVERSION_RESERVED_LIGHT,
+    MEMORY_BUDGET_MB, MEMORY_ADMISSION_WAIT, GUNICORN_WORKERS,
+    JOB_LIGHT_WORKERS, JOB_MEDIUM_WORKERS, JOB_HEAVY_WORKERS
+)
+from utils.file_manager import temp_manager, TempSpaceError
+from utils.job_queue import LaneScheduler
+from utils.process_pool import ConversionPool, ConversionResult
+from utils.update_dedup import UpdateDeduplicator
+from utils.telegram_utils import stream_download
+from utils.telegram_api import TelegramBotAPI, TelegramAPIError
+from utils.outbound_scheduler import OutboundScheduler, PRIORITY_HIGH
+from utils.disk_cache import DiskLRUCache, conversion_cache_key
+from utils.sent_files import SentFileIndex, extract_file_id
+from utils.session_store import SessionRecord, create_session_store
+from utils.job_journal import (
+    JobJournal, JOB_DOWNLOADING, JOB_CONVERTING, JOB_UPLOADING
+)
+from utils.metrics import (
+    REGISTRY, JOB_STAGE_SECONDS, JOB_BYTES_IN, JOB_BYTES_OUT, JOB_ERRORS, JOBS_COMPLETED, JOBS_ACTIVE,
+    register_cache_metrics
+)
+from utils.tracing import trace, span
+from operations.registry import (
+    GROUPS, COST_LIGHT, COST_MEDIUM, COST_HEAVY, find_operation, group_available, available_operations,
+    operations_for
+)
 
-try:
-    from utils import temp_manager
-    logger.info("✅ Utils module imported successfully")
-except ImportError as e:
-    logger.warning(f"⚠️ Utils module not available: {e}")
-    # Create a simple temp manager fallback
-    class SimpleTempManager:
-        def create_temp_file(self, extension="", prefix="temp_"):
-            return tempfile.mktemp(suffix=extension, prefix=prefix)
-        def get_output_filename(self, original, operation):
-            return f"converted_{operation}_{original}"
-    temp_manager = SimpleTempManager()
-
-# Import operations with graceful fallback handling
-operations_available = {
-    'images': False,
-    'pdf': False,
-    'videos': False
-}
+# Operations are registered by name; their backends import on first use,
+# so cold starts do not pay for moviepy, PyMuPDF or cairosvg up front
+operations_available = {group: group_available(group) for group in GROUPS}
+logger.info(f"✅ Operations registered: {len(available_operations())} available")
 
-try:
-    from operations.images import *
-    operations_available['images'] = True
-    logger.info("✅ Image operations loaded")
-except ImportError as e:
-    logger.warning(f"⚠️ Image operations not available: {e}")
+# Initialize Flask app
+app = Flask(__name__)
 
-try:
-    from operations.pdf import *
-    operations_available['pdf'] = True
-    logger.info("✅ PDF operations loaded")
-except ImportError as e:
-    logger.warning(f"⚠️ PDF operations not available: {e}")
+# Shared keep-alive Telegram Bot API client
+telegram_api = TelegramBotAPI(
+    BOT_TOKEN,
+    base_url=TELEGRAM_API_BASE_URL,
+    connect_timeout=TELEGRAM_CONNECT_TIMEOUT,
+    read_timeout=TELEGRAM_READ_TIMEOUT,
+    max_retries=TELEGRAM_MAX_RETRIES,
+    pool_size=TELEGRAM_POOL_SIZE,
+    file_path_ttl=TELEGRAM_FILE_PATH_TTL
+)
 
-try:
-    from operations.videos import *
-    operations_available['videos'] = True
-    logger.info("✅ Video operations loaded")
-except ImportError as e:
-    logger.warning(f"⚠️ Video operations not available: {e}")
+# Paces outgoing messages to stay inside Telegram's flood limits
+outbound = OutboundScheduler(
+    telegram_api,
+    global_rate=TELEGRAM_GLOBAL_RATE,
+    chat_rate=TELEGRAM_CHAT_RATE,
+    chat_burst=TELEGRAM_CHAT_BURST,
+    group_rate_per_minute=TELEGRAM_GROUP_RATE_PER_MINUTE,
+    senders=TELEGRAM_SENDER_THREADS,
+    rate_limit_retries=TELEGRAM_MAX_RETRIES
+)
 
-# Initialize Flask app
-app = Flask(__name__)
+# User sessions for file processing; shared by webhook threads (and, with the
+# sqlite backend, by every gunicorn worker), abandoned uploads expire
+user_sessions = create_session_store(
+    STATE_BACKEND,
+    db_path=STATE_DB_PATH,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_entries=SESSION_MAX_ENTRIES,
+    stripes=SESSION_LOCK_STRIPES
+)
+
+# Job scratch space: byte budget on disk, small jobs in RAM when configured
+temp_manager.set_fast_dir(TEMP_FAST_DIR, TEMP_FAST_MAX_MB * 1024 * 1024, TEMP_FAST_BUDGET_MB * 1024 * 1024)
+temp_manager.set_budget(TEMP_MAX_MB * 1024 * 1024, wait_seconds=TEMP_WAIT_SECONDS)
+
+# Repeat conversions of the same input are served from disk; each gunicorn
+# worker gets its own slot directory and share of the budget
+result_cache = DiskLRUCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB * 1024 * 1024, shares=GUNICORN_WORKERS)
+
+# Downloaded inputs, shared by every operation run on the same file
+input_cache = DiskLRUCache(INPUT_CACHE_DIR, INPUT_CACHE_MAX_MB * 1024 * 1024, shares=GUNICORN_WORKERS)
+
+# Outputs Telegram already stores are resent by file_id instead of uploaded again
+sent_files = SentFileIndex(max_entries=SENT_FILE_INDEX_SIZE)
+
+# Conversions run on background workers so the webhook can ack immediately,
+# in one lane per cost class so image jobs never wait behind video transcodes
+job_queue = LaneScheduler({
+    COST_LIGHT: (JOB_LIGHT_WORKERS, JOB_QUEUE_SIZE),
+    COST_MEDIUM: (JOB_MEDIUM_WORKERS, JOB_QUEUE_SIZE),
+    COST_HEAVY: (JOB_HEAVY_WORKERS, JOB_QUEUE_SIZE)
+}, default_lane=COST_LIGHT, name="conversions")
+
+# CPU-bound conversions run in worker processes, off the request threads' GIL
+conversion_pool = ConversionPool(
+    processes=CONVERSION_PROCESSES, max_tasks=CONVERSION_MAX_TASKS, timeout=CONVERSION_TIMEOUT,
+    reserved_light=CONVERSION_RESERVED_LIGHT, memory_mb=MEMORY_BUDGET_MB, admission_wait=MEMORY_ADMISSION_WAIT,
+    # Every gunicorn worker builds its own pool; split the container between them
+    shares=GUNICORN_WORKERS
+)
+
+# Accepted jobs are journaled first so a restart can resume them
+job_journal = JobJournal(JOB_JOURNAL_PATH, lease_seconds=JOB_LEASE_SECONDS)
+jobs_recovered = threading.Event()
+recovery_lock = threading.Lock()
 
-# Telegram API base URL
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
+# Telegram redelivers updates it did not see acked in time; drop repeats
+update_deduplicator = UpdateDeduplicator(
+    ttl_seconds=UPDATE_DEDUP_TTL_SECONDS,
+    max_entries=UPDATE_DEDUP_MAX_ENTRIES
+)
 
-# User sessions for file processing
-user_sessions = {}
+# Scrape-time gauges for /metrics; job counters are updated by the handlers
+REGISTRY.gauge('bot_job_queue_depth', 'Conversion jobs waiting for a worker', callback=job_queue.pending)
+REGISTRY.gauge('bot_job_lane_depth', 'Conversion jobs waiting for a worker, per cost lane', ('lane',),
+               callback=job_queue.lane_pending)
+JOBS_ACTIVE.callback = job_queue.active
+REGISTRY.gauge('bot_outbound_pending', 'Telegram calls waiting for rate-limit capacity',
+               callback=lambda: outbound.stats()['pending'])
+REGISTRY.gauge('bot_conversion_workers_busy', 'Conversion worker processes running a job',
+               callback=conversion_pool.busy)
+register_cache_metrics({'result': result_cache, 'input': input_cache, 'sent_files': sent_files})
 
 # UI/UX Constants following enhanced patterns
 EMOJIS = {
@@ -99,8 +161,12 @@ EMOJIS = {
     'magic': '✨'
 }
 
-def send_telegram_message(chat_id, text, reply_markup=None, parse_mode='Markdown'):
-    """Send message via Telegram API"""
+def send_telegram_message(chat_id, text, reply_markup=None, parse_mode='Markdown', wait=True):
+    """Send message via Telegram API.
+    
+    With wait=False the message is only queued: the webhook thread must not
+    block on a chat's flood control, so failures are logged when they happen.
+    """
     try:
         payload = {
             'chat_id': chat_id,
@@ -111,27 +177,34 @@ def send_telegram_message(chat_id, text, reply_markup=None, parse_mode='Markdown
         if reply_markup:
             payload['reply_markup'] = json.dumps(reply_markup)
         
-        response = requests.post(f"{TELEGRAM_API_URL}/sendMessage", data=payload)
-        response.raise_for_status()
-        return response.json()
+        future = outbound.send('sendMessage', data=payload, chat_id=chat_id)
+        if not wait:
+            future.add_done_callback(log_send_failure)
+            return None
+        return future.result()
     except Exception as e:
         logger.error(f"Failed to send message: {e}")
         return None
 
-def send_telegram_document(chat_id, file_path, caption=None):
+def log_send_failure(future):
+    """Done callback for messages queued without waiting"""
+    if future.exception() is not None:
+        logger.error(f"Failed to send message: {future.exception()}")
+
+def send_telegram_document(chat_id, file_path, caption=None, file_name=None, mime_type=None):
     """Send document via Telegram API"""
     try:
         with open(file_path, 'rb') as file:
-            files = {'document': file}
+            files = {'document': (file_name or os.path.basename(file_path), file, mime_type)}
             data = {'chat_id': chat_id}
             
             if caption:
                 data['caption'] = caption
                 data['parse_mode'] = 'Markdown'
             
-            response = requests.post(f"{TELEGRAM_API_URL}/sendDocument", files=files, data=data)
-            response.raise_for_status()
-            return response.json()
+            return outbound.send(
+                'sendDocument', data=data, files=files, chat_id=chat_id, priority=PRIORITY_HIGH
+            ).result()
     except Exception as e:
         logger.error(f"Failed to send document: {e}")
         return None
@@ -156,31 +229,9 @@ def get_file_type(file_name):
         return "video"
     return "unsupported"
 
-def create_operation_buttons(file_type):
-    """Create operation buttons based on file type"""
-    buttons = []
-    
-    if file_type == "image" and operations_available['images']:
-        buttons = [
-            [{"text": "🎨 Convert JPG to PNG", "callback_data": "convert_jpg_to_png"}],
-            [{"text": "🖼️ Convert PNG to JPG", "callback_data": "convert_png_to_jpg"}],
-            [{"text": "⚡ Convert to WebP", "callback_data": "convert_to_webp"}],
-            [{"text": "🗜️ Compress Image", "callback_data": "compress_image"}]
-        ]
-    elif file_type == "pdf" and operations_available['pdf']:
-        buttons = [
-            [{"text": "🖼️ PDF to Images", "callback_data": "convert_pdf_to_images"}],
-            [{"text": "📄 Image to PDF", "callback_data": "convert_image_to_pdf"}],
-            [{"text": "🗜️ Compress PDF", "callback_data": "compress_pdf"}],
-            [{"text": "📝 PDF to Word", "callback_data": "convert_pdf_to_word"}]
-        ]
-    elif file_type == "video" and operations_available['videos']:
-        buttons = [
-            [{"text": "🎬 Convert to MP4", "callback_data": "convert_to_mp4"}],
-            [{"text": "😂 Convert to GIF", "callback_data": "convert_to_gif"}],
-            [{"text": "🌐 Convert to WebM", "callback_data": "convert_to_webm"}],
-            [{"text": "🗜️ Compress Video", "callback_data": "compress_video"}]
-        ]
+def create_operation_buttons(file_name):
+    """Create operation buttons for the operations that accept this file"""
+    buttons = [[{"text": operation.label, "callback_data": operation.name}] for operation in operations_for(file_name)]
     
     if not buttons:
         buttons = [[{"text": "❌ No operations available", "callback_data": "no_ops"}]]
@@ -193,26 +244,10 @@ def create_operation_buttons(file_type):
 def process_file_conversion(operation, input_path, output_path):
     """Process file conversion based on operation type"""
     try:
-        # Enhanced conversion mapping following #copilot-instructions patterns
-        if operation == "convert_jpg_to_png" and operations_available['images']:
-            return convert_jpg_to_png(input_path, output_path)
-        elif operation == "convert_png_to_jpg" and operations_available['images']:
-            return convert_png_to_jpg(input_path, output_path)
-        elif operation == "compress_image" and operations_available['images']:
-            return compress_image(input_path, output_path, quality=60)
-        elif operation == "convert_pdf_to_images" and operations_available['pdf']:
-            return convert_pdf_to_images(input_path, output_path)
-        elif operation == "compress_pdf" and operations_available['pdf']:
-            return compress_pdf(input_path, output_path)
-        elif operation == "convert_to_mp4" and operations_available['videos']:
-            return convert_mov_to_mp4(input_path, output_path)
-        elif operation == "convert_to_gif" and operations_available['videos']:
-            return convert_mp4_to_gif(input_path, output_path)
-        else:
-            return "Error: Operation not available or not implemented"
+        return conversion_pool.run(operation, input_path, output_path)
     except Exception as e:
         logger.error(f"Conversion failed: {e}")
-        return f"Error: {str(e)}"
+        return ConversionResult(False, f"Error: {str(e)}", 0, 0.0, 0.0, None)
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
@@ -224,13 +259,33 @@ def webhook():
         if not update:
             return jsonify({"status": "error", "message": "No data received"}), 400
         
-        # Handle regular messages
-        if 'message' in update:
-            handle_message(update['message'])
-        
-        # Handle callback queries (button presses)
-        elif 'callback_query' in update:
-            handle_callback_query(update['callback_query'])
+        with trace(), span('webhook.receive', update_id=update.get('update_id')) as receive:
+            # Skip redelivered updates before doing any download or conversion work
+            if is_duplicate_update(update):
+                receive.set(duplicate=True)
+                return jsonify({"status": "ok", "duplicate": True}), 200
+            
+            # The update was marked seen above; if handling fails, forget it so
+            # Telegram's redelivery of the 500 is processed instead of dropped
+            try:
+                ensure_jobs_recovered()
+                
+                # Handle regular messages
+                if 'message' in update:
+                    handle_message(update['message'])
+                
+                # Handle callback queries (button presses) on the job queue
+                elif 'callback_query' in update:
+                    callback_query = update['callback_query']
+                    job_id = journal_callback(callback_query)
+                    receive.set(job_id=job_id)
+                    if not job_queue.submit(job_lane(callback_query.get('data')), handle_callback_query,
+                                            callback_query, job_id):
+                        job_journal.fail(job_id, "Rejected: job queue full")
+                        reject_busy_callback(callback_query)
+            except Exception:
+                forget_update(update)
+                raise
         
         return jsonify({"status": "ok"}), 200
         
@@ -238,6 +293,93 @@ def webhook():
         logger.error(f"Webhook error: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def forget_update(update):
+    """Undo is_duplicate_update for an update that could not be handled"""
+    update_deduplicator.forget(f"update:{update.get('update_id')}")
+    callback_query = update.get('callback_query')
+    if callback_query:
+        update_deduplicator.forget(f"callback:{callback_query.get('id')}")
+
+def is_duplicate_update(update):
+    """Check the update_id and callback query id against recently seen updates"""
+    update_id = update.get('update_id')
+    if update_id is not None and update_deduplicator.is_duplicate(f"update:{update_id}"):
+        logger.info(f"Dropping duplicate update {update_id}")
+        return True
+    
+    callback_query = update.get('callback_query')
+    if callback_query and update_deduplicator.is_duplicate(f"callback:{callback_query.get('id')}"):
+        logger.info(f"Dropping duplicate callback query {callback_query.get('id')}")
+        return True
+    
+    return False
+
+def job_lane(operation):
+    """Lane a callback runs in: the operation's cost class, light for buttons that convert nothing"""
+    spec = find_operation(operation) if operation else None
+    return spec.cost if spec else COST_LIGHT
+
+def journal_callback(callback_query):
+    """Write a conversion request to the job journal before it is queued"""
+    operation = callback_query.get('data')
+    if not operation or operation == "show_stats":
+        return None
+    
+    user_id = callback_query['from']['id']
+    session = user_sessions.get(user_id)
+    return job_journal.record(
+        user_id,
+        callback_query['message']['chat']['id'],
+        operation,
+        callback=callback_query,
+        session=session.to_dict() if session else None
+    )
+
+def ensure_jobs_recovered():
+    """Queue journal recovery once per process, after gunicorn has forked the worker"""
+    if jobs_recovered.is_set():
+        return
+    with recovery_lock:
+        if not jobs_recovered.is_set() and job_queue.submit(COST_LIGHT, recover_unfinished_jobs):
+            jobs_recovered.set()
+
+def recover_unfinished_jobs():
+    """Resume jobs a dead process left unfinished, or tell their users they failed"""
+    try:
+        claimed = job_journal.claim_unfinished()
+    except Exception as e:
+        logger.error(f"Job recovery failed: {e}")
+        return
+    
+    for job in claimed:
+        if job['job_dir']:
+            temp_manager.release(job['job_dir'])
+        
+        callback_query = job['callback']
+        if callback_query and job['session'] and job['attempts'] <= JOB_MAX_ATTEMPTS:
+            user_sessions.put(callback_query['from']['id'], SessionRecord.from_dict(job['session']))
+            if job_queue.submit(job_lane(job['operation']), handle_callback_query, callback_query, job['job_id']):
+                logger.info(f"Resuming {job['operation']} job {job['job_id']} (was {job['state']})")
+                continue
+        
+        job_journal.fail(job['job_id'], "Interrupted by a restart")
+        send_telegram_message(
+            job['chat_id'],
+            f"{EMOJIS['error']} Your {job['operation'].replace('_', ' ').title()} conversion was "
+            f"interrupted by a server restart. Please send the file again."
+        )
+
+def reject_busy_callback(callback_query):
+    """Tell the user the server is at capacity instead of queueing the job"""
+    try:
+        telegram_api.call('answerCallbackQuery', data={
+            'callback_query_id': callback_query['id'],
+            'text': f"{EMOJIS['processing']} Server is busy right now. Please try again in a minute.",
+            'show_alert': 'true'
+        }, timeout=5)
+    except Exception as e:
+        logger.error(f"Failed to answer busy callback: {e}")
+
 def handle_message(message):
     """Handle incoming Telegram messages"""
     try:
@@ -258,7 +400,7 @@ Upload any file to get started:
 
 *Just send me a file and watch the magic happen!* ✨
             """
-            send_telegram_message(chat_id, welcome_text)
+            send_telegram_message(chat_id, welcome_text, wait=False)
             return
         
         # Handle file uploads
@@ -276,7 +418,7 @@ Upload any file to get started:
 
 *Just drag and drop your file here!* 📁
         """
-        send_telegram_message(chat_id, help_text)
+        send_telegram_message(chat_id, help_text, wait=False)
         
     except Exception as e:
         logger.error(f"Message handling error: {e}")
@@ -297,10 +439,11 @@ def handle_file_upload(message):
             file_info = message['video']
         
         if not file_info:
-            send_telegram_message(chat_id, f"{EMOJIS['error']} No file detected. Please try again.")
+            send_telegram_message(chat_id, f"{EMOJIS['error']} No file detected. Please try again.", wait=False)
             return
         
         file_id = file_info['file_id']
+        file_unique_id = file_info.get('file_unique_id')
         file_name = file_info.get('file_name', f"file_{file_id}")
         file_size = file_info.get('file_size', 0)
         
@@ -308,7 +451,8 @@ def handle_file_upload(message):
         if file_size > MAX_FILE_SIZE_MB * 1024 * 1024:
             send_telegram_message(
                 chat_id, 
-                f"{EMOJIS['error']} File too large! Max size: {MAX_FILE_SIZE_MB}MB"
+                f"{EMOJIS['error']} File too large! Max size: {MAX_FILE_SIZE_MB}MB",
+                wait=False
             )
             return
         
@@ -318,18 +462,20 @@ def handle_file_upload(message):
         if file_type == "unsupported":
             send_telegram_message(
                 chat_id,
-                f"{EMOJIS['error']} Unsupported file type. Please send an image, PDF, or video."
+                f"{EMOJIS['error']} Unsupported file type. Please send an image, PDF, or video.",
+                wait=False
             )
             return
         
         # Store file session
-        user_sessions[user_id] = {
-            'file_id': file_id,
-            'file_name': file_name,
-            'file_type': file_type,
-            'file_size': file_size,
-            'chat_id': chat_id
-        }
+        user_sessions.put(user_id, SessionRecord(
+            file_id=file_id,
+            file_unique_id=file_unique_id,
+            file_name=file_name,
+            file_type=file_type,
+            file_size=file_size,
+            chat_id=chat_id
+        ))
         
         # Send operation options
         size_mb = file_size / (1024 * 1024)
@@ -343,15 +489,25 @@ def handle_file_upload(message):
 *Choose your operation:* {EMOJIS['magic']}
         """
         
-        reply_markup = create_operation_buttons(file_type)
-        send_telegram_message(chat_id, success_text, reply_markup)
+        reply_markup = create_operation_buttons(file_name)
+        send_telegram_message(chat_id, success_text, reply_markup, wait=False)
         
     except Exception as e:
         logger.error(f"File upload handling error: {e}")
-        send_telegram_message(message['chat']['id'], f"{EMOJIS['error']} Error processing file. Please try again.")
-
-def handle_callback_query(callback_query):
-    """Handle button press callbacks"""
+        send_telegram_message(message['chat']['id'], f"{EMOJIS['error']} Error processing file. Please try again.",
+                              wait=False)
+
+def handle_callback_query(callback_query, job_id=None):
+    """Handle button press callbacks; job_id is the journal entry for conversion requests"""
+    # The journal id doubles as the correlation id of the job's spans
+    # Renewing the journal lease keeps other instances from claiming a long job
+    with trace(job_id), span('job', operation=callback_query.get('data'), job_id=job_id), \
+            job_journal.keep_alive(job_id):
+        process_callback_query(callback_query, job_id)
+
+def process_callback_query(callback_query, job_id=None):
+    """Run a button press, answering the query and converting the user's upload"""
+    stage = 'setup'
     try:
         query_id = callback_query['id']
         user_id = callback_query['from']['id']
@@ -359,10 +515,13 @@ def handle_callback_query(callback_query):
         operation = callback_query['data']
         
         # Answer callback query
-        requests.post(f"{TELEGRAM_API_URL}/answerCallbackQuery", data={
-            'callback_query_id': query_id,
-            'text': f"🔄 Processing: {operation.replace('_', ' ').title()}"
-        })
+        try:
+            telegram_api.call('answerCallbackQuery', data={
+                'callback_query_id': query_id,
+                'text': f"🔄 Processing: {operation.replace('_', ' ').title()}"
+            })
+        except Exception as e:
+            logger.warning(f"Failed to answer callback query: {e}")
         
         # Handle stats request
         if operation == "show_stats":
@@ -380,13 +539,28 @@ def handle_callback_query(callback_query):
             send_telegram_message(chat_id, stats_text)
             return
         
+        # Older keyboards may send an alias; metrics and cache keys use the registered name
+        spec = find_operation(operation)
+        if spec is None:
+            job_journal.fail(job_id, f"Unknown operation: {operation}")
+            send_telegram_message(chat_id, f"{EMOJIS['error']} Operation not available or not implemented")
+            return
+        operation = spec.name
+        
+        # Missing backends fail before anything is downloaded
+        if not spec.available:
+            job_journal.fail(job_id, spec.missing)
+            send_telegram_message(chat_id, f"{EMOJIS['error']} This operation is not available on this server right now.")
+            return
+        
         # Check if user has uploaded a file
-        if user_id not in user_sessions:
+        with span('session.lookup'):
+            session = user_sessions.get(user_id)
+        if session is None:
+            job_journal.fail(job_id, "No upload session")
             send_telegram_message(chat_id, f"{EMOJIS['error']} Please upload a file first!")
             return
         
-        session = user_sessions[user_id]
-        
         # Send processing message
         processing_text = f"""
 {EMOJIS['processing']} **Processing Your File...**
@@ -399,69 +573,199 @@ def handle_callback_query(callback_query):
         
         send_telegram_message(chat_id, processing_text)
         
-        # Download file from Telegram
-        file_response = requests.get(f"{TELEGRAM_API_URL}/getFile?file_id={session['file_id']}")
-        file_data = file_response.json()
+        cache_key = conversion_cache_key(session.get('file_unique_id'), operation, spec.resolve_params())
+        
+        # Outputs delivered before only need a file_id reference, no upload
+        with span('upload', source='file_id') as resend:
+            resent = resend_known_result(chat_id, operation, cache_key)
+            resend.set(resent=resent)
+        if resent:
+            logger.info(f"Resent {operation} result by file_id")
+            JOBS_COMPLETED.inc(operation=operation, source='file_id')
+            job_journal.finish(job_id)
+            user_sessions.pop(user_id)
+            return
         
-        if not file_data.get('ok'):
-            send_telegram_message(chat_id, f"{EMOJIS['error']} Failed to download file.")
+        # Serve repeat conversions straight from the result cache; the entry is
+        # pinned so a concurrent put() cannot evict it mid-upload
+        cached_path = result_cache.acquire(cache_key)
+        if cached_path:
+            logger.info(f"Result cache hit for {operation}")
+            job_journal.update(job_id, JOB_UPLOADING)
+            try:
+                with span('upload', source='result_cache') as upload, \
+                        JOB_STAGE_SECONDS.time(operation=operation, stage='upload'):
+                    delivered = deliver_result(chat_id, operation, session, cached_path, cache_key)
+                    if not delivered:
+                        upload.fail("sendDocument failed")
+            finally:
+                result_cache.release(cache_key)
+            if not delivered:
+                report_upload_failure(chat_id, operation, job_id)
+                return
+            JOBS_COMPLETED.inc(operation=operation, source='result_cache')
+            job_journal.finish(job_id)
+            user_sessions.pop(user_id)
             return
         
-        file_path = file_data['result']['file_path']
-        download_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
+        # A copy downloaded for an earlier operation on the same file is reused;
+        # it stays checked out of the input cache until the conversion is done
+        input_key = session.get('file_unique_id')
+        input_path = input_cache.acquire(input_key)
         
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(session['file_name'])[1]) as input_file:
-            input_path = input_file.name
-            
-            # Download file content
-            file_content = requests.get(download_url).content
-            input_file.write(file_content)
-        
-        # Create output file path
-        output_ext = ".png" if "png" in operation else ".jpg" if "jpg" in operation else ".pdf" if "pdf" in operation else ".mp4"
-        output_path = input_path.replace(os.path.splitext(input_path)[1], output_ext)
-        
-        # Process conversion
-        result = process_file_conversion(operation, input_path, output_path)
-        
-        if "Error" in result:
-            send_telegram_message(chat_id, f"{EMOJIS['error']} {result}")
-        else:
-            # Send converted file
-            if os.path.exists(output_path):
-                output_filename = f"converted_{operation}_{os.path.basename(session['file_name'])}"
-                output_filename = output_filename.replace(os.path.splitext(output_filename)[1], output_ext)
+        # Everything this job writes lives in its own directory, removed when it ends
+        try:
+            with temp_manager.job_dir(size_hint=session.get('file_size')) as job_dir:
+                if not input_path:
+                    stage = 'download'
+                    job_journal.update(job_id, JOB_DOWNLOADING, job_dir=job_dir)
+                    
+                    # Download file from Telegram
+                    with span('download'), JOB_STAGE_SECONDS.time(operation=operation, stage='download'):
+                        try:
+                            with span('telegram.getFile'):
+                                file_data = telegram_api.get_file(session['file_id'])
+                        except (TelegramAPIError, requests.RequestException) as e:
+                            logger.error(f"getFile failed: {e}")
+                            JOB_ERRORS.inc(operation=operation, stage=stage)
+                            job_journal.fail(job_id, f"getFile failed: {e}")
+                            send_telegram_message(chat_id, f"{EMOJIS['error']} Failed to download file.")
+                            return
+                        
+                        download_url = telegram_api.file_url(file_data['file_path'])
+                        download_path = os.path.join(job_dir, f"input{os.path.splitext(session['file_name'])[1]}")
+                        
+                        expected_size = file_data.get('file_size') or session.get('file_size')
+                        with span('download.stream', expected_bytes=expected_size) as transfer:
+                            downloaded = stream_download(download_url, download_path, expected_size=expected_size,
+                                                         session=telegram_api.session)
+                            if not downloaded:
+                                transfer.fail("Download failed")
+                        if not downloaded:
+                            telegram_api.forget_file(session['file_id'])
+                            JOB_ERRORS.inc(operation=operation, stage=stage)
+                            job_journal.fail(job_id, "Download failed")
+                            send_telegram_message(chat_id, f"{EMOJIS['error']} Failed to download file.")
+                            return
+                    
+                    input_path = input_cache.put(input_key, download_path, pin=True, move=True) or download_path
+                
+                # Create output file path
+                output_ext = spec.output_extension(session['file_name'])
+                output_path = os.path.join(job_dir, f"output{output_ext}")
+                job_journal.update(
+                    job_id, JOB_CONVERTING, job_dir=job_dir, input_path=input_path, output_path=output_path
+                )
                 
-                success_caption = f"""
+                # Process conversion
+                stage = 'convert'
+                JOB_BYTES_IN.inc(os.path.getsize(input_path), operation=operation)
+                with span('convert') as conversion, JOB_STAGE_SECONDS.time(operation=operation, stage=stage):
+                    result = process_file_conversion(operation, input_path, output_path)
+                    conversion.set(pid=result.pid, cpu_s=result.cpu_s)
+                    if not result.ok:
+                        conversion.fail(result.message)
+                # Account for what the job actually wrote, not just its reservation
+                temp_manager.touch(job_dir)
+                
+                if not result.ok:
+                    JOB_ERRORS.inc(operation=operation, stage=stage)
+                    job_journal.fail(job_id, result.message)
+                    send_telegram_message(chat_id, f"{EMOJIS['error']} {result.message}")
+                else:
+                    # Send converted file
+                    if os.path.exists(output_path):
+                        stage = 'upload'
+                        job_journal.update(job_id, JOB_UPLOADING)
+                        # Output made with lowered settings is not what the cache key describes
+                        if result.degraded:
+                            cache_key = None
+                        else:
+                            result_cache.put(cache_key, output_path)
+                        with span('upload', source='converted') as upload, \
+                                JOB_STAGE_SECONDS.time(operation=operation, stage=stage):
+                            delivered = deliver_result(chat_id, operation, session, output_path, cache_key)
+                            if not delivered:
+                                upload.fail("sendDocument failed")
+                        if delivered:
+                            JOBS_COMPLETED.inc(operation=operation, source='converted')
+                        else:
+                            report_upload_failure(chat_id, operation, job_id)
+                    else:
+                        JOB_ERRORS.inc(operation=operation, stage=stage)
+                        job_journal.fail(job_id, "Output file not found")
+                        send_telegram_message(chat_id, f"{EMOJIS['error']} Conversion completed but file not found.")
+        finally:
+            input_cache.release(input_key)
+        
+        # Remove user session
+        user_sessions.pop(user_id)
+        job_journal.finish(job_id)
+        
+    except TempSpaceError as e:
+        logger.warning(f"Refusing job {job_id}: {e}")
+        JOB_ERRORS.inc(operation=callback_query.get('data', ''), stage='temp_space')
+        job_journal.fail(job_id, e)
+        send_telegram_message(callback_query['message']['chat']['id'], f"{EMOJIS['error']} {ERROR_MESSAGES['server_busy']}")
+    except Exception as e:
+        logger.error(f"Callback query handling error: {e}")
+        JOB_ERRORS.inc(operation=callback_query.get('data', ''), stage=stage)
+        job_journal.fail(job_id, e)
+        send_telegram_message(callback_query['message']['chat']['id'], f"{EMOJIS['error']} Processing failed. Please try again.")
+
+def build_result_caption(operation, output_filename):
+    """Caption attached to a delivered conversion result"""
+    return f"""
 {EMOJIS['success']} **Conversion Complete!**
 
 🎯 **Operation:** {operation.replace('_', ' ').title()}
 📁 **Result:** `{output_filename}`
 
 {EMOJIS['fire']} *Ready for download!*
-                """
-                
-                send_telegram_document(chat_id, output_path, success_caption)
-            else:
-                send_telegram_message(chat_id, f"{EMOJIS['error']} Conversion completed but file not found.")
-        
-        # Cleanup temporary files
-        try:
-            if os.path.exists(input_path):
-                os.unlink(input_path)
-            if os.path.exists(output_path):
-                os.unlink(output_path)
-        except Exception as e:
-            logger.warning(f"Cleanup failed: {e}")
-        
-        # Remove user session
-        if user_id in user_sessions:
-            del user_sessions[user_id]
-        
+    """
+
+def deliver_result(chat_id, operation, session, output_path, cache_key=None):
+    """Send a converted file to the user with the completion caption; None if the upload failed"""
+    output_ext = os.path.splitext(output_path)[1]
+    base_name = os.path.splitext(os.path.basename(session['file_name']))[0]
+    output_filename = f"converted_{operation}_{base_name}{output_ext}"
+    
+    result = send_telegram_document(
+        chat_id, output_path, build_result_caption(operation, output_filename), file_name=output_filename,
+        mime_type=find_operation(operation).output_mime(session['file_name'])
+    )
+    if result is None:
+        return None
+    output_size = os.path.getsize(output_path)
+    sent_files.remember(cache_key, extract_file_id(result), output_filename, output_size)
+    JOB_BYTES_OUT.inc(output_size, operation=operation)
+    return result
+
+def report_upload_failure(chat_id, operation, job_id):
+    """Count, journal and report a result that could not be sent"""
+    JOB_ERRORS.inc(operation=operation, stage='upload')
+    job_journal.fail(job_id, "Upload failed")
+    send_telegram_message(chat_id, f"{EMOJIS['error']} Failed to send the converted file. Please try again.")
+
+def resend_known_result(chat_id, operation, cache_key):
+    """Resend a previously delivered result by file_id; False if there is none or Telegram rejects it"""
+    sent_file = sent_files.get(cache_key)
+    if not sent_file:
+        return False
+    
+    data = {
+        'chat_id': chat_id,
+        'document': sent_file.file_id,
+        'caption': build_result_caption(operation, sent_file.file_name),
+        'parse_mode': 'Markdown'
+    }
+    try:
+        outbound.send('sendDocument', data=data, chat_id=chat_id, priority=PRIORITY_HIGH).result()
+        return True
     except Exception as e:
-        logger.error(f"Callback query handling error: {e}")
-        send_telegram_message(callback_query['message']['chat']['id'], f"{EMOJIS['error']} Processing failed. Please try again.")
+        logger.warning(f"Stored file_id rejected, uploading again: {e}")
+        sent_files.forget(cache_key)
+        return False
 
 @app.route('/health')
 def health_check():
@@ -472,6 +776,14 @@ def health_check():
             "status": "healthy",
             "service": "telegram-file-converter",
             "operations_available": operations_available,
+            "job_queue": job_queue.stats(),
+            "conversion_pool": conversion_pool.stats(),
+            "outbound": outbound.stats(),
+            "result_cache": result_cache.stats(),
+            "input_cache": input_cache.stats(),
+            "temp_files": temp_manager.stats(),
+            "job_journal": job_journal.stats(),
+            "sent_files": sent_files.stats(),
             "timestamp": datetime.now().isoformat()
         }), 200
         
@@ -479,6 +791,11 @@ def health_check():
         logger.error(f"Health check failed: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint; values are per process, so scrape each worker"""
+    return Response(REGISTRY.render(), content_type=REGISTRY.CONTENT_TYPE)
+
 @app.route('/ready')
 def readiness_check():
     """Readiness check endpoint - more thorough validation"""
@@ -488,15 +805,14 @@ def readiness_check():
             return jsonify({"status": "error", "message": "Bot token not configured"}), 500
         
         # Test Telegram API connectivity
-        response = requests.get(f"{TELEGRAM_API_URL}/getMe", timeout=5)
-        bot_info = response.json()
-        
-        if not bot_info.get('ok'):
+        try:
+            bot_info = telegram_api.call('getMe', timeout=5)
+        except TelegramAPIError:
             return jsonify({"status": "error", "message": "Telegram API unreachable"}), 500
         
         return jsonify({
             "status": "ready",
-            "bot_username": bot_info['result'].get('username'),
+            "bot_username": bot_info.get('username'),
             "operations_available": operations_available,
             "timestamp": datetime.now().isoformat()
         }), 200
@@ -513,7 +829,7 @@ def set_webhook():
         if not webhook_url:
             return jsonify({"status": "error", "message": "webhook_url required"}), 400
         
-        response = requests.post(f"{TELEGRAM_API_URL}/setWebhook", data={
+        response = telegram_api.request('POST', telegram_api.method_url('setWebhook'), data={
             'url': webhook_url
         })
         
@@ -557,18 +873,12 @@ def initialize_app():
     try:
         # Quick bot connectivity test
         logger.info("🔍 Testing bot connectivity...")
-        test_response = requests.get(f"{TELEGRAM_API_URL}/getMe", timeout=10)
-        if test_response.status_code == 200:
-            bot_info = test_response.json()
-            if bot_info.get('ok'):
-                logger.info(f"✅ Bot connected: @{bot_info.get('result', {}).get('username', 'unknown')}")
-            else:
-                logger.error(f"❌ Bot API error: {bot_info}")
-                raise ValueError("Bot API validation failed")
-        else:
-            logger.error(f"❌ Bot API test failed: {test_response.status_code}")
-            raise ValueError("Bot API connectivity failed")
+        bot_info = telegram_api.call('getMe', timeout=10)
+        logger.info(f"✅ Bot connected: @{bot_info.get('username', 'unknown')}")
             
+    except TelegramAPIError as e:
+        logger.error(f"❌ Bot API error: {e}")
+        raise ValueError("Bot API validation failed")
     except requests.exceptions.RequestException as e:
         logger.error(f"❌ Bot connectivity test failed: {e}")
         raise ValueError(f"Bot connectivity failed: {e}")
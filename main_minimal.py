@@ -19,7 +19,9 @@ app = Flask(__name__)
 
 # Get configuration
 BOT_TOKEN = os.getenv('BOT_TOKEN')
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{BOT_TOKEN}" if BOT_TOKEN else None
+# Self-contained: the minimal image ships only this file and config/
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org').rstrip('/')
+TELEGRAM_API_URL = f"{TELEGRAM_API_BASE_URL}/bot{BOT_TOKEN}" if BOT_TOKEN else None
 
 @app.route('/health')
 def health_check():
@@ -51,7 +53,7 @@ def webhook():
             }
             
             if BOT_TOKEN:
-                requests.post(f"{TELEGRAM_API_URL}/sendMessage", data=payload)
+                requests.post(f"{TELEGRAM_API_URL}/sendMessage", data=payload, timeout=30)
         
         return jsonify({"status": "ok"}), 200
         
@@ -1,6 +1,14 @@
-# File conversion operations package
-from .images import *
-from .pdf import *
-from .videos import *
+# File conversion operations package. Nothing heavy is imported here:
+# subpackages and operation backends load on first attribute access.
+import importlib
+
+from .registry import OPERATIONS, GROUPS, get_operation, is_available, available_operations, group_available
 
 __all__ = ['images', 'pdf', 'videos']
+
+def __getattr__(name):
+    if name in GROUPS:
+        return importlib.import_module(f".{name}", __name__)
+    if name in OPERATIONS:
+        return OPERATIONS[name].load()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,188 @@
+"""
+Peak-memory estimates for conversions, from cheap header reads.
+
+Images are sized from their dimensions and mode, PDFs from page count and
+media box, videos from resolution, frame rate and duration. Nothing here
+decodes pixel data, so an estimate costs a few kilobytes of I/O. Inputs that
+cannot be probed fall back to a multiple of their file size.
+"""
+
+import logging
+import os
+import re
+import shutil
+import subprocess
+from typing import Optional
+
+from .registry import Operation, package_available
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Interpreter, imported backends and encoder state, independent of the input
+BASELINE_BYTES = 64 * MB
+
+# Bytes per pixel of decoded Pillow images
+MODE_BYTES = {'1': 1, 'L': 1, 'P': 1, 'LA': 2, 'I;16': 2, 'RGB': 3, 'YCbCr': 3, 'LAB': 3, 'HSV': 3,
+              'RGBA': 4, 'RGBa': 4, 'CMYK': 4, 'I': 4, 'F': 4}
+
+# Decoded frames ffmpeg and MoviePy keep in flight while transcoding (x264 lookahead, readers, writer)
+TRANSCODE_FRAMES = 48
+
+# MoviePy keeps at most this many seconds of video when writing a GIF
+GIF_MAX_SECONDS = 10
+
+# Admission control tries these in order until the estimate fits
+DOWNGRADES = {
+    'convert_pdf_to_images': ({'dpi': 150}, {'dpi': 100}, {'dpi': 72}),
+    'convert_mp4_to_gif': ({'max_width': 640, 'fps': 12}, {'max_width': 480, 'fps': 10},
+                           {'max_width': 320, 'fps': 8}),
+}
+DOWNGRADES['convert_mov_to_gif'] = DOWNGRADES['convert_webm_to_gif'] = DOWNGRADES['convert_mp4_to_gif']
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def probe_image(path: str) -> Optional[dict]:
+    """Width, height, mode and frame count from the image header"""
+    if not package_available('PIL'):
+        return None
+    try:
+        from PIL import Image
+        # open() reads the header only; pixels are decoded on load()
+        with Image.open(path) as image:
+            return {
+                'width': image.width,
+                'height': image.height,
+                'mode': image.mode,
+                'frames': getattr(image, 'n_frames', 1)
+            }
+    except Exception as e:
+        logger.debug(f"Cannot probe image {path}: {e}")
+        return None
+
+def probe_pdf(path: str) -> Optional[dict]:
+    """Page count and the first page's media box in points"""
+    if not package_available('PyPDF2'):
+        return None
+    try:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(path, strict=False)
+        box = reader.pages[0].mediabox if len(reader.pages) else None
+        return {
+            'pages': len(reader.pages),
+            'width': float(box.width) if box else 612.0,
+            'height': float(box.height) if box else 792.0
+        }
+    except Exception as e:
+        logger.debug(f"Cannot probe PDF {path}: {e}")
+        return None
+
+def _ffmpeg_binary() -> Optional[str]:
+    binary = shutil.which('ffmpeg')
+    if binary is None and package_available('imageio_ffmpeg'):
+        # MoviePy's own bundled ffmpeg
+        try:
+            import imageio_ffmpeg
+            binary = imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            binary = None
+    return binary
+
+def probe_video(path: str) -> Optional[dict]:
+    """Resolution, frame rate and duration from the container header, as MoviePy reads them"""
+    binary = _ffmpeg_binary()
+    if binary is None:
+        return None
+    try:
+        # Without an output ffmpeg prints the stream info and exits
+        info = subprocess.run([binary, '-hide_banner', '-i', path], capture_output=True, text=True,
+                              timeout=15).stderr
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.debug(f"Cannot probe video {path}: {e}")
+        return None
+    
+    stream = re.search(r"Stream #.*Video:.*?(\d{2,5})x(\d{2,5})", info)
+    if stream is None:
+        return None
+    duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", info)
+    fps = re.search(r"(\d+(?:\.\d+)?) fps", info)
+    return {
+        'width': int(stream.group(1)),
+        'height': int(stream.group(2)),
+        'fps': float(fps.group(1)) if fps else 25.0,
+        'duration': (int(duration.group(1)) * 3600 + int(duration.group(2)) * 60 + float(duration.group(3))
+                     if duration else 0.0)
+    }
+
+def probe(operation: Operation, path: str) -> dict:
+    """Header facts for one input; always includes its size in bytes"""
+    facts = None
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        facts = probe_pdf(path)
+    elif operation.group == 'videos' and extension != '.gif':
+        facts = probe_video(path)
+    elif extension != '.svg':
+        facts = probe_image(path)
+    return {**(facts or {}), 'bytes': _file_size(path)}
+
+def _raster_bytes(facts: dict, output_extension: str) -> int:
+    pixels = facts['width'] * facts['height']
+    decoded = pixels * MODE_BYTES.get(facts['mode'], 4)
+    # The converted copy coexists with the decoded one; PNG output is converted to RGBA
+    converted = pixels * (4 if output_extension == '.png' else 3)
+    return decoded + converted
+
+def _video_bytes(operation: Operation, facts: dict, params: dict) -> int:
+    width, height = facts['width'], facts['height']
+    if operation.output == '.gif':
+        # The GIF writer holds every frame until it encodes, after scaling down
+        max_width = params.get('max_width', 800)
+        if width > max_width:
+            width, height = max_width, int(height * max_width / width)
+        seconds = min(facts['duration'] or GIF_MAX_SECONDS, GIF_MAX_SECONDS)
+        frames = seconds * min(params.get('fps', 15), facts['fps'])
+        return int(frames * width * height * 3 * 2)
+    return width * height * 3 * TRANSCODE_FRAMES
+
+def _input_bytes(operation: Operation, path: str, facts: dict, params: dict) -> int:
+    if operation.group == 'videos' and 'duration' in facts:
+        return _video_bytes(operation, facts, params)
+    
+    if 'pages' in facts:
+        if operation.name == 'convert_pdf_to_images':
+            # pdf2image returns every page rendered at once
+            dpi = params.get('dpi', 200)
+            page = (facts['width'] / 72 * dpi) * (facts['height'] / 72 * dpi) * 3
+            return int(facts['pages'] * page * 2)
+        if operation.name == 'convert_pdf_to_word':
+            # Layout analysis keeps per-page text and image blocks
+            return facts['bytes'] * 4 + facts['pages'] * 2 * MB
+        return facts['bytes'] * 3 + facts['pages'] * 64 * 1024
+    
+    if 'mode' in facts:
+        if operation.group == 'videos':
+            # An animated GIF decoded frame by frame for the video encoder
+            return facts['width'] * facts['height'] * 3 * min(facts['frames'], TRANSCODE_FRAMES)
+        return _raster_bytes(facts, operation.output_extension(path))
+    
+    # Unprobed input: compressed media expands several times when decoded
+    return facts['bytes'] * (20 if operation.group == 'videos' else 10)
+
+def estimate_from_facts(operation: Operation, paths: list, facts: list, params: Optional[dict] = None) -> int:
+    params = operation.resolve_params(params)
+    return BASELINE_BYTES + sum(_input_bytes(operation, path, fact, params) for path, fact in zip(paths, facts))
+
+def estimate_peak_bytes(operation: Operation, input_path, params: Optional[dict] = None) -> int:
+    """Estimated peak memory of running operation on input_path (a path or a list of paths)"""
+    paths = input_path if isinstance(input_path, (list, tuple)) else [input_path]
+    return estimate_from_facts(operation, paths, [probe(operation, path) for path in paths], params)
+
+def downgrades(operation: Operation) -> tuple:
+    """Parameter overrides that lower an operation's peak memory, mildest first"""
+    return DOWNGRADES.get(operation.name, ())
@@ -1,27 +1,9 @@
-# PDF processing operations
-from .merge_pdfs import merge_pdfs
-from .pdf_to_image import convert_pdf_to_images
-from .image_to_pdf import convert_image_to_pdf, convert_images_to_pdf
-from .compress_pdf import compress_pdf
-from .lock_pdf import lock_pdf
-from .unlock_pdf import unlock_pdf
-from .add_page_numbers import add_page_numbers
-from .delete_pdf_page import delete_pdf_page
-from .rotate_pdf import rotate_pdf
-from .word_to_pdf import convert_word_to_pdf
-from .pdf_to_word import convert_pdf_to_word
+# PDF processing operations, imported on first access (see operations.registry)
+from ..registry import OPERATIONS, group_exports
 
-__all__ = [
-    'merge_pdfs',
-    'convert_pdf_to_images',
-    'convert_image_to_pdf',
-    'convert_images_to_pdf',
-    'compress_pdf',
-    'lock_pdf',
-    'unlock_pdf',
-    'add_page_numbers',
-    'delete_pdf_page',
-    'rotate_pdf',
-    'convert_word_to_pdf',
-    'convert_pdf_to_word'
-]
+__all__ = group_exports('pdf')
+
+def __getattr__(name):
+    if name in __all__:
+        return OPERATIONS[name].load()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,9 @@
 from pdf2image import convert_from_path
 import os
 
-def convert_pdf_to_images(input_path, output_dir, format='PNG'):
+def convert_pdf_to_images(input_path, output_dir, format='PNG', dpi=200):
     try:
-        pages = convert_from_path(input_path)
+        pages = convert_from_path(input_path, dpi=dpi)
         output_paths = []
         
         os.makedirs(output_dir, exist_ok=True)
@@ -0,0 +1,324 @@
+"""
+Registry of every conversion operation, known by name without importing it.
+
+Each operation declares its inputs, output type, parameters and cost class
+here, so dispatch, output naming and cache keys share one definition.
+Availability comes from importlib.util.find_spec, which locates installed
+packages without running them; the backend module (moviepy, pdf2docx,
+PyMuPDF, cairosvg, ...) is imported the first time an operation is called.
+"""
+
+import importlib
+import importlib.util
+import logging
+import os
+import shutil
+import zipfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Cost classes, cheapest first; the job scheduler keeps a lane per class
+COST_LIGHT = 'light'
+COST_MEDIUM = 'medium'
+COST_HEAVY = 'heavy'
+COST_CLASSES = (COST_LIGHT, COST_MEDIUM, COST_HEAVY)
+
+MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+    '.svg': 'image/svg+xml',
+    '.heic': 'image/heic',
+    '.gif': 'image/gif',
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.zip': 'application/zip',
+    '.mp4': 'video/mp4',
+    '.mov': 'video/quicktime',
+    '.mkv': 'video/x-matroska',
+    '.webm': 'video/webm',
+    '.ts': 'video/mp2t'
+}
+
+_spec_cache = {}
+
+def package_available(name: str) -> bool:
+    """Whether a top-level package is installed, without importing it"""
+    if name not in _spec_cache:
+        try:
+            _spec_cache[name] = importlib.util.find_spec(name) is not None
+        except (ImportError, ValueError):
+            _spec_cache[name] = False
+    return _spec_cache[name]
+
+class Param:
+    """One keyword argument an operation accepts"""
+    
+    def __init__(self, type_=str, default=None):
+        self.type = type_
+        self.default = default
+    
+    def coerce(self, value):
+        if value is None:
+            return self.default
+        return value if isinstance(value, self.type) else self.type(value)
+
+class Operation:
+    """One conversion: where it lives, what it needs and produces, and its function once loaded"""
+    
+    def __init__(self, name: str, group: str, module: str, requires: tuple = (), *, label: str,
+                 inputs: tuple, output: Optional[str], cost: str = COST_LIGHT, params: Optional[dict] = None,
+                 multiple: bool = False, progress: bool = False, archive: bool = False,
+                 missing: Optional[str] = None):
+        self.name = name
+        self.group = group
+        self.module = f"operations.{group}.{module}"
+        # Each entry is a package name, or a tuple of alternatives of which one is enough
+        self.requires = requires
+        self.label = label
+        self.inputs = inputs
+        # None keeps the input's extension (compression)
+        self.output = output
+        self.cost = cost
+        self.params = params or {}
+        # The function takes a list of inputs
+        self.multiple = multiple
+        # The function accepts a progress reporter
+        self.progress = progress
+        # The function writes a directory, which is delivered zipped
+        self.archive = archive
+        self.missing = missing or f"Error: {name} not available. Please install {self._requirement_names()}."
+        self._function = None
+    
+    def _requirement_names(self) -> str:
+        return ', '.join(' or '.join(entry) if isinstance(entry, tuple) else entry for entry in self.requires)
+    
+    @property
+    def available(self) -> bool:
+        for entry in self.requires:
+            alternatives = entry if isinstance(entry, tuple) else (entry,)
+            if not any(package_available(name) for name in alternatives):
+                return False
+        return True
+    
+    @property
+    def loaded(self) -> bool:
+        return self._function is not None
+    
+    def accepts(self, file_name: str) -> bool:
+        return os.path.splitext(file_name or '')[1].lower() in self.inputs
+    
+    def output_extension(self, file_name: str) -> str:
+        return self.output or os.path.splitext(file_name)[1].lower()
+    
+    def output_mime(self, file_name: str) -> str:
+        return MIME_TYPES.get(self.output_extension(file_name), 'application/octet-stream')
+    
+    def resolve_params(self, params: Optional[dict] = None) -> dict:
+        """Declared parameters with defaults applied; undeclared keys are dropped"""
+        params = params or {}
+        return {name: param.coerce(params.get(name)) for name, param in self.params.items()}
+    
+    def load(self):
+        """Import the backend on first use; unavailable operations get a function returning an error"""
+        if self._function is None:
+            function = None
+            if self.available:
+                try:
+                    function = getattr(importlib.import_module(self.module), self.name)
+                except ImportError as e:
+                    logger.warning(f"⚠️ Could not load {self.name} from {self.module}: {e}")
+            if function is None:
+                missing = self.missing
+                def function(*args, **kwargs):
+                    return missing
+            self._function = function
+        return self._function
+    
+    def run(self, input_path, output_path: str, params: Optional[dict] = None, progress=None) -> str:
+        """Convert input_path into output_path with the declared parameters"""
+        function = self.load()
+        kwargs = self.resolve_params(params)
+        if self.progress and progress is not None:
+            kwargs['progress'] = progress
+        if self.multiple and isinstance(input_path, str):
+            input_path = [input_path]
+        
+        if not self.archive:
+            return function(input_path, output_path, **kwargs)
+        
+        # Directory outputs are zipped so every operation delivers a single file
+        output_dir = f"{output_path}.d"
+        try:
+            result = function(input_path, output_dir, **kwargs)
+            if 'Error' not in str(result):
+                with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    for name in sorted(os.listdir(output_dir)):
+                        archive.write(os.path.join(output_dir, name), name)
+            return result
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+    
+    def __repr__(self):
+        return f"Operation({self.name!r}, available={self.available}, loaded={self.loaded})"
+
+VIDEO_MISSING = "Error: Video operations not available. Please install moviepy and ffmpeg."
+
+JPEG = ('.jpg', '.jpeg')
+RASTER = ('.jpg', '.jpeg', '.png', '.webp')
+# Frame size and rate caps; admission control lowers them for large videos
+GIF_PARAMS = {'max_width': Param(int, 800), 'fps': Param(int, 15)}
+
+OPERATIONS = {operation.name: operation for operation in [
+    # Images
+    Operation('convert_jpg_to_png', 'images', 'jpg_to_png', ('PIL',),
+              label="🎨 Convert JPG to PNG", inputs=JPEG, output='.png'),
+    Operation('convert_png_to_jpg', 'images', 'png_to_jpg', ('PIL',),
+              label="🖼️ Convert PNG to JPG", inputs=('.png',), output='.jpg'),
+    Operation('convert_jpg_to_webp', 'images', 'jpg_to_webp', ('PIL',),
+              label="⚡ Convert JPG to WebP", inputs=JPEG, output='.webp'),
+    Operation('convert_webp_to_jpg', 'images', 'webp_to_jpg', ('PIL',),
+              label="📱 Convert WebP to JPG", inputs=('.webp',), output='.jpg'),
+    Operation('convert_svg_to_png', 'images', 'svg_to_png', (('cairosvg', 'svglib'),),
+              label="🎭 Convert SVG to PNG", inputs=('.svg',), output='.png',
+              missing="Error: SVG conversion not available. Please install cairosvg or svglib."),
+    Operation('compress_image', 'images', 'compress_image', ('PIL',),
+              label="🗜️ Smart Compress Image", inputs=RASTER, output=None,
+              params={'quality': Param(int, 60)}),
+    Operation('convert_hevc_to_jpg', 'images', 'hevc_to_jpg', ('PIL',),
+              label="📷 Convert HEIC to JPG", inputs=('.heic', '.heif'), output='.jpg', cost=COST_MEDIUM),
+    Operation('convert_jpg_to_hevc', 'images', 'jpg_to_hevc', ('PIL',),
+              label="📷 Convert JPG to HEIC", inputs=JPEG, output='.heic', cost=COST_MEDIUM),
+    
+    # PDF
+    Operation('merge_pdfs', 'pdf', 'merge_pdfs', ('PyPDF2',),
+              label="📑 Merge Multiple PDFs", inputs=('.pdf',), output='.pdf', multiple=True),
+    Operation('convert_pdf_to_images', 'pdf', 'pdf_to_image', ('pdf2image',),
+              label="🖼️ Convert PDF to Images", inputs=('.pdf',), output='.zip', cost=COST_HEAVY,
+              params={'format': Param(str, 'PNG'), 'dpi': Param(int, 200)}, archive=True),
+    Operation('convert_image_to_pdf', 'pdf', 'image_to_pdf', ('PIL',),
+              label="📄 Convert Image to PDF", inputs=RASTER, output='.pdf'),
+    Operation('convert_images_to_pdf', 'pdf', 'image_to_pdf', ('PIL',),
+              label="📄 Convert Images to PDF", inputs=RASTER, output='.pdf', multiple=True),
+    Operation('compress_pdf', 'pdf', 'compress_pdf', ('PyPDF2',),
+              label="🗜️ Compress PDF Size", inputs=('.pdf',), output='.pdf', cost=COST_MEDIUM),
+    Operation('lock_pdf', 'pdf', 'lock_pdf', ('PyPDF2',),
+              label="🔒 Lock PDF with Password", inputs=('.pdf',), output='.pdf',
+              params={'password': Param(str, 'default123')}),
+    Operation('unlock_pdf', 'pdf', 'unlock_pdf', ('PyPDF2',),
+              label="🔓 Unlock Protected PDF", inputs=('.pdf',), output='.pdf',
+              params={'password': Param(str, 'default123')}),
+    Operation('add_page_numbers', 'pdf', 'add_page_numbers', ('PyPDF2', 'reportlab'),
+              label="🔢 Add Page Numbers", inputs=('.pdf',), output='.pdf', cost=COST_MEDIUM,
+              params={'position': Param(str, 'bottom-right')}),
+    Operation('delete_pdf_page', 'pdf', 'delete_pdf_page', ('PyPDF2',),
+              label="✂️ Delete Specific Page", inputs=('.pdf',), output='.pdf',
+              params={'page_number': Param(int, 1)}),
+    Operation('rotate_pdf', 'pdf', 'rotate_pdf', ('PyPDF2',),
+              label="🔄 Rotate PDF Pages", inputs=('.pdf',), output='.pdf',
+              params={'angle': Param(int, 90)}),
+    Operation('convert_word_to_pdf', 'pdf', 'word_to_pdf', ('docx2pdf',),
+              label="📄 Convert Word to PDF", inputs=('.docx', '.doc'), output='.pdf', cost=COST_MEDIUM),
+    Operation('convert_pdf_to_word', 'pdf', 'pdf_to_word', (('pdf2docx', 'fitz'),),
+              label="📝 Convert PDF to Word", inputs=('.pdf',), output='.docx', cost=COST_HEAVY),
+    
+    # Videos; compress_video can also drive ffmpeg without moviepy
+    Operation('convert_mp4_to_mov', 'videos', 'mp4_to_mov', ('moviepy',),
+              label="🎬 Convert MP4 to MOV", inputs=('.mp4',), output='.mov', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('convert_mov_to_mp4', 'videos', 'mov_to_mp4', ('moviepy',),
+              label="📱 Convert MOV to MP4", inputs=('.mov',), output='.mp4', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('convert_ts_to_mp4', 'videos', 'ts_to_mp4', ('moviepy',),
+              label="📺 Convert TS to MP4", inputs=('.ts',), output='.mp4', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('convert_mp4_to_ts', 'videos', 'mp4_to_ts', ('moviepy',),
+              label="📺 Convert MP4 to TS", inputs=('.mp4',), output='.ts', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('convert_mkv_to_mp4', 'videos', 'mkv_to_mp4', ('moviepy',),
+              label="🎞️ Convert MKV to MP4", inputs=('.mkv',), output='.mp4', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('convert_mp4_to_mkv', 'videos', 'mp4_to_mkv', ('moviepy',),
+              label="🎞️ Convert MP4 to MKV", inputs=('.mp4',), output='.mkv', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('convert_webm_to_mp4', 'videos', 'webm_to_mp4', ('moviepy',),
+              label="📹 Convert WebM to MP4", inputs=('.webm',), output='.mp4', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('convert_mp4_to_webm', 'videos', 'mp4_to_webm', ('moviepy',),
+              label="🌐 Convert MP4 to WebM", inputs=('.mp4',), output='.webm', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('compress_video', 'videos', 'compress_video', (('moviepy', 'ffmpeg'),),
+              label="🗜️ Smart Compress Video", inputs=('.mp4', '.mov', '.mkv', '.webm'), output=None,
+              cost=COST_HEAVY, params={'bitrate': Param(str, '1000k')}, progress=True, missing=VIDEO_MISSING),
+    Operation('convert_gif_to_mp4', 'videos', 'gif_to_video', ('moviepy',),
+              label="🎪 Convert GIF to MP4", inputs=('.gif',), output='.mp4', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('convert_gif_to_webm', 'videos', 'gif_to_video', ('moviepy',),
+              label="🌐 Convert GIF to WebM", inputs=('.gif',), output='.webm', cost=COST_HEAVY,
+              missing=VIDEO_MISSING),
+    Operation('convert_mp4_to_gif', 'videos', 'video_to_gif', ('moviepy',),
+              label="😂 Convert MP4 to GIF", inputs=('.mp4',), output='.gif', cost=COST_HEAVY,
+              params=GIF_PARAMS, missing=VIDEO_MISSING),
+    Operation('convert_mov_to_gif', 'videos', 'video_to_gif', ('moviepy',),
+              label="🎭 Convert MOV to GIF", inputs=('.mov',), output='.gif', cost=COST_HEAVY,
+              params=GIF_PARAMS, missing=VIDEO_MISSING),
+    Operation('convert_webm_to_gif', 'videos', 'video_to_gif', ('moviepy',),
+              label="✨ Convert WebM to GIF", inputs=('.webm',), output='.gif', cost=COST_HEAVY,
+              params=GIF_PARAMS, missing=VIDEO_MISSING)
+]}
+
+# Callback data sent by older keyboards, still accepted
+ALIASES = {
+    'delete_a_page': 'delete_pdf_page',
+    'convert_to_webp': 'convert_jpg_to_webp',
+    'convert_to_mp4': 'convert_mov_to_mp4',
+    'convert_to_gif': 'convert_mp4_to_gif',
+    'convert_to_webm': 'convert_mp4_to_webm'
+}
+
+GROUPS = ('images', 'pdf', 'videos')
+
+def get_operation(name: str) -> Operation:
+    """Registered operation by name or alias; raises KeyError for unknown names"""
+    return OPERATIONS[ALIASES.get(name, name)]
+
+def find_operation(name: str) -> Optional[Operation]:
+    return OPERATIONS.get(ALIASES.get(name, name))
+
+def is_available(name: str) -> bool:
+    operation = find_operation(name)
+    return operation is not None and operation.available
+
+def available_operations(group: Optional[str] = None) -> list:
+    return [name for name, operation in OPERATIONS.items()
+            if (group is None or operation.group == group) and operation.available]
+
+def group_available(group: str) -> bool:
+    """Whether any operation of the group can run here"""
+    return bool(available_operations(group))
+
+def group_exports(group: str) -> list:
+    return [name for name, operation in OPERATIONS.items() if operation.group == group]
+
+def operations_for(file_name: str, single_input: bool = True) -> list:
+    """Available operations that accept this file, in registry order"""
+    return [operation for operation in OPERATIONS.values()
+            if operation.available and operation.accepts(file_name)
+            and not (single_input and operation.multiple)]
+
+def run_operation(name: str, input_path, output_path: str, params: Optional[dict] = None, progress=None) -> str:
+    """Dispatch a conversion by operation name"""
+    operation = find_operation(name)
+    if operation is None:
+        return f"Error: Operation {name} not implemented yet"
+    return operation.run(input_path, output_path, params, progress=progress)
+
+def cache_params(name: str, params: Optional[dict] = None) -> dict:
+    """Effective parameters that distinguish one result of the operation from another"""
+    operation = find_operation(name)
+    return operation.resolve_params(params) if operation else {}
@@ -1,12 +1,20 @@
 import os
 import logging
 
+from utils.tracing import span
+
 try:
     from moviepy.editor import VideoFileClip
     MOVIEPY_AVAILABLE = True
 except ImportError:
     MOVIEPY_AVAILABLE = False
 
+try:
+    from proglog import ProgressBarLogger
+    PROGLOG_AVAILABLE = True
+except ImportError:
+    PROGLOG_AVAILABLE = False
+
 try:
     import ffmpeg
     FFMPEG_PYTHON_AVAILABLE = True
@@ -19,80 +27,103 @@ try:
 except ImportError:
     SUBPROCESS_AVAILABLE = False
 
-def compress_video(input_path, output_path, bitrate="1000k"):
+if PROGLOG_AVAILABLE:
+    class FrameProgressLogger(ProgressBarLogger):
+        """Forwards MoviePy's frame counter to a progress(done, total) callback"""
+        
+        def __init__(self, progress):
+            super().__init__()
+            self.progress = progress
+        
+        def bars_callback(self, bar, attr, value, old_value=None):
+            # MoviePy names the video frame bar 't'; 'chunk' is the audio pass
+            if bar == 't' and attr == 'index':
+                self.progress(value, self.bars[bar].get('total'))
+
+def compress_video(input_path, output_path, bitrate="1000k", progress=None):
     """
     Compress video using multiple methods with fallbacks.
+    
+    progress, if given, is called with (frames_done, total_frames) while MoviePy encodes.
     """
     try:
         # Method 1: Using MoviePy (preferred)
         if MOVIEPY_AVAILABLE:
-            try:
-                video = VideoFileClip(input_path)
-                video.write_videofile(
-                    output_path, 
-                    codec='libx264',
-                    bitrate=bitrate,
-                    temp_audiofile='temp-audio.m4a',
-                    remove_temp=True,
-                    verbose=False,
-                    logger=None
-                )
-                video.close()
-                
-                # Get file sizes for comparison
-                original_size = os.path.getsize(input_path)
-                compressed_size = os.path.getsize(output_path)
-                reduction = ((original_size - compressed_size) / original_size) * 100
-                
-                return f"Compressed video using MoviePy: {output_path} (Reduced by {reduction:.1f}%)"
-            except Exception as e:
-                logging.warning(f"MoviePy compression failed: {e}, trying ffmpeg-python")
+            with span('convert.backend', backend='moviepy') as attempt:
+                try:
+                    video = VideoFileClip(input_path)
+                    video.write_videofile(
+                        output_path, 
+                        codec='libx264',
+                        bitrate=bitrate,
+                        # Next to the output, so concurrent jobs never share it
+                        temp_audiofile=f"{os.path.splitext(output_path)[0]}_temp-audio.m4a",
+                        remove_temp=True,
+                        verbose=False,
+                        logger=FrameProgressLogger(progress) if progress and PROGLOG_AVAILABLE else None
+                    )
+                    video.close()
+                    
+                    # Get file sizes for comparison
+                    original_size = os.path.getsize(input_path)
+                    compressed_size = os.path.getsize(output_path)
+                    reduction = ((original_size - compressed_size) / original_size) * 100
+                    
+                    return f"Compressed video using MoviePy: {output_path} (Reduced by {reduction:.1f}%)"
+                except Exception as e:
+                    attempt.fail(e)
+                    logging.warning(f"MoviePy compression failed: {e}, trying ffmpeg-python")
         
         # Method 2: Using ffmpeg-python
         if FFMPEG_PYTHON_AVAILABLE:
-            try:
-                (
-                    ffmpeg
-                    .input(input_path)
-                    .output(output_path, vcodec='libx264', video_bitrate=bitrate)
-                    .overwrite_output()
-                    .run(quiet=True)
-                )
-                
-                # Get file sizes for comparison
-                original_size = os.path.getsize(input_path)
-                compressed_size = os.path.getsize(output_path)
-                reduction = ((original_size - compressed_size) / original_size) * 100
-                
-                return f"Compressed video using ffmpeg-python: {output_path} (Reduced by {reduction:.1f}%)"
-            except Exception as e:
-                logging.warning(f"ffmpeg-python compression failed: {e}, trying direct ffmpeg")
-        
-        # Method 3: Using direct ffmpeg command
-        if SUBPROCESS_AVAILABLE:
-            try:
-                # Check if ffmpeg is available
-                result = subprocess.run(['ffmpeg', '-version'], 
-                                      capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    # Use ffmpeg directly
-                    subprocess.run([
-                        'ffmpeg', '-i', input_path,
-                        '-c:v', 'libx264',
-                        '-b:v', bitrate,
-                        '-c:a', 'aac',
-                        '-y',  # Overwrite output file
-                        output_path
-                    ], check=True, capture_output=True, timeout=300)
+            with span('convert.backend', backend='ffmpeg-python') as attempt:
+                try:
+                    (
+                        ffmpeg
+                        .input(input_path)
+                        .output(output_path, vcodec='libx264', video_bitrate=bitrate)
+                        .overwrite_output()
+                        .run(quiet=True)
+                    )
                     
                     # Get file sizes for comparison
                     original_size = os.path.getsize(input_path)
                     compressed_size = os.path.getsize(output_path)
                     reduction = ((original_size - compressed_size) / original_size) * 100
                     
-                    return f"Compressed video using direct ffmpeg: {output_path} (Reduced by {reduction:.1f}%)"
-            except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-                logging.warning(f"Direct ffmpeg compression failed: {e}")
+                    return f"Compressed video using ffmpeg-python: {output_path} (Reduced by {reduction:.1f}%)"
+                except Exception as e:
+                    attempt.fail(e)
+                    logging.warning(f"ffmpeg-python compression failed: {e}, trying direct ffmpeg")
+        
+        # Method 3: Using direct ffmpeg command
+        if SUBPROCESS_AVAILABLE:
+            with span('convert.backend', backend='ffmpeg') as attempt:
+                try:
+                    # Check if ffmpeg is available
+                    result = subprocess.run(['ffmpeg', '-version'], 
+                                          capture_output=True, text=True, timeout=5)
+                    if result.returncode == 0:
+                        # Use ffmpeg directly
+                        subprocess.run([
+                            'ffmpeg', '-i', input_path,
+                            '-c:v', 'libx264',
+                            '-b:v', bitrate,
+                            '-c:a', 'aac',
+                            '-y',  # Overwrite output file
+                            output_path
+                        ], check=True, capture_output=True, timeout=300)
+                        
+                        # Get file sizes for comparison
+                        original_size = os.path.getsize(input_path)
+                        compressed_size = os.path.getsize(output_path)
+                        reduction = ((original_size - compressed_size) / original_size) * 100
+                        
+                        return f"Compressed video using direct ffmpeg: {output_path} (Reduced by {reduction:.1f}%)"
+                    attempt.fail("ffmpeg binary not usable")
+                except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
+                    attempt.fail(e)
+                    logging.warning(f"Direct ffmpeg compression failed: {e}")
         
         # If all methods fail
         missing_deps = []
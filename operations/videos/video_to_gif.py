@@ -1,7 +1,7 @@
 from moviepy.editor import VideoFileClip
 import os
 
-def convert_mp4_to_gif(input_path, output_path):
+def convert_mp4_to_gif(input_path, output_path, max_width=800, fps=15):
     """
     Convert MP4 video to GIF format.
     Uses MoviePy with optimized settings for GIF creation.
@@ -9,6 +9,8 @@ def convert_mp4_to_gif(input_path, output_path):
     Args:
         input_path (str): Path to input MP4 file
         output_path (str): Path for output GIF file
+        max_width (int): Frames wider than this are scaled down
+        fps (int): Highest frame rate kept in the GIF
         
     Returns:
         str: Success message or error description
@@ -21,12 +23,12 @@ def convert_mp4_to_gif(input_path, output_path):
         duration = video.duration
         original_fps = video.fps
         
-        # Adjust fps for reasonable GIF size (max 15 fps for GIFs)
-        target_fps = min(15, original_fps) if original_fps else 10
+        # Adjust fps for reasonable GIF size
+        target_fps = min(fps, original_fps) if original_fps else min(fps, 10)
         
-        # Resize if video is too large (max width 800px for reasonable GIF size)
-        if video.w > 800:
-            video = video.resize(width=800)
+        # Resize if video is too large
+        if video.w > max_width:
+            video = video.resize(width=max_width)
         
         # Limit duration for very long videos (max 10 seconds for reasonable file size)
         if duration > 10:
@@ -46,7 +48,7 @@ def convert_mp4_to_gif(input_path, output_path):
     except Exception as e:
         return f"Error converting MP4 to GIF: {str(e)}"
 
-def convert_mov_to_gif(input_path, output_path):
+def convert_mov_to_gif(input_path, output_path, max_width=800, fps=15):
     """
     Convert MOV video to GIF format.
     Uses MoviePy with optimized settings for GIF creation.
@@ -54,6 +56,8 @@ def convert_mov_to_gif(input_path, output_path):
     Args:
         input_path (str): Path to input MOV file
         output_path (str): Path for output GIF file
+        max_width (int): Frames wider than this are scaled down
+        fps (int): Highest frame rate kept in the GIF
         
     Returns:
         str: Success message or error description
@@ -67,11 +71,11 @@ def convert_mov_to_gif(input_path, output_path):
         original_fps = video.fps
         
         # Adjust fps for reasonable GIF size
-        target_fps = min(15, original_fps) if original_fps else 10
+        target_fps = min(fps, original_fps) if original_fps else min(fps, 10)
         
         # Resize if video is too large
-        if video.w > 800:
-            video = video.resize(width=800)
+        if video.w > max_width:
+            video = video.resize(width=max_width)
         
         # Limit duration for very long videos
         if duration > 10:
@@ -91,7 +95,7 @@ def convert_mov_to_gif(input_path, output_path):
     except Exception as e:
         return f"Error converting MOV to GIF: {str(e)}"
 
-def convert_webm_to_gif(input_path, output_path):
+def convert_webm_to_gif(input_path, output_path, max_width=800, fps=15):
     """
     Convert WebM video to GIF format.
     Uses MoviePy with optimized settings for GIF creation.
@@ -99,6 +103,8 @@ def convert_webm_to_gif(input_path, output_path):
     Args:
         input_path (str): Path to input WebM file
         output_path (str): Path for output GIF file
+        max_width (int): Frames wider than this are scaled down
+        fps (int): Highest frame rate kept in the GIF
         
     Returns:
         str: Success message or error description
@@ -112,11 +118,11 @@ def convert_webm_to_gif(input_path, output_path):
         original_fps = video.fps
         
         # Adjust fps for reasonable GIF size
-        target_fps = min(15, original_fps) if original_fps else 10
+        target_fps = min(fps, original_fps) if original_fps else min(fps, 10)
         
         # Resize if video is too large
-        if video.w > 800:
-            video = video.resize(width=800)
+        if video.w > max_width:
+            video = video.resize(width=max_width)
         
         # Limit duration for very long videos
         if duration > 10:
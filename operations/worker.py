@@ -0,0 +1,86 @@
+"""
+Conversion worker process.
+
+Reads one JSON request per line on stdin, runs the named operation and writes
+one JSON result per line on stdout, preceded by {"progress": [done, total]}
+lines for operations that report progress. Started and recycled by
+utils.process_pool; only paths and parameters cross the process boundary.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+from .registry import find_operation
+
+# Minimum seconds between progress lines; the server debounces its edits anyway
+PROGRESS_INTERVAL = 0.5
+
+def _cpu_seconds() -> float:
+    # Helper processes (ffmpeg) count towards the conversion as well
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+def _output_bytes(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def execute(request: dict, progress=None) -> dict:
+    """Run one conversion request and describe the outcome"""
+    operation = find_operation(request['operation'])
+    started, cpu_started = time.perf_counter(), _cpu_seconds()
+    try:
+        if operation is None:
+            message = f"Error: Operation {request['operation']} not implemented yet"
+        else:
+            message = str(operation.run(request['input'], request['output'], request.get('params'), progress=progress))
+    except Exception as e:
+        message = f"Error: {e}"
+    
+    return {
+        'ok': 'Error' not in message,
+        'message': message,
+        'output_bytes': _output_bytes(request['output']),
+        'wall_s': round(time.perf_counter() - started, 4),
+        'cpu_s': round(_cpu_seconds() - cpu_started, 4),
+        'pid': os.getpid()
+    }
+
+def _progress_writer(results):
+    last = [0.0]
+    
+    def report(done, total):
+        now = time.monotonic()
+        if now - last[0] >= PROGRESS_INTERVAL:
+            last[0] = now
+            results.write(json.dumps({'progress': [done, total]}) + '\n')
+            results.flush()
+    return report
+
+def main():
+    # stdout carries results only; anything the operations print goes to stderr
+    results = sys.stdout
+    sys.stdout = sys.stderr
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    from utils.tracing import trace
+    
+    for line in sys.stdin:
+        request = json.loads(line)
+        progress = _progress_writer(results) if request.get('progress') else None
+        # Spans opened by the operation join the job's trace
+        with trace(request.get('trace_id')):
+            result = execute(request, progress=progress)
+        results.write(json.dumps(result) + '\n')
+        results.flush()
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,8 @@ def main():
     """Main startup function"""
     port = int(os.environ.get('PORT', 8080))
     environment = os.environ.get('ENVIRONMENT', 'development')
+    workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
     
     logger.info(f"🚀 Starting Telegram File Converter Bot")
     logger.info(f"🌍 Environment: {environment}")
@@ -34,12 +36,17 @@ def main():
     try:
         if environment == 'production':
             # Use gunicorn for production
-            logger.info("🏭 Starting with gunicorn (production mode)")
+            logger.info(f"🏭 Starting with gunicorn (production mode, {workers} workers x {threads} threads)")
+            
+            # Each worker has its own memory; sessions must be shared through the sqlite backend
+            if workers > 1 and os.environ.get('STATE_BACKEND', 'memory') == 'memory':
+                logger.warning("⚠️ STATE_BACKEND=memory with several workers: callbacks may miss their upload session")
+            
             cmd = [
                 'gunicorn',
                 '--bind', f'0.0.0.0:{port}',
-                '--workers', '1',
-                '--threads', '8',
+                '--workers', str(workers),
+                '--threads', str(threads),
                 '--timeout', '600',
                 '--preload',
                 '--access-logfile', '-',
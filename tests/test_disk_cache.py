@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from utils.disk_cache import DiskLRUCache, fcntl
+
+def write(path, size: int) -> str:
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return str(path)
+
+@pytest.mark.skipif(fcntl is None, reason="slot directories need flock")
+def test_shared_root_gives_each_process_its_own_slot(tmp_path):
+    root = tmp_path / 'cache'
+    first = DiskLRUCache(str(root), 1000, shares=2)
+    second = DiskLRUCache(str(root), 1000, shares=2)
+    source = write(tmp_path / 'input.bin', 300)
+    
+    first_path = first.put('key', source)
+    second_path = second.put('key', source)
+    
+    assert os.path.dirname(first_path) != os.path.dirname(second_path)
+    assert first.max_bytes == second.max_bytes == 500
+    # Filling one slot never evicts the other's files
+    second.put('other', source)
+    assert os.path.exists(first_path)
+
+def test_put_never_returns_an_evicted_path(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / 'cache'), 1000)
+    source = write(tmp_path / 'input.bin', 600)
+    pinned = cache.put('pinned', source, pin=True)
+    
+    # Only the new entry could make room, and it is not pinned
+    assert cache.put('new', source) is None
+    assert os.path.exists(pinned)
+    assert cache.get('new') is None
+    
+    cache.release('pinned')
+    assert cache.put('new', source) is not None
+    assert cache.get('pinned') is None
+
+def test_eviction_drops_the_least_recently_used_unpinned_entry(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / 'cache'), 1000)
+    source = write(tmp_path / 'input.bin', 300)
+    pinned = cache.put('pinned', source, pin=True)
+    cache.put('older', source)
+    cache.put('newer', source)
+    # Reading refreshes an entry, so 'newer' becomes the oldest
+    assert cache.get('older') is not None
+    
+    assert cache.put('latest', source) is not None
+    
+    assert cache.get('newer') is None
+    assert cache.get('older') is not None
+    assert os.path.exists(pinned)
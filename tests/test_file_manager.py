@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+
+import pytest
+
+from utils.file_manager import TempFileManager, TempSpaceError
+
+def test_job_dir_waits_for_a_running_job_then_proceeds(tmp_path):
+    manager = TempFileManager(str(tmp_path / 'temp'), max_bytes=1000, wait_seconds=5)
+    entered = []
+    
+    def second_job():
+        with manager.job_dir(size_hint=400) as path:
+            entered.append(os.path.isdir(path))
+    
+    with manager.job_dir(size_hint=400):
+        waiter = threading.Thread(target=second_job)
+        waiter.start()
+        time.sleep(0.2)
+        assert not entered
+    waiter.join(timeout=5)
+    
+    assert entered == [True]
+
+def test_job_dir_is_refused_when_no_room_frees_up(tmp_path):
+    manager = TempFileManager(str(tmp_path / 'temp'), max_bytes=1000, wait_seconds=0.1)
+    
+    with manager.job_dir(size_hint=400):
+        with pytest.raises(TempSpaceError):
+            with manager.job_dir(size_hint=400):
+                pass
+    with pytest.raises(TempSpaceError):
+        with manager.job_dir(size_hint=600):
+            pass
+    assert manager.stats()['refused'] == 2
+
+def test_fast_dir_has_its_own_budget(tmp_path):
+    fast = tmp_path / 'shm'
+    fast.mkdir()
+    manager = TempFileManager(str(tmp_path / 'temp'))
+    manager.set_fast_dir(str(fast), max_bytes=100, budget_bytes=200)
+    
+    with manager.job_dir(size_hint=100) as first, manager.job_dir(size_hint=100) as second:
+        assert first.startswith(str(fast))
+        # The fast budget is used up, so the next job goes to disk
+        assert not second.startswith(str(fast))
+        assert manager.stats()['fast_bytes'] == 200
+    assert manager.stats()['fast_bytes'] == 0
+
+def test_budget_evicts_least_recently_used_idle_files(tmp_path):
+    manager = TempFileManager(str(tmp_path / 'temp'), max_bytes=1000)
+    older = manager.create_temp_file('.bin', size_hint=400)
+    newer = manager.create_temp_file('.bin', size_hint=400)
+    for path in (older, newer):
+        with open(path, 'wb') as f:
+            f.write(b'x' * 400)
+    manager.touch(newer)
+    
+    with manager.job_dir(size_hint=300):
+        assert not os.path.exists(older)
+        assert os.path.exists(newer)
+    assert manager.stats()['evictions'] == 1
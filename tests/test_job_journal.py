@@ -0,0 +1,53 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from utils.job_journal import JOB_CONVERTING, JOB_FAILED, JobJournal
+
+@pytest.fixture
+def journal(tmp_path):
+    return JobJournal(str(tmp_path / 'jobs.db'), lease_seconds=900)
+
+def hand_over(journal, job_id, pid):
+    # As if another worker on this host had accepted the job
+    journal.db.execute('UPDATE jobs SET owner = ? WHERE job_id = ?', (f"{socket.gethostname()}:{pid}:abcd1234", job_id))
+
+def dead_pid() -> int:
+    child = subprocess.Popen([sys.executable, '-c', 'pass'])
+    child.wait()
+    return child.pid
+
+def test_jobs_of_a_dead_worker_are_claimed_within_the_lease(journal):
+    job_id = journal.record(1, 10, 'compress_pdf', session={'file_name': 'a.pdf'})
+    journal.update(job_id, JOB_CONVERTING, job_dir='/tmp/job_x')
+    hand_over(journal, job_id, dead_pid())
+    
+    claimed = journal.claim_unfinished()
+    
+    assert [job['job_id'] for job in claimed] == [job_id]
+    assert claimed[0]['attempts'] == 2
+    assert claimed[0]['job_dir'] == '/tmp/job_x'
+    assert claimed[0]['session'] == {'file_name': 'a.pdf'}
+    # Now owned by this process, so a second pass finds nothing
+    assert journal.claim_unfinished() == []
+
+def test_jobs_of_a_live_worker_are_left_alone(journal):
+    job_id = journal.record(1, 10, 'compress_pdf')
+    hand_over(journal, job_id, os.getppid())
+    
+    assert journal.claim_unfinished() == []
+
+def test_finished_and_failed_jobs_are_not_claimed(journal):
+    done = journal.record(1, 10, 'compress_pdf')
+    failed = journal.record(1, 10, 'compress_pdf')
+    journal.finish(done)
+    journal.fail(failed, 'boom')
+    journal.finish(failed)
+    for job_id in (done, failed):
+        hand_over(journal, job_id, dead_pid())
+    
+    assert journal.claim_unfinished() == []
+    assert journal.stats() == {'done': 1, JOB_FAILED: 1}
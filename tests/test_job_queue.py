@@ -0,0 +1,48 @@
+import threading
+
+from utils.job_queue import JobQueue, LaneScheduler
+
+def test_busy_lane_does_not_delay_another_lane():
+    lanes = LaneScheduler({'light': (1, 10), 'heavy': (1, 10)}, default_lane='light')
+    release_heavy = threading.Event()
+    heavy_started = threading.Event()
+    light_done = threading.Event()
+    
+    def heavy():
+        heavy_started.set()
+        release_heavy.wait(5)
+    
+    assert lanes.submit('heavy', heavy)
+    assert heavy_started.wait(5)
+    assert lanes.submit('heavy', heavy)
+    assert lanes.submit('light', light_done.set)
+    
+    # The light job ran while both heavy jobs were still held up
+    assert light_done.wait(5)
+    assert lanes.lane_pending() == {('light',): 0, ('heavy',): 1}
+    release_heavy.set()
+
+def test_unknown_lane_uses_the_default_lane():
+    lanes = LaneScheduler({'light': (1, 10), 'heavy': (1, 10)}, default_lane='light')
+    done = threading.Event()
+    
+    assert lanes.submit('unknown', done.set)
+    
+    assert done.wait(5)
+    assert lanes.stats()['lanes']['light']['completed'] == 1
+
+def test_full_queue_rejects_jobs():
+    jobs = JobQueue(workers=1, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+    
+    def block():
+        started.set()
+        release.wait(5)
+    
+    assert jobs.submit(block)
+    assert started.wait(5)
+    assert jobs.submit(block)
+    assert not jobs.submit(block)
+    assert jobs.stats()['rejected'] == 1
+    release.set()
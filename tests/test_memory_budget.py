@@ -0,0 +1,54 @@
+import threading
+import time
+
+from utils.memory_budget import MemoryBudget
+
+def start_waiter(budget, nbytes, granted):
+    def wait():
+        if budget.reserve(nbytes, timeout=5):
+            granted.append(nbytes)
+    queued = budget.stats()['queued']
+    thread = threading.Thread(target=wait)
+    thread.start()
+    # Let it reach the queue before the next one arrives
+    deadline = time.monotonic() + 5
+    while budget.stats()['queued'] == queued and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return thread
+
+def test_waiters_are_served_in_arrival_order():
+    budget = MemoryBudget(100)
+    granted = []
+    assert budget.reserve(60)
+    
+    large = start_waiter(budget, 50, granted)
+    # 30 would fit right now, but must not overtake the queued 50
+    small = start_waiter(budget, 30, granted)
+    assert granted == []
+    
+    budget.release(60)
+    large.join(timeout=5)
+    small.join(timeout=5)
+    assert granted == [50, 30]
+    assert budget.available() == 20
+
+def test_light_jobs_may_jump_the_queue():
+    budget = MemoryBudget(100)
+    granted = []
+    assert budget.reserve(60)
+    large = start_waiter(budget, 50, granted)
+    
+    assert budget.reserve(30, timeout=0, jump_queue=True)
+    
+    budget.release(90)
+    large.join(timeout=5)
+    assert granted == [50]
+
+def test_oversized_requests_are_clamped_and_time_out():
+    budget = MemoryBudget(100)
+    
+    assert not budget.fits(150)
+    assert budget.reserve(150)
+    assert budget.available() == 0
+    assert not budget.reserve(1, timeout=0.05)
+    assert budget.stats()['timeouts'] == 1
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from utils.outbound_scheduler import OutboundScheduler
+from utils.telegram_api import TelegramAPIError
+
+class FakeAPI:
+    """Answers chat 1's first sendMessage with a 429 and records every call"""
+    
+    def __init__(self, retry_after: int = 1):
+        self.retry_after_seconds = retry_after
+        self.calls = []
+        self._lock = threading.Lock()
+    
+    def call(self, method, data=None, files=None, retry_rate_limit=True):
+        with self._lock:
+            self.calls.append((method, data['chat_id'], retry_rate_limit, time.monotonic()))
+            first = [c for c in self.calls if c[1] == data['chat_id']] == [self.calls[-1]]
+        if data['chat_id'] == 1 and first:
+            raise TelegramAPIError(method, 'Too Many Requests', error_code=429, retry_after=self.retry_after_seconds)
+        return {'chat': data['chat_id']}
+
+def test_429_blocks_the_chat_without_holding_a_sender():
+    api = FakeAPI()
+    outbound = OutboundScheduler(api, senders=1)
+    started = time.monotonic()
+    
+    limited = outbound.send('sendMessage', data={'chat_id': 1}, chat_id=1)
+    other = outbound.send('sendMessage', data={'chat_id': 2}, chat_id=2)
+    
+    assert other.result(timeout=5) == {'chat': 2}
+    assert time.monotonic() - started < 0.5
+    assert limited.result(timeout=5) == {'chat': 1}
+    assert time.monotonic() - started >= 1
+    # The client never sleeps on a 429 for paced calls
+    assert all(not retry for _, _, retry, _ in api.calls)
+
+def test_queued_edits_of_one_message_are_coalesced():
+    sent = []
+    first_running = threading.Event()
+    release_first = threading.Event()
+    outbound = OutboundScheduler(FakeAPI(), chat_rate=100, chat_burst=100)
+    
+    def edit(text):
+        def call():
+            sent.append(text)
+            if text == 'first':
+                first_running.set()
+                release_first.wait(5)
+            return text
+        return call
+    
+    first = outbound.submit(edit('first'), chat_id=1, coalesce_key=('edit', 1, 10))
+    assert first_running.wait(5)
+    # Both wait for the in-flight edit; only the newer one is sent
+    second = outbound.submit(edit('second'), chat_id=1, coalesce_key=('edit', 1, 10))
+    third = outbound.submit(edit('third'), chat_id=1, coalesce_key=('edit', 1, 10))
+    release_first.set()
+    
+    assert first.result(timeout=5) == 'first'
+    assert second.result(timeout=5) == third.result(timeout=5) == 'third'
+    assert sent == ['first', 'third']
+    assert outbound.stats()['coalesced'] == 1
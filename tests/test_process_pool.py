@@ -0,0 +1,78 @@
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from utils import process_pool
+from utils.memory_budget import MemoryBudget
+from utils.process_pool import ConversionPool, _WorkerProcess
+
+# Stands in for operations.worker: two progress lines, then the result
+FAKE_WORKER = """
+import json, sys
+request = json.loads(sys.stdin.readline())
+assert request['progress']
+for done in (1, 2):
+    print(json.dumps({'progress': [done, 2]}), flush=True)
+print(json.dumps({'ok': True, 'message': 'done'}), flush=True)
+"""
+
+def fake_worker() -> _WorkerProcess:
+    worker = _WorkerProcess.__new__(_WorkerProcess)
+    worker.process = subprocess.Popen([sys.executable, '-c', FAKE_WORKER], stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE, text=True, bufsize=1)
+    worker.tasks = 0
+    return worker
+
+def test_progress_lines_reach_the_reporter_before_the_result():
+    worker = fake_worker()
+    reported = []
+    
+    result = worker.call({'operation': 'compress_video'}, timeout=10, progress=lambda *p: reported.append(p))
+    
+    assert reported == [(1, 2), (2, 2)]
+    assert result == {'ok': True, 'message': 'done'}
+    worker.stop()
+
+def test_admission_refuses_instead_of_parking_the_job_thread(monkeypatch):
+    monkeypatch.setattr(process_pool, 'probe', lambda spec, path: {})
+    monkeypatch.setattr(process_pool, 'estimate_from_facts', lambda spec, paths, facts, params: 512 * 1024)
+    monkeypatch.setattr(process_pool, 'downgrades', lambda spec: ())
+    pool = ConversionPool(processes=1, memory_mb=1, admission_wait=0.1, timeout=600)
+    assert pool.memory.reserve(pool.memory.total)
+    spec = SimpleNamespace(name='compress_video', cost='heavy')
+    
+    started = time.monotonic()
+    reserved, reason = pool._admit(spec, 'input.mp4', {})
+    
+    assert reserved is None
+    assert 'busy' in reason
+    assert time.monotonic() - started < 1
+
+def test_reserved_light_slot_is_kept_from_heavy_jobs():
+    pool = ConversionPool(processes=2, reserved_light=1, memory_mb=-1)
+    pool._acquire('heavy')
+    second_heavy = []
+    
+    waiter = threading.Thread(target=lambda: second_heavy.append(pool._acquire('heavy')), daemon=True)
+    waiter.start()
+    waiter.join(timeout=0.2)
+    
+    assert second_heavy == []
+    pool._acquire('light')
+    assert pool.busy() == 2
+
+def test_admission_downgrades_a_job_that_does_not_fit(monkeypatch):
+    monkeypatch.setattr(process_pool, 'probe', lambda spec, path: {})
+    monkeypatch.setattr(process_pool, 'estimate_from_facts',
+                        lambda spec, paths, facts, params: 300 if params.get('max_width') == 480 else 2000)
+    monkeypatch.setattr(process_pool, 'downgrades', lambda spec: ({'max_width': 640}, {'max_width': 480}))
+    pool = ConversionPool(processes=1, memory_mb=0, admission_wait=0.1)
+    pool.memory = MemoryBudget(1000)
+    spec = SimpleNamespace(name='convert_mp4_to_gif', cost='heavy')
+    
+    reserved, overrides = pool._admit(spec, 'input.mp4', {'max_width': 800})
+    
+    assert (reserved, overrides) == (300, {'max_width': 480})
+    assert pool.stats()['degraded'] == 1
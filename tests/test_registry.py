@@ -0,0 +1,29 @@
+import pytest
+
+from operations.registry import cache_params, find_operation, get_operation
+
+def test_resolve_params_applies_defaults_and_drops_unknown_keys():
+    operation = get_operation('compress_image')
+    
+    assert operation.resolve_params(None) == {'quality': 60}
+    assert operation.resolve_params({'quality': '35', 'chat_id': 7}) == {'quality': 35}
+
+def test_aliases_resolve_to_the_registered_operation():
+    assert get_operation('delete_a_page') is get_operation('delete_pdf_page')
+    assert find_operation('convert_to_gif').name == 'convert_mp4_to_gif'
+    assert find_operation('no_such_operation') is None
+    with pytest.raises(KeyError):
+        get_operation('no_such_operation')
+
+def test_output_extension_keeps_the_input_type_when_unset():
+    compress = get_operation('compress_image')
+    
+    assert compress.output_extension('photo.PNG') == '.png'
+    assert compress.output_mime('photo.PNG') == 'image/png'
+    assert get_operation('convert_hevc_to_jpg').output_extension('photo.heic') == '.jpg'
+    assert get_operation('convert_hevc_to_jpg').output_mime('photo.heic') == 'image/jpeg'
+
+def test_accepts_matches_the_extension_case_insensitively():
+    assert get_operation('delete_pdf_page').accepts('scan.PDF')
+    assert not get_operation('compress_image').accepts('scan.pdf')
+    assert cache_params('delete_a_page', {'page_number': '2'}) == {'page_number': 2}
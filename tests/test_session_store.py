@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import session_store
+from utils.session_store import SessionRecord, SessionStore, SQLiteSessionStore
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, 'time', SimpleNamespace(time=clock.time, monotonic=clock.time))
+    return clock
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path, clock):
+    if request.param == 'sqlite':
+        return SQLiteSessionStore(str(tmp_path / 'state.db'), ttl_seconds=60)
+    return SessionStore(ttl_seconds=60, stripes=4)
+
+def record(name: str = 'photo.jpg') -> SessionRecord:
+    return SessionRecord(file_id='file-1', file_name=name, file_type='image', file_size=1024)
+
+def test_session_expires_after_the_ttl(store, clock):
+    store.put(42, record())
+    
+    clock.now += 61
+    
+    assert store.get(42) is None
+    assert 42 not in store
+
+def test_reading_a_session_renews_its_ttl(store, clock):
+    store.put(42, record())
+    
+    clock.now += 50
+    assert store.get(42)['file_name'] == 'photo.jpg'
+    clock.now += 50
+    
+    assert store.get(42) is not None
+
+def test_purge_removes_only_expired_sessions(store, clock):
+    store.put(1, record())
+    clock.now += 30
+    store.put(2, record('other.png'))
+    clock.now += 40
+    
+    assert store.purge_expired() == 1
+    assert store.get(2)['file_name'] == 'other.png'
+
+def test_memory_store_drops_least_recent_user_when_full():
+    store = SessionStore(max_entries=2, stripes=1)
+    for user_id in (1, 2, 3):
+        store.put(user_id, record())
+    
+    assert store.get(1) is None
+    assert len(store) == 2
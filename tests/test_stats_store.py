@@ -0,0 +1,44 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from utils.stats_store import UserStatsStore
+
+@pytest.fixture
+def store(tmp_path):
+    # A long interval keeps the background flusher out of the way
+    return UserStatsStore(str(tmp_path / 'stats.db'), flush_interval=3600)
+
+def test_flush_writes_pending_deltas(store):
+    store.record(1, 'compress_pdf', size_saved=100)
+    store.record(1, 'compress_pdf', size_saved=50)
+    store.record(2, 'rotate_pdf')
+    
+    store.flush()
+    
+    assert store.totals()['files_processed'] == 3
+    assert store.totals()['pending_users'] == 0
+    assert store.get(1)['total_size_saved'] == 150
+    assert store.get(1)['favorite_operation'] == 'compress_pdf'
+
+def test_failed_flush_restores_deltas(store, monkeypatch):
+    store.record(1, 'compress_pdf', size_saved=100)
+    
+    @contextmanager
+    def locked():
+        raise sqlite3.OperationalError('database is locked')
+        yield
+    
+    monkeypatch.setattr(store.db, 'transaction', locked)
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    store.record(1, 'compress_pdf', size_saved=20)
+    
+    # Nothing was lost: the restored delta merged with the newer write
+    assert store.get(1)['files_processed'] == 2
+    monkeypatch.undo()
+    store.flush()
+    assert store.totals()['files_processed'] == 2
+    assert store.get(1)['operations'] == {'compress_pdf': 2}
+    assert store.get(1)['total_size_saved'] == 120
@@ -0,0 +1,65 @@
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.telegram_api import TelegramBotAPI
+
+class RateLimitedAPI(BaseHTTPRequestHandler):
+    """Answers the first request with a 429 and records every request body length"""
+    
+    bodies = []
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.bodies.append(len(body))
+        if len(self.bodies) == 1:
+            status, payload = 429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                                    'parameters': {'retry_after': 0}}
+        else:
+            status, payload = 200, {'ok': True, 'result': {'message_id': 1}}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def api_server():
+    RateLimitedAPI.bodies = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RateLimitedAPI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.mark.parametrize('upload', [
+    lambda stream: stream,
+    lambda stream: ('document.pdf', stream),
+    lambda stream: ('document.pdf', stream, 'application/pdf')
+], ids=['file', 'name-file', 'name-file-mime'])
+def test_retry_after_429_resends_whole_upload(api_server, upload):
+    api = TelegramBotAPI('TOKEN', base_url=api_server)
+    document = io.BytesIO(b'%PDF' + b'x' * 10000)
+    
+    result = api.call('sendDocument', data={'chat_id': 1}, files={'document': upload(document)})
+    
+    assert result == {'message_id': 1}
+    first, retried = RateLimitedAPI.bodies
+    assert retried == first
+    assert first > 10000
+
+def test_forked_child_gets_its_own_session(monkeypatch):
+    api = TelegramBotAPI('TOKEN')
+    parent = api.session
+    assert api.session is parent
+    
+    monkeypatch.setattr('utils.telegram_api.os.getpid', lambda: -1)
+    assert api.session is not parent
@@ -0,0 +1,52 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import telegram_utils
+from utils.telegram_utils import stream_download
+
+PAYLOAD = bytes(range(256)) * 400
+
+class ShortReadServer(BaseHTTPRequestHandler):
+    """Closes the first response cleanly halfway through and records every Range header"""
+    
+    ranges = []
+    
+    def do_GET(self):
+        self.ranges.append(self.headers.get('Range'))
+        if len(self.ranges) == 1:
+            # No Content-Length: the client only learns the body ended when the socket closes
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(PAYLOAD[:len(PAYLOAD) // 2])
+            return
+        start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+        body = PAYLOAD[start:]
+        self.send_response(206)
+        self.send_header('Content-Range', f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def file_server(monkeypatch):
+    monkeypatch.setattr(telegram_utils.time, 'sleep', lambda seconds: None)
+    ShortReadServer.ranges = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ShortReadServer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/file"
+    server.shutdown()
+    server.server_close()
+
+def test_clean_early_close_resumes_with_range(file_server, tmp_path):
+    save_path = tmp_path / 'download.bin'
+    
+    assert stream_download(file_server, str(save_path), expected_size=len(PAYLOAD))
+    
+    assert ShortReadServer.ranges == [None, f"bytes={len(PAYLOAD) // 2}-"]
+    assert save_path.read_bytes() == PAYLOAD
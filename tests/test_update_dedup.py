@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+from utils import update_dedup
+from utils.update_dedup import UpdateDeduplicator
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+def test_keys_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(update_dedup, 'time', SimpleNamespace(monotonic=clock.monotonic))
+    dedup = UpdateDeduplicator(ttl_seconds=60)
+    
+    assert not dedup.is_duplicate('update:1')
+    clock.now += 59
+    assert dedup.is_duplicate('update:1')
+    clock.now += 2
+    assert not dedup.is_duplicate('update:1')
+    assert dedup.duplicates == 1
+
+def test_oldest_key_is_dropped_when_full():
+    dedup = UpdateDeduplicator(max_entries=2)
+    for key in ('update:1', 'update:2', 'update:3'):
+        dedup.is_duplicate(key)
+    
+    assert len(dedup) == 2
+    assert not dedup.is_duplicate('update:1')
+
+def test_forgotten_update_is_processed_on_redelivery():
+    # The webhook forgets an update whose handling failed, so Telegram's retry gets through
+    dedup = UpdateDeduplicator()
+    assert not dedup.is_duplicate('update:7')
+    
+    dedup.forget('update:7')
+    
+    assert not dedup.is_duplicate('update:7')
+    assert dedup.is_duplicate('update:7')
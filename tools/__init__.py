@@ -0,0 +1 @@
+# Development tools: offline Telegram Bot API stand-in and load generator
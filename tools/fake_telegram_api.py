@@ -0,0 +1,360 @@
+"""
+Offline stand-in for the Telegram Bot API, for load and integration testing.
+
+Implements the methods the bots use (getMe, getFile, the file download route,
+sendMessage, editMessageText, sendDocument, answerCallbackQuery, setWebhook,
+deleteWebhook, getUpdates) with configurable latency and injected 429s.
+Files in the fixtures directory can be requested by file_id
+"fixture-<file name>". Every call is recorded so a load generator can see
+when a document was delivered.
+
+Point a bot at it with TELEGRAM_API_BASE_URL=http://127.0.0.1:8081 and run:
+
+    python -m tools.fake_telegram_api --port 8081 --fixtures benchmarks/corpus/images \\
+        --latency-ms 40 --jitter-ms 20 --rate-429 0.02
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from flask import Flask, Response, jsonify, request, send_file
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {'id': 100000001, 'is_bot': True, 'first_name': 'Fake Converter', 'username': 'fake_converter_bot'}
+
+class FakeTelegramState:
+    """Files, messages, queued updates and the call log shared by all request threads"""
+    
+    def __init__(self, token=None, latency_ms: float = 0, jitter_ms: float = 0,
+                 rate_429: float = 0, retry_after: int = 1, method_latency_ms=None,
+                 max_events: int = 100000, seed=None):
+        self.token = token
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.method_latency_ms = dict(method_latency_ms or {})
+        self.webhook_url = None
+        self.files = {}
+        self.events = deque(maxlen=max_events)
+        self.counts = {}
+        self._event_seq = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._file_seq = itertools.count(1)
+        self._updates = deque()
+        self._update_ids = itertools.count(1)
+        self._updates_ready = threading.Condition()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+    
+    def add_file(self, path: str, file_id=None) -> dict:
+        """Serve path for getFile/download under file_id (default fixture-<name>)"""
+        name = os.path.basename(path)
+        file_id = file_id or f"fixture-{name}"
+        entry = {
+            'file_id': file_id,
+            'file_unique_id': hashlib.sha1(file_id.encode()).hexdigest()[:16],
+            'file_size': os.path.getsize(path),
+            'file_path': f"documents/{name}",
+            'file_name': name,
+            'path': path
+        }
+        with self._lock:
+            self.files[file_id] = entry
+        return entry
+    
+    def add_fixtures(self, directory: str) -> int:
+        count = 0
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                self.add_file(os.path.join(root, name))
+                count += 1
+        return count
+    
+    def file_by_path(self, file_path: str):
+        with self._lock:
+            return next((entry for entry in self.files.values() if entry['file_path'] == file_path), None)
+    
+    def delay(self, method: str):
+        latency = self.method_latency_ms.get(method, self.latency_ms)
+        if self.jitter_ms:
+            latency += self._random.uniform(0, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+    
+    def should_throttle(self, method: str) -> bool:
+        # getUpdates and getFile are not flood limited by Telegram either
+        return method not in ('getUpdates', 'getFile', 'getMe') and self._random.random() < self.rate_429
+    
+    def record(self, method: str, params: dict, status: int, **extra):
+        event = {'seq': next(self._event_seq), 'time': time.time(), 'method': method,
+                 'chat_id': params.get('chat_id'), 'status': status}
+        event.update(extra)
+        with self._lock:
+            self.events.append(event)
+            self.counts[(method, status)] = self.counts.get((method, status), 0) + 1
+    
+    def message(self, chat_id, **fields) -> dict:
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'from': BOT_USER,
+            'chat': {'id': _as_int(chat_id), 'type': 'private' if str(chat_id)[:1] != '-' else 'group'}
+        }
+        message.update({key: value for key, value in fields.items() if value is not None})
+        return message
+    
+    def stored_document(self, file_name: str, size: int) -> dict:
+        """Register an uploaded document so it can later be resent or fetched by file_id"""
+        file_id = f"sent-{next(self._file_seq)}"
+        document = {
+            'file_id': file_id,
+            'file_unique_id': hashlib.sha1(file_id.encode()).hexdigest()[:16],
+            'file_name': file_name,
+            'file_size': size
+        }
+        with self._lock:
+            self.files[file_id] = dict(document, file_path=f"documents/{file_id}", path=None)
+        return document
+    
+    def push_update(self, update: dict) -> dict:
+        with self._updates_ready:
+            update = dict(update)
+            update.setdefault('update_id', next(self._update_ids))
+            self._updates.append(update)
+            self._updates_ready.notify_all()
+        return update
+    
+    def take_updates(self, offset: int, limit: int, timeout: float) -> list:
+        deadline = time.monotonic() + timeout
+        with self._updates_ready:
+            while True:
+                # Like Telegram, an offset confirms every update before it
+                while self._updates and self._updates[0]['update_id'] < offset:
+                    self._updates.popleft()
+                if self._updates:
+                    return list(itertools.islice(self._updates, limit))
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._updates_ready.wait(remaining)
+    
+    def events_since(self, seq: int, method=None) -> list:
+        with self._lock:
+            return [event for event in self.events
+                    if event['seq'] > seq and (method is None or event['method'] == method)]
+    
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {f"{method}:{status}": count for (method, status), count in sorted(self.counts.items())}
+            return {'files': len(self.files), 'events': len(self.events), 'calls': counts}
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+def _request_params() -> dict:
+    """Bot API parameters from the query string, a form, multipart fields or a JSON body"""
+    params = request.args.to_dict()
+    params.update(request.form.to_dict())
+    if request.is_json:
+        params.update(request.get_json(silent=True) or {})
+    return params
+
+def _ok(result):
+    return jsonify({'ok': True, 'result': result})
+
+def _error(code: int, description: str, **extra):
+    body = {'ok': False, 'error_code': code, 'description': description}
+    body.update(extra)
+    return jsonify(body), code
+
+def create_app(state: FakeTelegramState) -> Flask:
+    app = Flask(__name__)
+    
+    def answer(method: str, params: dict):
+        if method == 'getMe':
+            return _ok(BOT_USER)
+        
+        if method == 'getFile':
+            entry = state.files.get(params.get('file_id'))
+            if entry is None:
+                return _error(400, 'Bad Request: invalid file_id')
+            return _ok({key: entry[key] for key in ('file_id', 'file_unique_id', 'file_size', 'file_path')})
+        
+        if method == 'sendMessage':
+            return _ok(state.message(params.get('chat_id'), text=params.get('text')))
+        
+        if method == 'editMessageText':
+            return _ok(state.message(params.get('chat_id'), text=params.get('text')))
+        
+        if method == 'sendDocument':
+            upload = request.files.get('document')
+            if upload is not None:
+                size = len(upload.read())
+                document = state.stored_document(upload.filename or 'document', size)
+            else:
+                known = state.files.get(params.get('document'))
+                if known is None:
+                    return _error(400, 'Bad Request: wrong file identifier/HTTP URL specified')
+                document = {key: known[key] for key in ('file_id', 'file_unique_id', 'file_name', 'file_size')}
+            return _ok(state.message(params.get('chat_id'), document=document, caption=params.get('caption')))
+        
+        if method in ('answerCallbackQuery', 'deleteWebhook'):
+            return _ok(True)
+        
+        if method == 'setWebhook':
+            state.webhook_url = params.get('url')
+            return _ok(True)
+        
+        if method == 'getWebhookInfo':
+            return _ok({'url': state.webhook_url or '', 'pending_update_count': 0})
+        
+        if method == 'getUpdates':
+            offset = int(params.get('offset') or 0)
+            limit = int(params.get('limit') or 100)
+            return _ok(state.take_updates(offset, limit, min(float(params.get('timeout') or 0), 10)))
+        
+        return _error(404, f'Not Found: method {method} is not implemented by the fake server')
+    
+    @app.route('/bot<token>/<method>', methods=['GET', 'POST'])
+    def bot_method(token, method):
+        params = _request_params()
+        if state.token and token != state.token:
+            state.record(method, params, 401)
+            return _error(401, 'Unauthorized')
+        
+        state.delay(method)
+        if state.should_throttle(method):
+            state.record(method, params, 429)
+            return _error(429, f'Too Many Requests: retry after {state.retry_after}',
+                          parameters={'retry_after': state.retry_after})
+        
+        response = answer(method, params)
+        status = response[1] if isinstance(response, tuple) else 200
+        document = None
+        if method == 'sendDocument' and status == 200:
+            document = response.get_json()['result']['document']['file_id']
+        state.record(method, params, status, document=document)
+        return response
+    
+    @app.route('/file/bot<token>/<path:file_path>')
+    def download(token, file_path):
+        if state.token and token != state.token:
+            return _error(401, 'Unauthorized')
+        state.delay('download')
+        entry = state.file_by_path(file_path)
+        if entry is None or not entry.get('path'):
+            state.record('download', {}, 404)
+            return _error(404, 'Not Found')
+        state.record('download', {}, 200, bytes=entry['file_size'])
+        # conditional=True serves Range requests, which resumable downloads rely on
+        return send_file(entry['path'], conditional=True)
+    
+    # Control endpoints for test drivers
+    @app.route('/_fake/files', methods=['POST'])
+    def register_file():
+        body = request.get_json(force=True)
+        if not os.path.isfile(body.get('path', '')):
+            return _error(400, 'path must be an existing file')
+        return _ok(state.add_file(body['path'], body.get('file_id')))
+    
+    @app.route('/_fake/updates', methods=['POST'])
+    def queue_update():
+        return _ok(state.push_update(request.get_json(force=True)))
+    
+    @app.route('/_fake/events')
+    def events():
+        since = int(request.args.get('since', 0))
+        return _ok(state.events_since(since, request.args.get('method')))
+    
+    @app.route('/_fake/config', methods=['POST'])
+    def configure():
+        body = request.get_json(force=True)
+        for name, cast in (('latency_ms', float), ('jitter_ms', float), ('rate_429', float), ('retry_after', int)):
+            if name in body:
+                setattr(state, name, cast(body[name]))
+        if 'method_latency_ms' in body:
+            state.method_latency_ms = dict(body['method_latency_ms'])
+        return _ok(True)
+    
+    @app.route('/_fake/stats')
+    def stats():
+        return Response(json.dumps(state.stats(), indent=2), mimetype='application/json')
+    
+    return app
+
+class FakeTelegramServer:
+    """Runs the fake API on a background thread, for use from test and load scripts"""
+    
+    def __init__(self, state: FakeTelegramState = None, host: str = '127.0.0.1', port: int = 0,
+                 quiet: bool = True):
+        from werkzeug.serving import make_server
+        
+        if quiet:
+            # One access log line per call drowns everything else under load
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.state = state or FakeTelegramState()
+        self._server = make_server(host, port, create_app(self.state), threaded=True)
+        self.base_url = f"http://{host}:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-telegram", daemon=True)
+    
+    def start(self) -> 'FakeTelegramServer':
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def _method_latencies(values: list) -> dict:
+    latencies = {}
+    for value in values or []:
+        method, _, milliseconds = value.partition('=')
+        latencies[method] = float(milliseconds)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an offline stand-in for the Telegram Bot API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--token', help="Only accept this bot token (any token by default)")
+    parser.add_argument('--fixtures', action='append', default=[], help="Directory of files to serve")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every call")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Extra uniform random delay")
+    parser.add_argument('--method-latency', action='append', metavar='METHOD=MS',
+                        help="Per-method delay, e.g. sendDocument=300 (repeatable)")
+    parser.add_argument('--rate-429', type=float, default=0, help="Fraction of calls answered with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="retry_after sent with injected 429s")
+    parser.add_argument('--seed', type=int, help="Seed for jitter and 429 injection")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    state = FakeTelegramState(
+        token=args.token, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429, retry_after=args.retry_after,
+        method_latency_ms=_method_latencies(args.method_latency), seed=args.seed
+    )
+    for directory in args.fixtures:
+        logger.info(f"Serving {state.add_fixtures(directory)} fixture(s) from {directory}")
+    
+    create_app(state).run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+"""
+End-to-end load generator for the webhook bot (main.py).
+
+Virtual users upload a fixture (a `message` update) and press an operation
+button (a `callback_query` update), arriving at a fixed rate per load step.
+Telegram is replaced by tools.fake_telegram_api, which records when each
+result document is sent back. Every step reports time-to-ack and
+time-to-delivered-document percentiles per operation, throughput and error
+rate.
+
+By default main.app is served in-process on a local port with a fake API in
+the same process:
+    
+    python -m tools.loadgen --fixtures benchmarks/corpus --rates 1,2,5,10 --step-seconds 30
+
+Against a deployed instance (e.g. gunicorn started with
+TELEGRAM_API_BASE_URL pointing at a separately running fake API):
+    
+    python -m tools.loadgen --target-url http://127.0.0.1:8080 --api-url http://127.0.0.1:8081 ...
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Operation button -> fixture extensions it accepts, mirroring main.create_operation_buttons
+OPERATION_INPUTS = {
+    'convert_jpg_to_png': ('jpg',),
+    'convert_png_to_jpg': ('png',),
+    'compress_image': ('jpg', 'png'),
+    'compress_pdf': ('pdf',),
+    'convert_pdf_to_images': ('pdf',),
+    'convert_to_mp4': ('mov',),
+    'convert_to_gif': ('mp4',)
+}
+
+DEFAULT_MIX = 'compress_image=4,convert_jpg_to_png=2,convert_png_to_jpg=1,compress_pdf=2,convert_to_gif=1'
+
+LOADGEN_TOKEN = '123456:loadgen'
+
+def percentile(values: list, fraction: float):
+    """Nearest-rank percentile; None for no samples"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(','):
+        operation, _, weight = part.partition('=')
+        operation = operation.strip()
+        if operation not in OPERATION_INPUTS:
+            raise SystemExit(f"Unknown operation in --mix: {operation} (known: {', '.join(OPERATION_INPUTS)})")
+        mix[operation] = float(weight or 1)
+    return mix
+
+def find_fixtures(directories: list) -> dict:
+    """Fixture paths grouped by extension"""
+    by_ext = defaultdict(list)
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                ext = os.path.splitext(name)[1].lstrip('.').lower()
+                by_ext[ext].append(os.path.join(root, name))
+    return by_ext
+
+class DeliveryTracker:
+    """Polls the fake API's call log and records when each chat received a document"""
+    
+    def __init__(self, api_url: str, interval: float = 0.05):
+        self.api_url = api_url
+        self.interval = interval
+        self.delivered = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._poll, name="delivery-tracker", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+    
+    def _poll(self):
+        while not self._stop.is_set():
+            try:
+                events = self._session.get(
+                    f"{self.api_url}/_fake/events", params={'since': self._seq, 'method': 'sendDocument'}, timeout=10
+                ).json()['result']
+            except (requests.RequestException, ValueError):
+                events = []
+            with self._lock:
+                for event in events:
+                    self._seq = max(self._seq, event['seq'])
+                    if event['status'] == 200:
+                        self.delivered.setdefault(str(event['chat_id']), event['time'])
+            if not events:
+                self._stop.wait(self.interval)
+    
+    def delivered_at(self, chat_id):
+        with self._lock:
+            return self.delivered.get(str(chat_id))
+
+class VirtualUser:
+    """One upload followed by one button press"""
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, operation: str, fixture: str, file_id: str, file_size: int):
+        self.number = next(self._ids)
+        self.user_id = 700000000 + self.number
+        self.operation = operation
+        self.fixture = fixture
+        self.file_id = file_id
+        self.file_size = file_size
+        self.message_ack = None
+        self.callback_sent_at = None
+        self.callback_ack = None
+        self.error = None
+    
+    def message_update(self) -> dict:
+        chat = {'id': self.user_id, 'type': 'private'}
+        user = {'id': self.user_id, 'is_bot': False, 'first_name': f"load{self.number}"}
+        return {
+            'update_id': 10 * self.number,
+            'message': {
+                'message_id': 1,
+                'date': int(time.time()),
+                'chat': chat,
+                'from': user,
+                'document': {
+                    'file_id': self.file_id,
+                    'file_unique_id': self.file_id,
+                    'file_name': os.path.basename(self.fixture),
+                    'file_size': self.file_size
+                }
+            }
+        }
+    
+    def callback_update(self) -> dict:
+        chat = {'id': self.user_id, 'type': 'private'}
+        user = {'id': self.user_id, 'is_bot': False, 'first_name': f"load{self.number}"}
+        return {
+            'update_id': 10 * self.number + 1,
+            'callback_query': {
+                'id': f"load-{self.number}",
+                'from': user,
+                'message': {'message_id': 2, 'date': int(time.time()), 'chat': chat},
+                'chat_instance': str(self.user_id),
+                'data': self.operation
+            }
+        }
+
+class LoadGenerator:
+    def __init__(self, target_url: str, api_url: str, fixtures: dict, mix: dict,
+                 think_time: float = 0.2, delivery_timeout: float = 120, unique_files: bool = True,
+                 max_in_flight: int = 512, seed: int = 1):
+        self.webhook_url = f"{target_url.rstrip('/')}/webhook"
+        self.api_url = api_url.rstrip('/')
+        self.think_time = think_time
+        self.delivery_timeout = delivery_timeout
+        self.unique_files = unique_files
+        self.random = random.Random(seed)
+        self.session = requests.Session()
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=max_in_flight))
+        self.pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="loadgen")
+        self.tracker = DeliveryTracker(self.api_url)
+        
+        self.choices = []
+        for operation, weight in mix.items():
+            paths = [path for ext in OPERATION_INPUTS[operation] for path in fixtures.get(ext, [])]
+            if not paths:
+                print(f"warning: no fixtures for {operation} ({'/'.join(OPERATION_INPUTS[operation])})",
+                      file=sys.stderr)
+                continue
+            self.choices.append((operation, paths, weight))
+        if not self.choices:
+            raise SystemExit("No operation in the mix has a matching fixture")
+    
+    def _register(self, path: str) -> str:
+        """Register the upload with the fake API; unique ids keep caches from serving repeats"""
+        file_id = f"load-{os.path.basename(path)}-{next(_upload_ids)}" if self.unique_files else None
+        response = self.session.post(f"{self.api_url}/_fake/files", json={'path': os.path.abspath(path),
+                                                                           'file_id': file_id}, timeout=10)
+        return response.json()['result']['file_id']
+    
+    def _post(self, update: dict) -> float:
+        start = time.perf_counter()
+        response = self.session.post(self.webhook_url, json=update, timeout=60)
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f"webhook answered {response.status_code}")
+        return elapsed
+    
+    def _run_user(self, user: VirtualUser):
+        try:
+            user.message_ack = self._post(user.message_update())
+            time.sleep(self.think_time)
+            user.callback_sent_at = time.time()
+            user.callback_ack = self._post(user.callback_update())
+        except Exception as e:
+            user.error = str(e)
+    
+    def _new_user(self) -> VirtualUser:
+        operation, paths, _ = self.random.choices(self.choices, weights=[c[2] for c in self.choices])[0]
+        path = self.random.choice(paths)
+        return VirtualUser(operation, path, self._register(path), os.path.getsize(path))
+    
+    def run_step(self, rate: float, duration: float) -> dict:
+        """Start rate users per second for duration seconds, then wait for their documents"""
+        users = []
+        futures = []
+        start = time.perf_counter()
+        for n in itertools.count():
+            due = start + n / rate
+            if due - start >= duration:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            user = self._new_user()
+            users.append(user)
+            futures.append(self.pool.submit(self._run_user, user))
+        for future in futures:
+            future.result()
+        offered_seconds = time.perf_counter() - start
+        
+        deadline = time.time() + self.delivery_timeout
+        while time.time() < deadline:
+            if all(user.error or self.tracker.delivered_at(user.user_id) for user in users):
+                break
+            time.sleep(0.1)
+        
+        return self._summarize(rate, users, offered_seconds, time.perf_counter() - start)
+    
+    def _summarize(self, rate: float, users: list, offered_seconds: float, total_seconds: float) -> dict:
+        per_operation = defaultdict(lambda: {'ack': [], 'delivery': [], 'errors': 0, 'timeouts': 0, 'users': 0})
+        message_acks = []
+        delivered = 0
+        for user in users:
+            stats = per_operation[user.operation]
+            stats['users'] += 1
+            if user.message_ack is not None:
+                message_acks.append(user.message_ack)
+            if user.error:
+                stats['errors'] += 1
+                continue
+            stats['ack'].append(user.callback_ack)
+            delivered_at = self.tracker.delivered_at(user.user_id)
+            if delivered_at is None:
+                stats['timeouts'] += 1
+            else:
+                stats['delivery'].append(delivered_at - user.callback_sent_at)
+                delivered += 1
+        
+        def summary(values):
+            return {name: (round(percentile(values, q) * 1000, 1) if values else None)
+                    for name, q in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99))}
+        
+        failures = sum(stats['errors'] + stats['timeouts'] for stats in per_operation.values())
+        return {
+            'rate': rate,
+            'users': len(users),
+            'offered_rate': round(len(users) / offered_seconds, 2) if offered_seconds else 0,
+            'throughput': round(delivered / total_seconds, 2) if total_seconds else 0,
+            'error_rate': round(failures / len(users), 4) if users else 0,
+            'message_ack': summary(message_acks),
+            'operations': {
+                operation: {
+                    'users': stats['users'],
+                    'errors': stats['errors'],
+                    'timeouts': stats['timeouts'],
+                    'ack': summary(stats['ack']),
+                    'delivery': summary(stats['delivery'])
+                }
+                for operation, stats in sorted(per_operation.items())
+            }
+        }
+
+_upload_ids = itertools.count(1)
+
+def _ms(summary: dict) -> str:
+    return ' '.join(f"{name[:3]} {'-' if value is None else f'{value}ms'}" for name, value in summary.items())
+
+def print_step(result: dict):
+    print(f"\n=== {result['rate']} users/s: {result['users']} users, offered {result['offered_rate']}/s, "
+          f"throughput {result['throughput']} docs/s, errors {result['error_rate']:.1%} ===")
+    ack = result['message_ack']
+    print(f"  {'message upload':<24} ack {_ms(ack)}")
+    for operation, stats in result['operations'].items():
+        print(f"  {operation:<24} ack {_ms(stats['ack'])} | delivered {_ms(stats['delivery'])} | "
+              f"{stats['users']} users, {stats['errors']} errors, {stats['timeouts']} timeouts")
+
+def start_local_stack(args):
+    """Fake API and main.app in this process; returns (target_url, api_url, servers)"""
+    from tools.fake_telegram_api import FakeTelegramServer, FakeTelegramState
+    
+    state = FakeTelegramState(latency_ms=args.api_latency_ms, jitter_ms=args.api_jitter_ms,
+                              rate_429=args.rate_429, seed=args.seed)
+    api = FakeTelegramServer(state).start()
+    
+    # main reads its settings at import, so the environment must be ready first;
+    # state and caches go to a scratch dir so a run leaves nothing in the checkout
+    state_dir = tempfile.mkdtemp(prefix='loadgen_state_')
+    os.environ.update({
+        'BOT_TOKEN': LOADGEN_TOKEN,
+        'TELEGRAM_API_BASE_URL': api.base_url,
+        'STATE_DB_PATH': os.path.join(state_dir, 'state.db'),
+        'JOB_JOURNAL_PATH': os.path.join(state_dir, 'jobs.db'),
+        'INPUT_CACHE_DIR': os.path.join(state_dir, 'cache', 'inputs'),
+        'RESULT_CACHE_DIR': os.path.join(state_dir, 'cache', 'results')
+    })
+    if args.job_workers:
+        os.environ['JOB_WORKERS'] = str(args.job_workers)
+    
+    from werkzeug.serving import make_server
+    import main
+    
+    # Per-update INFO logs would drown the report
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    
+    server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="loadgen-target", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", api.base_url, (server, api)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay upload + button-press traffic against /webhook")
+    parser.add_argument('--fixtures', action='append', required=True, help="Directory of input files")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="operation=weight,... (default: %(default)s)")
+    parser.add_argument('--rates', default='1,2,5', help="Users per second for each load step")
+    parser.add_argument('--step-seconds', type=float, default=30, help="Duration of each load step")
+    parser.add_argument('--think-ms', type=float, default=200, help="Delay between upload and button press")
+    parser.add_argument('--delivery-timeout', type=float, default=120, help="Seconds to wait for documents")
+    parser.add_argument('--repeat-files', action='store_true',
+                        help="Reuse file ids so the result cache and file_id resends are exercised")
+    parser.add_argument('--target-url', help="Running bot to load (default: main.app in-process)")
+    parser.add_argument('--api-url', help="Fake Telegram API used by --target-url")
+    parser.add_argument('--api-latency-ms', type=float, default=30, help="In-process fake API latency")
+    parser.add_argument('--api-jitter-ms', type=float, default=20, help="In-process fake API jitter")
+    parser.add_argument('--rate-429', type=float, default=0, help="In-process fake API 429 fraction")
+    parser.add_argument('--job-workers', type=int, help="JOB_WORKERS for the in-process bot")
+    parser.add_argument('--output', help="Write all step results to this JSON file")
+    parser.add_argument('--verbose', action='store_true', help="Keep the in-process bot's INFO logs")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    if args.target_url and not args.api_url:
+        parser.error("--target-url needs --api-url (the fake API the target talks to)")
+    
+    if args.target_url:
+        target_url, api_url = args.target_url, args.api_url
+    else:
+        target_url, api_url, _ = start_local_stack(args)
+    
+    generator = LoadGenerator(
+        target_url, api_url, find_fixtures(args.fixtures), parse_mix(args.mix),
+        think_time=args.think_ms / 1000, delivery_timeout=args.delivery_timeout,
+        unique_files=not args.repeat_files, seed=args.seed
+    )
+    generator.tracker.start()
+    results = []
+    try:
+        for rate in (float(value) for value in args.rates.split(',')):
+            result = generator.run_step(rate, args.step_seconds)
+            print_step(result)
+            results.append(result)
+    finally:
+        generator.tracker.stop()
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'target': target_url, 'mix': parse_mix(args.mix), 'steps': results}, f, indent=2)
+        print(f"\nWrote {len(results)} step(s) to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,71 @@
 # Utility modules
-from .file_manager import temp_manager, TempFileManager
-from .telegram_utils import download_telegram_file, get_file_info, validate_file_size, get_file_extension
+from .file_manager import temp_manager, TempFileManager, TempSpaceError
+from .telegram_utils import (
+    download_telegram_file, telegram_file_url, stream_download, get_file_info, get_file_unique_id,
+    validate_file_size, get_file_extension
+)
 from .logging_config import setup_logging
+from .job_queue import JobQueue, LaneScheduler
+from .update_dedup import UpdateDeduplicator
+from .telegram_api import TelegramBotAPI, TelegramAPIError, configure_telebot
+from .progress import ProgressReporter
+from .disk_cache import DiskLRUCache, conversion_cache_key
+from .sent_files import SentFileIndex, SentFile, extract_file_id
+from .session_store import SessionStore, SessionRecord, SQLiteSessionStore, create_session_store
+from .sqlite_db import SQLiteDatabase
+from .job_journal import JobJournal
+from .stats_store import UserStatsStore
+from .metrics import REGISTRY, MetricsRegistry, register_cache_metrics
+from .tracing import trace, span, current_trace_id
+from .process_pool import ConversionPool, ConversionResult, available_cpus
+from .memory_budget import MemoryBudget, memory_limit
+from .outbound_scheduler import OutboundScheduler, TokenBucket, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
 
 __all__ = [
     'temp_manager',
     'TempFileManager',
+    'TempSpaceError',
     'download_telegram_file',
+    'telegram_file_url',
+    'stream_download',
     'get_file_info',
+    'get_file_unique_id',
     'validate_file_size',
     'get_file_extension',
-    'setup_logging'
+    'setup_logging',
+    'JobQueue',
+    'LaneScheduler',
+    'UpdateDeduplicator',
+    'TelegramBotAPI',
+    'TelegramAPIError',
+    'configure_telebot',
+    'ProgressReporter',
+    'DiskLRUCache',
+    'conversion_cache_key',
+    'SentFileIndex',
+    'SentFile',
+    'extract_file_id',
+    'SessionStore',
+    'SessionRecord',
+    'SQLiteSessionStore',
+    'create_session_store',
+    'SQLiteDatabase',
+    'JobJournal',
+    'UserStatsStore',
+    'OutboundScheduler',
+    'TokenBucket',
+    'PRIORITY_HIGH',
+    'PRIORITY_NORMAL',
+    'PRIORITY_LOW',
+    'REGISTRY',
+    'MetricsRegistry',
+    'register_cache_metrics',
+    'trace',
+    'span',
+    'current_trace_id',
+    'ConversionPool',
+    'ConversionResult',
+    'available_cpus',
+    'MemoryBudget',
+    'memory_limit'
 ]
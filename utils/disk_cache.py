@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: a cache directory is never shared between processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def conversion_cache_key(file_unique_id: str, operation: str, params: Optional[dict] = None) -> Optional[str]:
+    """Content address for a conversion result.
+    
+    Telegram's file_unique_id is stable for the same bytes across users and
+    bots, so together with the operation and its effective parameters it
+    identifies the output. Passwords are hashed before they enter the key.
+    """
+    if not file_unique_id:
+        return None
+    
+    normalized = {}
+    for name, value in (params or {}).items():
+        if value is None:
+            continue
+        if 'password' in name:
+            value = hashlib.sha256(str(value).encode('utf-8')).hexdigest()
+        normalized[name] = value
+    
+    canonical = json.dumps(
+        {'file': file_unique_id, 'operation': operation, 'params': normalized},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class DiskLRUCache:
+    """Disk-backed key -> file cache with LRU eviction under a byte budget.
+    
+    Entries checked out with acquire() (or put(..., pin=True)) are reference
+    counted and never evicted until every holder has called release().
+    
+    The index and pins live in one process. With shares > 1 (one cache per
+    gunicorn worker) each process claims its own slot directory under root,
+    locked for its lifetime, with max_bytes / shares of the budget, so no
+    process ever evicts a file another one is using. Slots are claimed on first
+    use in each process, so a cache built before the fork is never shared.
+    """
+    
+    def __init__(self, base_dir: str, max_bytes: int, shares: int = 1):
+        self.root = base_dir
+        self.shares = max(1, shares) if fcntl else 1
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes // self.shares
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._slot_file = None
+        self._reset()
+    
+    def _reset(self):
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._pins = {}
+    
+    def _ensure_slot(self):
+        """Bind this process to its cache directory and index (once per process)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._reset()
+            self.base_dir = self._claim_slot() if self.shares > 1 else self.root
+            os.makedirs(self.base_dir, exist_ok=True)
+            self._load_index()
+            self._pid = os.getpid()
+    
+    def _claim_slot(self) -> str:
+        # The lowest slot no live process holds; the lock goes away with its holder
+        os.makedirs(self.root, exist_ok=True)
+        slot = 0
+        while True:
+            lock_file = open(os.path.join(self.root, f"slot-{slot}.lock"), 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                slot += 1
+                continue
+            self._slot_file = lock_file
+            return os.path.join(self.root, f"slot-{slot}")
+    
+    def _load_index(self):
+        """Rebuild the in-memory index from disk once, oldest access first"""
+        found = []
+        for filename in os.listdir(self.base_dir):
+            path = os.path.join(self.base_dir, filename)
+            if not os.path.isfile(path) or filename.endswith(('.tmp', '.lock')):
+                continue
+            stat = os.stat(path)
+            key = os.path.splitext(filename)[0]
+            found.append((stat.st_mtime, key, path, stat.st_size))
+        
+        for _, key, path, size in sorted(found):
+            self._entries[key] = (path, size)
+            self.total_bytes += size
+        self._evict(0)
+    
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """Return the cached file path for key, or None on a miss"""
+        return self._lookup(key, pin=False)
+    
+    def acquire(self, key: Optional[str]) -> Optional[str]:
+        """Like get(), but keeps the entry from being evicted until release(key)"""
+        return self._lookup(key, pin=True)
+    
+    def release(self, key: Optional[str]):
+        """Drop one reference taken by acquire() or put(..., pin=True)"""
+        if not key:
+            return
+        self._ensure_slot()
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+                return
+            self._pins.pop(key, None)
+            # Entries that were pinned while over budget can go now
+            self._evict(0)
+    
+    def _lookup(self, key: Optional[str], pin: bool) -> Optional[str]:
+        if not key:
+            return None
+        
+        self._ensure_slot()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not os.path.exists(entry[0]):
+                if entry is not None:
+                    self._forget(key)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if pin:
+                self._pins[key] = self._pins.get(key, 0) + 1
+        
+        try:
+            # Keep mtime in step with LRU order so a restart rebuilds the same order
+            os.utime(entry[0])
+        except OSError:
+            pass
+        return entry[0]
+    
+    def put(self, key: Optional[str], source_path: str, pin: bool = False,
+            move: bool = False) -> Optional[str]:
+        """Copy (or move) source_path into the cache under key and return the cached path.
+        
+        With pin=True the new entry is returned already acquired. Returns None
+        if the file cannot be cached, including when pinned entries leave no
+        room for an unpinned one.
+        """
+        if not key or not os.path.isfile(source_path):
+            return None
+        
+        self._ensure_slot()
+        size = os.path.getsize(source_path)
+        if size > self.max_bytes:
+            return None
+        
+        extension = os.path.splitext(source_path)[1]
+        cached_path = os.path.join(self.base_dir, f"{key}{extension}")
+        tmp_path = f"{cached_path}.{threading.get_ident()}.tmp"
+        
+        try:
+            if move:
+                shutil.move(source_path, tmp_path)
+            else:
+                shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, cached_path)
+        except OSError as e:
+            logger.warning(f"Failed to cache {source_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        
+        with self._lock:
+            if key in self._entries:
+                self._forget(key)
+            self._entries[key] = (cached_path, size)
+            self.total_bytes += size
+            if pin:
+                self._pins[key] = self._pins.get(key, 0) + 1
+            # Older entries make room first; the new one only goes if it still does not fit
+            self._evict(0, keep=key)
+            if self.total_bytes > self.max_bytes and key not in self._pins:
+                self._forget(key)
+                evicted = True
+            else:
+                evicted = False
+        
+        if evicted:
+            try:
+                os.remove(cached_path)
+            except OSError:
+                pass
+            return None
+        return cached_path
+    
+    def _evict(self, incoming_bytes: int, keep: Optional[str] = None):
+        # Caller holds the lock; files in use by a job (and keep) are skipped
+        evictable = [key for key in self._entries if key not in self._pins and key != keep]
+        for key in evictable:
+            if self.total_bytes + incoming_bytes <= self.max_bytes:
+                break
+            path, _ = self._entries[key]
+            self._forget(key)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _forget(self, key: str):
+        _, size = self._entries.pop(key)
+        self.total_bytes -= size
+    
+    def stats(self) -> dict:
+        """Snapshot of cache usage"""
+        self._ensure_slot()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "pinned": len(self._pins),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -1,61 +1,266 @@
+import logging
 import os
+import shutil
 import tempfile
+import threading
 import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import Optional
 
+from operations.registry import find_operation
+
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class TempSpaceError(Exception):
+    """Raised by job_dir when the temp budget has no room for a job"""
+
 class TempFileManager:
-    """Manages temporary files for the bot operations"""
+    """Manages temporary files for the bot operations.
+    
+    Every file and job directory handed out is kept in an in-memory index with
+    its size and last access, so the byte budget is enforced at allocation time
+    by evicting the least recently used idle entries, without scanning the
+    directory. Only the top level of base_dir is managed; subdirectories such
+    as the caches are left alone. Job directories that do not fit wait up to
+    wait_seconds for running jobs to finish, then are refused.
+    """
     
-    def __init__(self, base_dir: str = "temp"):
+    def __init__(self, base_dir: str = "temp", fast_dir: Optional[str] = None, fast_max_bytes: int = 0,
+                 max_bytes: int = 0, wait_seconds: float = 30):
         self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        self.wait_seconds = wait_seconds
+        self.total_bytes = 0
+        self.evictions = 0
+        self.refused = 0
+        self.fast_bytes = 0
+        self._entries = OrderedDict()
+        self._active = set()
+        self._lock = threading.Lock()
+        self._space_free = threading.Condition(self._lock)
         os.makedirs(base_dir, exist_ok=True)
+        self.set_fast_dir(fast_dir, fast_max_bytes)
+        self._load_index()
     
-    def create_temp_file(self, extension: str = "", prefix: str = "bot_") -> str:
+    def set_fast_dir(self, fast_dir: Optional[str], max_bytes: int, budget_bytes: Optional[int] = None):
+        """Use a RAM-backed root (e.g. /dev/shm) for jobs whose input is at most max_bytes.
+        
+        Jobs there reserve twice their input from budget_bytes (default: room
+        for four such jobs); when it is used up they go to base_dir instead.
+        """
+        if fast_dir and not os.path.isdir(fast_dir):
+            logger.warning(f"Fast temp dir {fast_dir} not available, using {self.base_dir}")
+            fast_dir = None
+        self.fast_dir = fast_dir
+        self.fast_max_bytes = max_bytes if fast_dir else 0
+        self.fast_budget = (8 * max_bytes if budget_bytes is None else budget_bytes) if fast_dir else 0
+    
+    def set_budget(self, max_bytes: int, wait_seconds: Optional[float] = None):
+        """Cap the bytes held in base_dir; 0 disables the cap"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            if wait_seconds is not None:
+                self.wait_seconds = wait_seconds
+            self._evict(0)
+            self._space_free.notify_all()
+    
+    def _load_index(self):
+        """Adopt files and job dirs left by a previous run, oldest first (the only directory scan)"""
+        found = []
+        for filename in os.listdir(self.base_dir):
+            path = os.path.join(self.base_dir, filename)
+            if os.path.isfile(path):
+                found.append((os.path.getmtime(path), path, os.path.getsize(path)))
+            elif filename.startswith("job_") and os.path.isdir(path):
+                # Left behind only if the process died mid-job
+                found.append((os.path.getmtime(path), path, _tree_size(path)))
+        
+        for last_access, path, size in sorted(found):
+            self._entries[path] = [size, last_access]
+            self.total_bytes += size
+    
+    def create_temp_file(self, extension: str = "", prefix: str = "bot_", size_hint: int = 0) -> str:
         """Create a temporary file and return its path"""
-        timestamp = str(int(time.time()))
-        filename = f"{prefix}{timestamp}{extension}"
-        return os.path.join(self.base_dir, filename)
+        filename = f"{prefix}{uuid.uuid4().hex}{extension}"
+        path = os.path.join(self.base_dir, filename)
+        with self._lock:
+            self._evict(size_hint)
+            self._entries[path] = [size_hint, time.time()]
+            self.total_bytes += size_hint
+        return path
+    
+    def touch(self, path: str):
+        """Record the current size of a managed file or job directory and mark it recently used"""
+        try:
+            size = _tree_size(path) if os.path.isdir(path) else os.path.getsize(path)
+        except OSError:
+            return
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return
+            self.total_bytes += size - entry[0]
+            entry[0] = size
+            entry[1] = time.time()
+            self._entries.move_to_end(path)
+            # A job that outgrew its reservation pushes idle entries out
+            if not self._evict(0):
+                logger.warning(f"Temp usage {self.total_bytes} bytes exceeds budget {self.max_bytes} "
+                               f"with only active jobs left")
+            self._space_free.notify_all()
+    
+    def release(self, path: str):
+        """Delete a managed file and drop it from the index"""
+        with self._lock:
+            self._drop(path)
+            self._space_free.notify_all()
+    
+    @contextmanager
+    def job_dir(self, size_hint: Optional[int] = None):
+        """Private scratch directory for one job, removed with its contents on exit.
+        
+        Jobs with a known size_hint up to fast_max_bytes are placed on the fast
+        root, while its budget lasts, so small conversions never touch the disk.
+        Others reserve room for an input and an output of size_hint bytes,
+        evicting idle files if needed and waiting up to wait_seconds for running
+        jobs to free space; TempSpaceError is raised if there is still no room.
+        touch(path) replaces the reservation with what the job actually wrote.
+        """
+        reserved = 2 * (size_hint or 0)
+        if self.fast_dir and size_hint is not None and size_hint <= self.fast_max_bytes:
+            with self._lock:
+                fits = self.fast_bytes + reserved <= self.fast_budget
+                if fits:
+                    self.fast_bytes += reserved
+            if fits:
+                path = tempfile.mkdtemp(prefix="job_", dir=self.fast_dir)
+                try:
+                    yield path
+                finally:
+                    with span('cleanup', tier='fast'):
+                        shutil.rmtree(path, ignore_errors=True)
+                    with self._lock:
+                        self.fast_bytes -= reserved
+                return
+        
+        with self._lock:
+            self._reserve(reserved)
+            path = tempfile.mkdtemp(prefix="job_", dir=self.base_dir)
+            self._entries[path] = [reserved, time.time()]
+            self._active.add(path)
+            self.total_bytes += reserved
+        try:
+            yield path
+        finally:
+            used = _tree_size(path)
+            with span('cleanup', tier='disk', bytes=used):
+                shutil.rmtree(path, ignore_errors=True)
+            # Anything rmtree could not remove still takes space; keep it indexed at its real size
+            remaining = _tree_size(path) if os.path.exists(path) else None
+            with self._lock:
+                self._active.discard(path)
+                entry = self._entries.pop(path, None)
+                if entry is not None:
+                    self.total_bytes -= entry[0]
+                if remaining is not None:
+                    self._entries[path] = [remaining, time.time()]
+                    self.total_bytes += remaining
+                self._space_free.notify_all()
+    
+    def _reserve(self, incoming_bytes: int):
+        # Caller holds the lock; waits for running jobs to finish while only they are left
+        if self.max_bytes and incoming_bytes > self.max_bytes:
+            self.refused += 1
+            raise TempSpaceError(f"Job needs {incoming_bytes} bytes of a {self.max_bytes} byte temp budget")
+        
+        deadline = time.monotonic() + self.wait_seconds
+        while not self._evict(incoming_bytes):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.refused += 1
+                raise TempSpaceError(f"No room for {incoming_bytes} bytes in the temp budget after "
+                                     f"{self.wait_seconds:.0f}s")
+            self._space_free.wait(remaining)
+    
+    def _evict(self, incoming_bytes: int) -> bool:
+        """Drop idle entries until incoming_bytes fit; False if only active jobs are left and it still does not"""
+        # Caller holds the lock (or is __init__); directories of running jobs are skipped
+        if not self.max_bytes:
+            return True
+        
+        idle = [path for path in self._entries if path not in self._active]
+        for path in idle:
+            if self.total_bytes + incoming_bytes <= self.max_bytes:
+                break
+            self._drop(path)
+            self.evictions += 1
+            logger.info(f"Evicted temp entry {os.path.basename(path)} to stay within budget")
+        
+        return self.total_bytes + incoming_bytes <= self.max_bytes
+    
+    def _drop(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.total_bytes -= entry[0]
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Error cleaning up {path}: {e}")
     
     def cleanup_old_files(self, max_age_hours: int = 24):
-        """Remove temporary files older than max_age_hours"""
-        current_time = time.time()
-        max_age_seconds = max_age_hours * 3600
+        """Remove idle temporary files not used for max_age_hours"""
+        cutoff = time.time() - max_age_hours * 3600
         
-        for filename in os.listdir(self.base_dir):
-            file_path = os.path.join(self.base_dir, filename)
-            if os.path.isfile(file_path):
-                file_age = current_time - os.path.getctime(file_path)
-                if file_age > max_age_seconds:
-                    try:
-                        os.remove(file_path)
-                        print(f"Cleaned up old temp file: {filename}")
-                    except Exception as e:
-                        print(f"Error cleaning up {filename}: {e}")
+        with self._lock:
+            stale = [
+                path for path, (_, last_access) in self._entries.items()
+                if last_access < cutoff and path not in self._active
+            ]
+            for path in stale:
+                self._drop(path)
+                logger.info(f"Cleaned up old temp file: {os.path.basename(path)}")
+            if stale:
+                self._space_free.notify_all()
+    
+    def stats(self) -> dict:
+        """Snapshot of temp directory usage"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "active_jobs": len(self._active),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "fast_bytes": self.fast_bytes,
+                "fast_budget": self.fast_budget,
+                "evictions": self.evictions,
+                "refused": self.refused
+            }
     
     def get_output_filename(self, original_filename: str, operation: str) -> str:
         """Generate output filename based on operation"""
         name, ext = os.path.splitext(original_filename)
         timestamp = str(int(time.time()))
         
-        # Define output extensions based on operation
-        operation_extensions = {
-            'convert_jpg_to_png': '.png',
-            'convert_png_to_jpg': '.jpg',
-            'convert_jpg_to_webp': '.webp',
-            'convert_webp_to_jpg': '.jpg',
-            'convert_svg_to_png': '.png',
-            'compress_image': ext,
-            'convert_mp4_to_mov': '.mov',
-            'convert_mov_to_mp4': '.mp4',
-            'convert_ts_to_mp4': '.mp4',
-            'compress_video': ext,
-            'compress_pdf': '.pdf',
-            'merge_pdfs': '.pdf',
-            'convert_pdf_to_images': '.zip',  # Will contain multiple images
-            'convert_image_to_pdf': '.pdf',
-        }
-        
-        output_ext = operation_extensions.get(operation, ext)
+        # The registry declares each operation's output type; unknown ones keep the input's
+        spec = find_operation(operation)
+        output_ext = spec.output_extension(original_filename) if spec else ext
         return f"{name}_{operation}_{timestamp}{output_ext}"
 
 # Global temp file manager instance
@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional
+
+from .sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_DOWNLOADING = 'downloading'
+JOB_CONVERTING = 'converting'
+JOB_UPLOADING = 'uploading'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+UNFINISHED_STATES = (JOB_QUEUED, JOB_DOWNLOADING, JOB_CONVERTING, JOB_UPLOADING)
+
+def _owner_is_alive(owner: str, current_owner: str) -> bool:
+    """True when owner is another process on this host that is still running"""
+    try:
+        host, pid, _ = owner.rsplit(':', 2)
+    except ValueError:
+        return False
+    my_host, my_pid, _ = current_owner.rsplit(':', 2)
+    if host != my_host or pid == my_pid:
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except PermissionError:
+        return True
+    except (ProcessLookupError, ValueError):
+        return False
+    return True
+
+def _owner_is_dead(owner: str, current_owner: str) -> bool:
+    """True when owner was a process on this host that is no longer running"""
+    try:
+        host, pid, token = owner.rsplit(':', 2)
+    except ValueError:
+        return False
+    my_host, my_pid, _ = current_owner.rsplit(':', 2)
+    if host != my_host:
+        return False
+    if pid == my_pid:
+        # Same pid with another token: the pid was reused after a restart
+        return owner != current_owner
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (PermissionError, ValueError):
+        return False
+    return False
+
+class JobJournal:
+    """Write-ahead record of accepted conversion jobs, kept in SQLite.
+    
+    A job is written before it is queued and updated as it moves through
+    download, conversion and upload, together with its scratch paths. After a
+    restart, claim_unfinished() hands back the jobs whose process died, so the
+    caller can resume them or tell the user they failed. Jobs of live processes
+    on this host (other gunicorn workers) are never claimed; those of other
+    hosts only once they have not been updated for lease_seconds, which
+    keep_alive() renews while a job runs.
+    """
+    
+    def __init__(self, path: str, lease_seconds: float = 900, retention_seconds: float = 86400):
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.db = SQLiteDatabase(path)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'job_id TEXT PRIMARY KEY, user_id TEXT, chat_id TEXT, operation TEXT NOT NULL, '
+            'callback TEXT, session TEXT, state TEXT NOT NULL, job_dir TEXT, input_path TEXT, '
+            'output_path TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 1, owner TEXT, '
+            'created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self.db.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, updated_at)')
+    
+    def _refresh_owner(self):
+        # The journal may be created before gunicorn forks; each worker owns its own jobs
+        if self.owner.split(':')[1] != str(os.getpid()):
+            self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    
+    def record(self, user_id, chat_id, operation: str, callback: Optional[dict] = None,
+               session: Optional[dict] = None, job_id: Optional[str] = None) -> str:
+        """Journal a newly accepted job and return its id (a new one unless given)"""
+        self._refresh_owner()
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        self.db.execute(
+            'INSERT INTO jobs (job_id, user_id, chat_id, operation, callback, session, state, owner, '
+            'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (job_id, str(user_id), str(chat_id), operation,
+             json.dumps(callback) if callback is not None else None,
+             json.dumps(session) if session is not None else None,
+             JOB_QUEUED, self.owner, now, now)
+        )
+        return job_id
+    
+    def update(self, job_id: Optional[str], state: str, **paths):
+        """Move a job to state, recording any of job_dir, input_path and output_path"""
+        if not job_id:
+            return
+        self._refresh_owner()
+        columns = {name: value for name, value in paths.items()
+                   if name in ('job_dir', 'input_path', 'output_path')}
+        assignments = ''.join(f", {name} = ?" for name in columns)
+        self.db.execute(
+            f'UPDATE jobs SET state = ?, owner = ?, updated_at = ?{assignments} WHERE job_id = ?',
+            (state, self.owner, time.time(), *columns.values(), job_id)
+        )
+    
+    def heartbeat(self, job_id: Optional[str]):
+        """Renew a long-running job's lease"""
+        if job_id:
+            self.db.execute('UPDATE jobs SET updated_at = ? WHERE job_id = ?', (time.time(), job_id))
+    
+    @contextmanager
+    def keep_alive(self, job_id: Optional[str]):
+        """Heartbeat job_id every third of the lease while the block runs"""
+        if not job_id:
+            yield
+            return
+        stopped = threading.Event()
+        
+        def beat():
+            while not stopped.wait(self.lease_seconds / 3):
+                self.heartbeat(job_id)
+        
+        threading.Thread(target=beat, name=f"job-heartbeat-{job_id[:8]}", daemon=True).start()
+        try:
+            yield
+        finally:
+            stopped.set()
+    
+    def finish(self, job_id: Optional[str]):
+        """Mark a job done, unless it was already marked failed"""
+        if job_id:
+            self.db.execute(
+                'UPDATE jobs SET state = ?, updated_at = ? WHERE job_id = ? AND state != ?',
+                (JOB_DONE, time.time(), job_id, JOB_FAILED)
+            )
+    
+    def fail(self, job_id: Optional[str], error: str):
+        """Mark a job failed with a short reason"""
+        if job_id:
+            self.db.execute(
+                'UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE job_id = ?',
+                (JOB_FAILED, str(error)[:500], time.time(), job_id)
+            )
+    
+    def claim_unfinished(self) -> List[dict]:
+        """Take over unfinished jobs of dead processes; their attempts count is incremented"""
+        self._refresh_owner()
+        now = time.time()
+        placeholders = ', '.join('?' for _ in UNFINISHED_STATES)
+        claimed = []
+        
+        with self.db.transaction() as conn:
+            conn.execute(
+                f'DELETE FROM jobs WHERE state NOT IN ({placeholders}) AND updated_at < ?',
+                (*UNFINISHED_STATES, now - self.retention_seconds)
+            )
+            rows = conn.execute(
+                'SELECT job_id, user_id, chat_id, operation, callback, session, state, job_dir, '
+                f'attempts, owner, updated_at FROM jobs WHERE state IN ({placeholders}) AND owner != ?',
+                (*UNFINISHED_STATES, self.owner)
+            ).fetchall()
+            
+            for (job_id, user_id, chat_id, operation, callback, session, state, job_dir,
+                 attempts, owner, updated_at) in rows:
+                if _owner_is_alive(owner or '', self.owner):
+                    continue
+                if updated_at > now - self.lease_seconds and not _owner_is_dead(owner or '', self.owner):
+                    continue
+                conn.execute(
+                    'UPDATE jobs SET owner = ?, attempts = attempts + 1, updated_at = ? WHERE job_id = ?',
+                    (self.owner, now, job_id)
+                )
+                claimed.append({
+                    'job_id': job_id,
+                    'user_id': user_id,
+                    'chat_id': chat_id,
+                    'operation': operation,
+                    'callback': json.loads(callback) if callback else None,
+                    'session': json.loads(session) if session else None,
+                    'state': state,
+                    'job_dir': job_dir,
+                    'attempts': attempts + 1
+                })
+        
+        if claimed:
+            logger.info(f"Claimed {len(claimed)} unfinished job(s) from the journal")
+        return claimed
+    
+    def stats(self) -> dict:
+        """Number of journaled jobs per state"""
+        rows = self.db.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall()
+        return {state: count for state, count in rows}
@@ -0,0 +1,137 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class JobQueue:
+    """Bounded in-process job queue served by a fixed pool of worker threads"""
+    
+    def __init__(self, workers: int = 4, max_pending: int = 100, name: str = "jobs"):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+    
+    def start(self):
+        """Start the worker threads if they are not running yet.
+        
+        Workers are started lazily on the first submit so that gunicorn's
+        --preload fork happens before any thread exists.
+        """
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"{self.name}-worker-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+    
+    def submit(self, func: Callable, *args, **kwargs) -> bool:
+        """Enqueue func(*args, **kwargs); returns False if the queue is full"""
+        if len(self._threads) < self.workers:
+            self.start()
+        
+        try:
+            self._queue.put_nowait((func, args, kwargs, time.time()))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            logger.warning(f"Job queue '{self.name}' is full ({self.max_pending} pending), rejecting job")
+            return False
+    
+    def _worker(self):
+        while True:
+            func, args, kwargs, enqueued_at = self._queue.get()
+            with self._lock:
+                self._active += 1
+            try:
+                wait_time = time.time() - enqueued_at
+                if wait_time > 5:
+                    logger.info(f"Job {getattr(func, '__name__', func)} waited {wait_time:.1f}s in queue")
+                func(*args, **kwargs)
+                with self._lock:
+                    self._completed += 1
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                logger.error(f"Job {getattr(func, '__name__', func)} failed: {e}")
+            finally:
+                with self._lock:
+                    self._active -= 1
+                self._queue.task_done()
+    
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize()
+    
+    def active(self) -> int:
+        """Number of jobs currently running"""
+        return self._active
+    
+    def stats(self) -> dict:
+        """Snapshot of queue counters for health/stats endpoints"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._queue.qsize(),
+                "active": self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "max_pending": self.max_pending
+            }
+
+class LaneScheduler:
+    """Separate JobQueue per lane, each with its own worker cap.
+    
+    Long jobs in one lane can only occupy that lane's workers, so a burst of
+    video transcodes never delays a quick image conversion waiting in another
+    lane. Within a lane jobs start in order of arrival.
+    """
+    
+    def __init__(self, lanes: dict, default_lane: Optional[str] = None, name: str = "jobs"):
+        # lanes maps a lane name to (workers, max_pending)
+        self.name = name
+        self.lanes = {
+            lane: JobQueue(workers=workers, max_pending=max_pending, name=f"{name}-{lane}")
+            for lane, (workers, max_pending) in lanes.items()
+        }
+        self.default_lane = default_lane or next(iter(self.lanes))
+    
+    def submit(self, lane: Optional[str], func: Callable, *args, **kwargs) -> bool:
+        """Enqueue func(*args, **kwargs) on a lane; unknown lanes use the default lane"""
+        return self.lanes.get(lane, self.lanes[self.default_lane]).submit(func, *args, **kwargs)
+    
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker, across all lanes"""
+        return sum(jobs.pending() for jobs in self.lanes.values())
+    
+    def active(self) -> int:
+        """Number of jobs currently running, across all lanes"""
+        return sum(jobs.active() for jobs in self.lanes.values())
+    
+    def lane_pending(self) -> dict:
+        """Waiting jobs per lane, keyed for a labelled gauge"""
+        return {(lane,): jobs.pending() for lane, jobs in self.lanes.items()}
+    
+    def stats(self) -> dict:
+        """Per-lane queue counters plus totals for health/stats endpoints"""
+        lanes = {lane: jobs.stats() for lane, jobs in self.lanes.items()}
+        totals = {
+            key: sum(stats[key] for stats in lanes.values())
+            for key in ("workers", "pending", "active", "completed", "failed", "rejected")
+        }
+        return {**totals, "lanes": lanes}
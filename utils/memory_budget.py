@@ -0,0 +1,98 @@
+import logging
+import os
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def memory_limit() -> int:
+    """Bytes this container may use: the cgroup limit (Cloud Run, Docker), else physical memory"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path, encoding='ascii') as f:
+                value = f.read().strip()
+            # cgroup v1 reports "no limit" as a huge page-aligned number
+            if value != 'max' and int(value) < 1 << 60:
+                return int(value)
+        except (OSError, ValueError):
+            continue
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return 2 * 1024 * 1024 * 1024
+
+class MemoryBudget:
+    """Bytes reserved by running conversions against a fixed total.
+    
+    reserve() blocks until the requested bytes fit, so large jobs queue
+    instead of running side by side into the OOM killer. Waiters are served
+    in arrival order unless they may jump the queue (small, quick jobs that
+    should not wait behind a large one); requests above the total are clamped
+    to it and run alone.
+    """
+    
+    def __init__(self, total_bytes: int):
+        self.total = max(1, int(total_bytes))
+        self._used = 0
+        self._waiting = []
+        self._cond = threading.Condition()
+        self._admitted = 0
+        self._queued = 0
+        self._timeouts = 0
+        self._peak = 0
+    
+    def fits(self, nbytes: int) -> bool:
+        """Whether nbytes could ever be reserved"""
+        return nbytes <= self.total
+    
+    def available(self) -> int:
+        with self._cond:
+            return self.total - self._used
+    
+    def reserve(self, nbytes: int, timeout: Optional[float] = None, jump_queue: bool = False) -> bool:
+        """Reserve nbytes, waiting up to timeout seconds; False if they never fit in time"""
+        nbytes = min(int(nbytes), self.total)
+        ticket = object()
+        with self._cond:
+            if (jump_queue or not self._waiting) and self._used + nbytes <= self.total:
+                self._grant(nbytes)
+                return True
+            
+            self._queued += 1
+            self._waiting.append(ticket)
+            try:
+                admitted = self._cond.wait_for(
+                    lambda: (jump_queue or self._waiting[0] is ticket) and self._used + nbytes <= self.total,
+                    timeout
+                )
+                if admitted:
+                    self._grant(nbytes)
+                else:
+                    self._timeouts += 1
+                return admitted
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+    
+    def _grant(self, nbytes: int):
+        self._used += nbytes
+        self._admitted += 1
+        self._peak = max(self._peak, self._used)
+    
+    def release(self, nbytes: int):
+        with self._cond:
+            self._used = max(0, self._used - min(int(nbytes), self.total))
+            self._cond.notify_all()
+    
+    def stats(self) -> dict:
+        """Snapshot of budget counters for health/stats endpoints"""
+        with self._cond:
+            return {
+                "total_mb": round(self.total / (1024 * 1024), 1),
+                "used_mb": round(self._used / (1024 * 1024), 1),
+                "peak_mb": round(self._peak / (1024 * 1024), 1),
+                "waiting": len(self._waiting),
+                "admitted": self._admitted,
+                "queued": self._queued,
+                "timeouts": self._timeouts
+            }
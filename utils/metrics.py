@@ -0,0 +1,210 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Conversions range from sub-second image work to multi-minute video encodes
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = 'untyped'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+    
+    def _samples(self):
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonic count, optionally split by labels"""
+    
+    kind = 'counter'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def _samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(_Metric):
+    """Current value, either set directly or read from a callback at scrape time.
+    
+    A callback returns a number, or for labelled gauges a dict mapping label
+    value tuples to numbers.
+    """
+    
+    kind = 'gauge'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self._values = {}
+    
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+    
+    def _samples(self):
+        if self.callback is not None:
+            result = self.callback()
+            values = result.items() if isinstance(result, dict) else [((), result)]
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram(_Metric):
+    """Cumulative-bucket distribution of observed values, e.g. stage durations"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, whether or not it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def _samples(self):
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+    
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered as {existing.kind}")
+                # Re-registering a callback gauge (e.g. on module reload) rebinds its callback
+                if isinstance(metric, Gauge) and metric.callback is not None:
+                    existing.callback = metric.callback
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, callback))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+# Process-wide registry and the job metrics shared by every entry point
+REGISTRY = MetricsRegistry()
+
+JOB_STAGE_SECONDS = REGISTRY.histogram(
+    'bot_job_stage_seconds', 'Time spent in each job stage (download, convert, upload)',
+    ['operation', 'stage']
+)
+JOB_BYTES_IN = REGISTRY.counter('bot_job_bytes_in_total', 'Input bytes accepted for conversion', ['operation'])
+JOB_BYTES_OUT = REGISTRY.counter('bot_job_bytes_out_total', 'Output bytes delivered', ['operation'])
+JOB_ERRORS = REGISTRY.counter('bot_job_errors_total', 'Failed jobs by operation and stage', ['operation', 'stage'])
+JOBS_COMPLETED = REGISTRY.counter(
+    'bot_jobs_completed_total', 'Delivered results by operation and source (converted, result_cache, file_id)',
+    ['operation', 'source']
+)
+JOBS_ACTIVE = REGISTRY.gauge('bot_jobs_active', 'Conversion jobs currently running')
+
+def register_cache_metrics(caches: dict):
+    """Expose hit ratio and size of named caches (anything with a stats() method)"""
+    REGISTRY.gauge(
+        'bot_cache_hit_ratio', 'Hit ratio since start per cache', ['cache'],
+        callback=lambda: {(name,): cache.stats()['hit_ratio'] for name, cache in caches.items()}
+    )
+    REGISTRY.gauge(
+        'bot_cache_entries', 'Entries held per cache', ['cache'],
+        callback=lambda: {(name,): cache.stats()['entries'] for name, cache in caches.items()}
+    )
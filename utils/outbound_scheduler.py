@@ -0,0 +1,294 @@
+import bisect
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from .telegram_api import TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+# Lower value is sent first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Methods that post into a chat and therefore count against Telegram's flood limits
+RATE_LIMITED_METHODS = {
+    'sendMessage', 'sendDocument', 'sendPhoto', 'sendVideo', 'sendAnimation',
+    'sendMediaGroup', 'editMessageText', 'editMessageReplyMarkup', 'editMessageCaption'
+}
+
+DEFAULT_PRIORITIES = {
+    'editMessageText': PRIORITY_LOW,
+    'editMessageReplyMarkup': PRIORITY_LOW,
+}
+
+class TokenBucket:
+    """Classic token bucket; tokens refill continuously at rate per second"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if available now)"""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+    
+    def block(self, seconds: float):
+        """Stop handing out tokens for a while, e.g. after a 429"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+class _OutboundRequest:
+    __slots__ = ('func', 'chat_id', 'priority', 'seq', 'coalesce_key', 'limited', 'futures', 'attempts')
+    
+    def __init__(self, func, chat_id, priority, seq, coalesce_key, limited):
+        self.func = func
+        self.chat_id = chat_id
+        self.priority = priority
+        self.seq = seq
+        self.coalesce_key = coalesce_key
+        self.limited = limited
+        self.futures = []
+        self.attempts = 0
+
+class OutboundScheduler:
+    """Priority queue for outgoing Bot API calls, paced by global and per-chat token buckets.
+    
+    Pending editMessageText calls for the same message are coalesced: a newer
+    edit replaces the queued payload and every waiting caller receives the
+    result of the edit that was actually sent. Calls sharing a coalesce key are
+    never in flight at the same time, so edits cannot land out of order.
+    
+    A 429 comes straight back from the API client; the scheduler blocks the
+    chat's (or the global) bucket for retry_after and requeues the call, up to
+    rate_limit_retries times, so no sender thread sleeps through flood control.
+    """
+    
+    def __init__(self, api, global_rate: float = 30, chat_rate: float = 1, chat_burst: float = 3,
+                 group_rate_per_minute: float = 20, senders: int = 4, max_chat_buckets: int = 10000,
+                 rate_limit_retries: int = 3):
+        self.api = api
+        self.rate_limit_retries = rate_limit_retries
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate_per_minute / 60.0
+        self.max_chat_buckets = max_chat_buckets
+        self.senders = senders
+        
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets = OrderedDict()
+        self._pending = []
+        self._coalesced = {}
+        self._inflight = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._dispatcher = None
+        self._executor = None
+        self.coalesced_count = 0
+    
+    def _ensure_started(self):
+        # Started lazily so gunicorn --preload forks before any thread exists
+        if self._dispatcher and self._dispatcher.is_alive():
+            return
+        with self._cond:
+            if self._dispatcher and self._dispatcher.is_alive():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.senders, thread_name_prefix="outbound-sender")
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="outbound-dispatcher", daemon=True)
+            self._dispatcher.start()
+    
+    def submit(self, func: Callable, chat_id=None, priority: int = PRIORITY_NORMAL,
+               coalesce_key=None, limited: bool = True) -> Future:
+        """Queue func() for sending and return a Future with its result"""
+        self._ensure_started()
+        future = Future()
+        
+        with self._cond:
+            if coalesce_key is not None and coalesce_key in self._coalesced:
+                item = self._coalesced[coalesce_key]
+                item.func = func
+                item.futures.append(future)
+                self.coalesced_count += 1
+                return future
+            
+            item = _OutboundRequest(func, chat_id, priority, next(self._seq), coalesce_key, limited)
+            item.futures.append(future)
+            bisect.insort(self._pending, (priority, item.seq, item))
+            if coalesce_key is not None:
+                self._coalesced[coalesce_key] = item
+            self._cond.notify()
+        
+        return future
+    
+    def send(self, method: str, data: Optional[dict] = None, files: Optional[dict] = None,
+             chat_id=None, priority: Optional[int] = None, coalesce_key=None) -> Future:
+        """Queue a Bot API method call"""
+        if priority is None:
+            priority = DEFAULT_PRIORITIES.get(method, PRIORITY_NORMAL)
+        # Paced methods leave 429s to the buckets; others let the client retry them
+        limited = method in RATE_LIMITED_METHODS
+        return self.submit(
+            lambda: self.api.call(method, data=data, files=files, retry_rate_limit=not limited),
+            chat_id=chat_id,
+            priority=priority,
+            coalesce_key=coalesce_key,
+            limited=limited
+        )
+    
+    def edit_message_text(self, chat_id, message_id, text: str, **fields) -> Future:
+        """Queue a coalescing, low-priority editMessageText"""
+        data = {'chat_id': chat_id, 'message_id': message_id, 'text': text}
+        data.update(fields)
+        return self.send('editMessageText', data=data, chat_id=chat_id,
+                         coalesce_key=('edit', chat_id, message_id))
+    
+    def request_sender(self, method: str, url: str, **kwargs):
+        """Drop-in for telebot's apihelper.CUSTOM_REQUEST_SENDER that paces chat-bound calls"""
+        api_method = url.rstrip('/').rsplit('/', 1)[-1]
+        if api_method not in RATE_LIMITED_METHODS:
+            return self.api.request(method, url, **kwargs)
+        
+        params = kwargs.get('params') or {}
+        chat_id = params.get('chat_id')
+        coalesce_key = None
+        if api_method == 'editMessageText' and params.get('message_id'):
+            coalesce_key = ('edit', chat_id, params.get('message_id'))
+        
+        future = self.submit(
+            lambda: self.api.request(method, url, retry_rate_limit=False, **kwargs),
+            chat_id=chat_id,
+            priority=DEFAULT_PRIORITIES.get(api_method, PRIORITY_NORMAL),
+            coalesce_key=coalesce_key
+        )
+        return future.result()
+    
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative chat ids are groups and channels, which have a per-minute limit
+            is_group = str(chat_id).startswith('-')
+            rate = self.group_rate if is_group else self.chat_rate
+            bucket = TokenBucket(rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > self.max_chat_buckets:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+    
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                
+                now = time.monotonic()
+                chosen_index = None
+                next_wait = None
+                for index, (_, _, item) in enumerate(self._pending):
+                    if item.coalesce_key is not None and item.coalesce_key in self._inflight:
+                        continue
+                    wait = 0.0
+                    if item.limited:
+                        wait = self._global_bucket.wait_time(now)
+                        if item.chat_id is not None:
+                            wait = max(wait, self._chat_bucket(item.chat_id).wait_time(now))
+                    if wait <= 0:
+                        chosen_index = index
+                        break
+                    next_wait = wait if next_wait is None else min(next_wait, wait)
+                
+                if chosen_index is None:
+                    self._cond.wait(next_wait)
+                    continue
+                
+                _, _, item = self._pending.pop(chosen_index)
+                if item.coalesce_key is not None:
+                    self._coalesced.pop(item.coalesce_key, None)
+                    self._inflight.add(item.coalesce_key)
+                if item.limited:
+                    self._global_bucket.consume(now)
+                    if item.chat_id is not None:
+                        self._chat_bucket(item.chat_id).consume(now)
+            
+            self._executor.submit(self._run, item)
+    
+    def _run(self, item: _OutboundRequest):
+        try:
+            result = item.func()
+        except Exception as e:
+            if self._rate_limited(item, getattr(e, 'retry_after', None) if isinstance(e, TelegramAPIError) else None):
+                return
+            with self._cond:
+                self._release(item)
+            for future in item.futures:
+                future.set_exception(e)
+            return
+        
+        # Raw responses from request_sender carry the 429 themselves
+        if getattr(result, 'status_code', None) == 429 and self._rate_limited(item, self.api.retry_after(result)):
+            return
+        with self._cond:
+            self._release(item)
+        for future in item.futures:
+            future.set_result(result)
+    
+    def _rate_limited(self, item: _OutboundRequest, retry_after) -> bool:
+        """Block the bucket for retry_after and requeue item; False once its retries are used up"""
+        if not retry_after or not item.limited:
+            return False
+        with self._cond:
+            bucket = self._chat_bucket(item.chat_id) if item.chat_id is not None else self._global_bucket
+            bucket.block(retry_after)
+            if item.attempts >= self.rate_limit_retries:
+                return False
+            item.attempts += 1
+            logger.warning(f"Telegram rate limit hit for chat {item.chat_id}, requeued for {retry_after}s")
+            
+            self._release(item)
+            newer = self._coalesced.get(item.coalesce_key) if item.coalesce_key is not None else None
+            if newer is not None:
+                # A newer edit is already queued; its result answers these callers too
+                newer.futures.extend(item.futures)
+                self.coalesced_count += 1
+            else:
+                bisect.insort(self._pending, (item.priority, item.seq, item))
+                if item.coalesce_key is not None:
+                    self._coalesced[item.coalesce_key] = item
+            self._cond.notify()
+        return True
+    
+    def _release(self, item: _OutboundRequest):
+        if item.coalesce_key is not None:
+            self._inflight.discard(item.coalesce_key)
+            self._cond.notify()
+    
+    def stats(self) -> dict:
+        """Snapshot of scheduler state"""
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "coalesced": self.coalesced_count,
+                "chat_buckets": len(self._chat_buckets)
+            }
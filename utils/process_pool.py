@@ -0,0 +1,285 @@
+import json
+import logging
+import math
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from typing import Optional
+
+from operations.memory import downgrades, estimate_from_facts, probe
+from operations.registry import COST_LIGHT, Operation, find_operation
+from operations.worker import execute
+from .memory_budget import MemoryBudget, memory_limit
+from .tracing import current_trace_id
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a conversion reports back; message is the operation's own text and
+# degraded marks output produced with lowered settings to fit the memory budget
+ConversionResult = namedtuple('ConversionResult', 'ok message output_bytes wall_s cpu_s pid degraded',
+                              defaults=(False,))
+
+def available_cpus() -> int:
+    """Cores this process may use, honouring CPU affinity and a cgroup v2 quota (Cloud Run, Docker)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max', encoding='ascii') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+class _WorkerProcess:
+    """One long-lived `python -m operations.worker` child, serving one request at a time"""
+    
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'operations.worker'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=REPO_ROOT, text=True, bufsize=1
+        )
+        self.tasks = 0
+    
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+    
+    def call(self, request: dict, timeout: float, progress=None) -> dict:
+        self.process.stdin.write(json.dumps({**request, 'progress': progress is not None}) + '\n')
+        self.process.stdin.flush()
+        self.tasks += 1
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            readable, _, _ = select.select([self.process.stdout], [], [], max(0.0, deadline - time.monotonic()))
+            if not readable:
+                raise TimeoutError(f"no result after {timeout:.0f}s")
+            line = self.process.stdout.readline()
+            if not line:
+                raise EOFError(f"worker exited with code {self.process.wait()}")
+            message = json.loads(line)
+            if 'progress' not in message:
+                return message
+            try:
+                progress(*message['progress'])
+            except Exception as e:
+                logger.debug(f"Progress callback failed: {e}")
+    
+    def stop(self):
+        # Closing stdin ends the worker's read loop; kill covers a hung conversion
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+class ConversionPool:
+    """Runs conversions in worker processes so CPU-bound work does not hold the server's GIL.
+    
+    Workers start on first use and are replaced after max_tasks conversions,
+    after a crash, or when a conversion exceeds timeout. Operations that
+    report progress send it back over the worker's pipe to the reporter passed
+    to run(). processes=0 sizes the pool to the available cores; a negative
+    value runs everything inline.
+    reserved_light slots are kept for light operations: medium and heavy
+    conversions only start while more slots than that are idle.
+    
+    Each conversion first reserves its estimated peak memory from a budget of
+    memory_mb (0 takes 75% of the container limit, negative disables it).
+    Jobs that do not fit wait up to admission_wait seconds, then run with
+    lowered settings when the operation has any. Otherwise they wait one more
+    admission_wait and are refused, so no job thread is parked behind
+    oversized jobs for long.
+    
+    processes and memory_mb describe the whole container. When several server
+    processes each own a pool (gunicorn workers), pass their number as shares
+    and each pool takes that fraction of both.
+    """
+    
+    def __init__(self, processes: int = 0, max_tasks: int = 100, timeout: float = 600,
+                 reserved_light: int = 0, memory_mb: float = 0, admission_wait: float = 30,
+                 shares: int = 1, name: str = "conversions"):
+        shares = max(1, shares)
+        self.inline = processes < 0
+        self.processes = max(1, (available_cpus() if processes == 0 else processes) // shares)
+        self.max_tasks = max_tasks
+        self.timeout = timeout
+        # At least one slot must stay usable by every cost class
+        self.reserved_light = min(max(0, reserved_light), self.processes - 1)
+        if memory_mb < 0:
+            self.memory = None
+        else:
+            total = memory_mb * 1024 * 1024 if memory_mb else memory_limit() * 0.75
+            self.memory = MemoryBudget(total / shares)
+        self.admission_wait = admission_wait
+        self.name = name
+        self._workers = []
+        self._lock = threading.Lock()
+        # Idle slots hold a worker, or None for one not started yet; last in, first out
+        self._slots = [None] * self.processes
+        self._slot_free = threading.Condition(self._lock)
+        self._busy = 0
+        self._completed = 0
+        self._inline_runs = 0
+        self._restarts = 0
+        self._timeouts = 0
+        self._degraded = 0
+        self._refused = 0
+    
+    def run(self, operation: str, input_path, output_path: str, params: Optional[dict] = None,
+            progress=None) -> ConversionResult:
+        spec = find_operation(operation)
+        request = {
+            'operation': spec.name if spec else operation,
+            'input': input_path,
+            'output': output_path,
+            'params': spec.resolve_params(params) if spec else {},
+            'trace_id': current_trace_id()
+        }
+        
+        # Unknown and unavailable operations only produce an error message
+        if spec is None or not spec.available:
+            return ConversionResult(**execute(request))
+        
+        reserved, overrides = self._admit(spec, input_path, request['params'])
+        if reserved is None:
+            with self._lock:
+                self._refused += 1
+            # overrides holds the reason the job was refused
+            return ConversionResult(False, f"Error: {overrides}", 0, 0.0, 0.0, None)
+        request['params'].update(overrides)
+        try:
+            result = self._run(spec, request, progress)
+        finally:
+            if self.memory is not None:
+                self.memory.release(reserved)
+        return result._replace(degraded=True) if overrides else result
+    
+    def _admit(self, spec: Operation, input_path, params: dict):
+        """Reserve the job's estimated memory: (bytes, parameter overrides), or (None, reason) if it cannot run"""
+        if self.memory is None:
+            return 0, {}
+        
+        # Headers are read once; each candidate setting is priced from the same facts
+        paths = input_path if isinstance(input_path, (list, tuple)) else [input_path]
+        facts = [probe(spec, path) for path in paths]
+        estimate = estimate_from_facts(spec, paths, facts, params)
+        
+        # Light jobs may overtake large ones waiting for memory
+        jump_queue = spec.cost == COST_LIGHT
+        if self.memory.fits(estimate) and self.memory.reserve(estimate, self.admission_wait, jump_queue):
+            return estimate, {}
+        
+        # Too large for the budget, or still waiting: try lighter settings that fit,
+        # all within one more admission_wait
+        deadline = time.monotonic() + self.admission_wait
+        limit = self.memory.available() if self.memory.fits(estimate) else self.memory.total
+        for overrides in downgrades(spec):
+            lowered = estimate_from_facts(spec, paths, facts, {**params, **overrides})
+            if lowered <= limit and self.memory.reserve(lowered, max(0.0, deadline - time.monotonic())):
+                logger.info(f"Running {spec.name} with {overrides}: needs ~{estimate // (1024 * 1024)} MB, "
+                            f"{limit // (1024 * 1024)} MB free")
+                with self._lock:
+                    self._degraded += 1
+                return lowered, overrides
+        
+        if not self.memory.fits(estimate):
+            logger.warning(f"Refusing {spec.name}: needs ~{estimate // (1024 * 1024)} MB of a "
+                           f"{self.memory.total // (1024 * 1024)} MB budget")
+            return None, "File is too large to convert within this server's memory limit"
+        if self.memory.reserve(estimate, max(0.0, deadline - time.monotonic()), jump_queue):
+            return estimate, {}
+        logger.warning(f"Refusing {spec.name}: ~{estimate // (1024 * 1024)} MB not free after "
+                       f"{2 * self.admission_wait:.0f}s")
+        return None, "The server is busy with other conversions. Please try again in a few minutes"
+    
+    def _run(self, spec: Operation, request: dict, progress) -> ConversionResult:
+        if self.inline:
+            with self._lock:
+                self._inline_runs += 1
+            return ConversionResult(**execute(request, progress=progress))
+        
+        worker = self._acquire(spec.cost)
+        try:
+            if worker is None or not worker.alive:
+                worker = self._start_worker()
+            return ConversionResult(**worker.call(request, self.timeout,
+                                                  progress if spec.progress else None))
+        except (OSError, EOFError, TimeoutError, ValueError) as e:
+            logger.error(f"Conversion worker failed on {request['operation']}: {e}")
+            with self._lock:
+                self._restarts += 1
+                if isinstance(e, TimeoutError):
+                    self._timeouts += 1
+            # A timed-out or confused worker is not reused
+            if worker is not None:
+                worker.process.kill()
+                worker.process.wait()
+            worker = None
+            return ConversionResult(False, f"Error: conversion worker failed ({e})", 0, 0.0, 0.0, None)
+        finally:
+            if worker is not None and worker.tasks >= self.max_tasks:
+                # Recycling bounds memory held by long-lived backends
+                worker.stop()
+                worker = None
+            with self._lock:
+                self._busy -= 1
+                self._completed += 1
+                if worker is None:
+                    self._workers = [w for w in self._workers if w.alive]
+                self._slots.append(worker)
+                self._slot_free.notify_all()
+    
+    def _acquire(self, cost: str) -> Optional[_WorkerProcess]:
+        # Light conversions may take the last idle slot; others leave the reserve alone
+        reserve = 0 if cost == COST_LIGHT else self.reserved_light
+        with self._slot_free:
+            while len(self._slots) <= reserve:
+                self._slot_free.wait()
+            self._busy += 1
+            return self._slots.pop()
+    
+    def _start_worker(self) -> _WorkerProcess:
+        worker = _WorkerProcess()
+        with self._lock:
+            self._workers = [w for w in self._workers if w.alive] + [worker]
+        logger.info(f"Started conversion worker {worker.process.pid} for pool '{self.name}'")
+        return worker
+    
+    def busy(self) -> int:
+        """Number of workers running a conversion"""
+        return self._busy
+    
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+    
+    def stats(self) -> dict:
+        """Snapshot of pool counters for health/stats endpoints"""
+        with self._lock:
+            return {
+                "processes": 0 if self.inline else self.processes,
+                "running": len([w for w in self._workers if w.alive]),
+                "busy": self._busy,
+                "reserved_light": self.reserved_light,
+                "completed": self._completed,
+                "inline": self._inline_runs,
+                "restarts": self._restarts,
+                "timeouts": self._timeouts,
+                "degraded": self._degraded,
+                "refused": self._refused,
+                "memory": self.memory.stats() if self.memory else None
+            }
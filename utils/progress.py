@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class ProgressReporter:
+    """Turns byte/frame progress from a job into debounced status message edits.
+    
+    publish(text) is called at most once every min_interval seconds and never
+    with the same text twice in a row. Pass reporter.update (or the reporter
+    itself) as a progress callback taking (done, total).
+    """
+    
+    def __init__(self, publish: Callable[[str], None],
+                 render: Callable[[str, Optional[int]], str],
+                 min_interval: float = 3.0):
+        self.publish = publish
+        self.render = render
+        self.min_interval = min_interval
+        self.stage_name = ""
+        self.percent = None
+        self._last_text = None
+        self._last_publish = 0.0
+        self._lock = threading.Lock()
+    
+    def stage(self, name: str):
+        """Switch to a new stage (e.g. downloading, converting) and reset the percentage"""
+        with self._lock:
+            self.stage_name = name
+            self.percent = None
+        self._maybe_publish()
+    
+    def update(self, done: int, total: Optional[int] = None):
+        """Report progress within the current stage"""
+        percent = None
+        if total:
+            percent = max(0, min(100, int(done * 100 / total)))
+        with self._lock:
+            if percent == self.percent:
+                return
+            self.percent = percent
+        self._maybe_publish()
+    
+    __call__ = update
+    
+    def flush(self):
+        """Publish the latest state now, ignoring the debounce interval"""
+        self._maybe_publish(force=True)
+    
+    def _maybe_publish(self, force: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_publish < self.min_interval:
+                return
+            text = self.render(self.stage_name, self.percent)
+            if text == self._last_text:
+                return
+            self._last_text = text
+            self._last_publish = now
+        
+        try:
+            self.publish(text)
+        except Exception as e:
+            logger.warning(f"Progress update failed: {e}")
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Optional
+
+SentFile = namedtuple('SentFile', ['file_id', 'file_name', 'file_size'])
+
+# Telegram may file an uploaded document under a more specific media type
+_MEDIA_FIELDS = ('document', 'animation', 'video', 'audio', 'photo')
+
+def extract_file_id(message) -> Optional[str]:
+    """Return the file_id of the media in a sent message (API dict or telebot Message)"""
+    if not message:
+        return None
+    
+    for field in _MEDIA_FIELDS:
+        if isinstance(message, dict):
+            media = message.get(field)
+        else:
+            media = getattr(message, field, None)
+        if not media:
+            continue
+        if isinstance(media, list):
+            media = media[-1]
+        return media.get('file_id') if isinstance(media, dict) else getattr(media, 'file_id', None)
+    
+    return None
+
+class SentFileIndex:
+    """Remembers Telegram file_ids of delivered outputs so repeats are resent without uploading"""
+    
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Optional[str]) -> Optional[SentFile]:
+        """Return the SentFile previously delivered for key, if any"""
+        if not key:
+            return None
+        with self._lock:
+            sent_file = self._entries.get(key)
+            if sent_file is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return sent_file
+    
+    def remember(self, key: Optional[str], file_id: Optional[str], file_name: str, file_size: int):
+        """Record the file_id Telegram assigned to an uploaded output"""
+        if not key or not file_id:
+            return
+        with self._lock:
+            self._entries[key] = SentFile(file_id, file_name, file_size)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def forget(self, key: Optional[str]):
+        """Drop a file_id that Telegram no longer accepts"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def stats(self) -> dict:
+        """Snapshot of index usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,190 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .sqlite_db import SQLiteDatabase
+
+class SessionRecord:
+    """The upload a user is choosing an operation for"""
+    
+    __slots__ = (
+        'file_id', 'file_unique_id', 'file_name', 'file_type', 'file_size',
+        'chat_id', 'message_id', 'upload_time'
+    )
+    
+    def __init__(self, file_id: str, file_name: str, file_type: str, file_size: int = 0,
+                 file_unique_id: Optional[str] = None, chat_id=None, message_id=None,
+                 upload_time: Optional[float] = None):
+        self.file_id = file_id
+        self.file_unique_id = file_unique_id
+        self.file_name = file_name
+        self.file_type = file_type
+        self.file_size = file_size or 0
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.upload_time = upload_time or time.time()
+    
+    # Mapping-style access, so handlers can keep reading session['file_name']
+    def __getitem__(self, name: str):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+    
+    def get(self, name: str, default=None):
+        return getattr(self, name, default)
+    
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SessionRecord':
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+class SessionStore:
+    """Thread-safe per-user session map with TTL expiry and a size bound.
+    
+    Users are spread over independently locked stripes so concurrent handlers
+    for different users rarely contend. Each stripe is an LRU: reading a
+    session refreshes its TTL, and a full stripe drops its least recent user.
+    """
+    
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 10000, stripes: int = 16):
+        self.ttl_seconds = ttl_seconds
+        self.stripe_capacity = max(1, -(-max_entries // stripes))
+        self._stripes = [(threading.Lock(), OrderedDict()) for _ in range(stripes)]
+    
+    def _stripe(self, user_id):
+        return self._stripes[hash(user_id) % len(self._stripes)]
+    
+    def put(self, user_id, record: SessionRecord):
+        """Store the session for user_id, replacing any previous one"""
+        lock, entries = self._stripe(user_id)
+        with lock:
+            entries[user_id] = (time.monotonic() + self.ttl_seconds, record)
+            entries.move_to_end(user_id)
+            while len(entries) > self.stripe_capacity:
+                entries.popitem(last=False)
+    
+    def get(self, user_id) -> Optional[SessionRecord]:
+        """Return the live session for user_id, or None if missing or expired"""
+        lock, entries = self._stripe(user_id)
+        now = time.monotonic()
+        with lock:
+            entry = entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del entries[user_id]
+                return None
+            entries[user_id] = (now + self.ttl_seconds, entry[1])
+            entries.move_to_end(user_id)
+            return entry[1]
+    
+    def pop(self, user_id) -> Optional[SessionRecord]:
+        """Remove and return the session for user_id"""
+        lock, entries = self._stripe(user_id)
+        with lock:
+            entry = entries.pop(user_id, None)
+        return entry[1] if entry else None
+    
+    def purge_expired(self) -> int:
+        """Drop every expired session and return how many were removed"""
+        now = time.monotonic()
+        removed = 0
+        for lock, entries in self._stripes:
+            with lock:
+                # Stripes are in expiry order, so stop at the first live entry
+                while entries:
+                    user_id, (expires_at, _) = next(iter(entries.items()))
+                    if expires_at > now:
+                        break
+                    del entries[user_id]
+                    removed += 1
+        return removed
+    
+    def __contains__(self, user_id) -> bool:
+        return self.get(user_id) is not None
+    
+    def __len__(self) -> int:
+        return sum(len(entries) for _, entries in self._stripes)
+
+class SQLiteSessionStore:
+    """SessionStore with the same interface, kept in a SQLite (WAL) database.
+    
+    Any process on the same host that opens the same file sees the same
+    sessions, so several gunicorn workers can answer the callback for an
+    upload that a different worker received. Instances on other hosts cannot
+    share it: SQLite locking is unreliable on network filesystems.
+    """
+    
+    # Bound the table every this many writes rather than counting rows on each put
+    PRUNE_EVERY = 100
+    
+    def __init__(self, path: str, ttl_seconds: float = 3600, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.db = SQLiteDatabase(path)
+        self._writes = 0
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'user_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self.db.execute('CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)')
+    
+    def put(self, user_id, record: SessionRecord):
+        """Store the session for user_id, replacing any previous one"""
+        self.db.execute(
+            'INSERT OR REPLACE INTO sessions (user_id, data, expires_at) VALUES (?, ?, ?)',
+            (str(user_id), json.dumps(record.to_dict()), time.time() + self.ttl_seconds)
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.purge_expired()
+            self.db.execute(
+                'DELETE FROM sessions WHERE user_id IN '
+                '(SELECT user_id FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+    
+    def get(self, user_id) -> Optional[SessionRecord]:
+        """Return the live session for user_id, or None if missing or expired"""
+        now = time.time()
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                'SELECT data FROM sessions WHERE user_id = ? AND expires_at > ?', (str(user_id), now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                'UPDATE sessions SET expires_at = ? WHERE user_id = ?', (now + self.ttl_seconds, str(user_id))
+            )
+        return SessionRecord.from_dict(json.loads(row[0]))
+    
+    def pop(self, user_id) -> Optional[SessionRecord]:
+        """Remove and return the session for user_id"""
+        with self.db.transaction() as conn:
+            row = conn.execute('SELECT data FROM sessions WHERE user_id = ?', (str(user_id),)).fetchone()
+            conn.execute('DELETE FROM sessions WHERE user_id = ?', (str(user_id),))
+        return SessionRecord.from_dict(json.loads(row[0])) if row else None
+    
+    def purge_expired(self) -> int:
+        """Drop every expired session and return how many were removed"""
+        return self.db.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+    
+    def __contains__(self, user_id) -> bool:
+        return self.get(user_id) is not None
+    
+    def __len__(self) -> int:
+        return self.db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+def create_session_store(backend: str = 'memory', db_path: Optional[str] = None,
+                         ttl_seconds: float = 3600, max_entries: int = 10000, stripes: int = 16):
+    """Build the session store selected by the STATE_BACKEND setting ('memory' or 'sqlite')"""
+    if backend == 'sqlite':
+        return SQLiteSessionStore(db_path, ttl_seconds=ttl_seconds, max_entries=max_entries)
+    if backend != 'memory':
+        raise ValueError(f"Unknown state backend: {backend}")
+    return SessionStore(ttl_seconds=ttl_seconds, max_entries=max_entries, stripes=stripes)
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# WAL needs shared memory between the processes using the file, which network
+# and FUSE filesystems (NFS, SMB, GCS FUSE, Cloud Run volume mounts) lack
+NETWORK_FILESYSTEMS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'ceph', 'glusterfs', 'gcsfuse')
+
+def filesystem_type(path: str) -> str:
+    """Type of the filesystem holding path, from /proc/mounts ('' if unknown)"""
+    path = os.path.realpath(path)
+    best, fstype = '', ''
+    try:
+        with open('/proc/mounts', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace('\\040', ' ')
+                inside = path == mount_point or path.startswith(mount_point.rstrip('/') + '/')
+                if inside and len(mount_point) > len(best):
+                    best, fstype = mount_point, fields[2]
+    except OSError:
+        pass
+    return fstype
+
+def is_network_filesystem(path: str) -> bool:
+    fstype = filesystem_type(path)
+    return fstype in NETWORK_FILESYSTEMS or fstype.startswith('fuse')
+
+class SQLiteDatabase:
+    """Per-thread SQLite connections, safe to share between processes on one host.
+    
+    Connections are opened lazily in each thread and reopened after a fork, so
+    an instance created before gunicorn forks its workers (--preload) never
+    shares a connection across processes. Local databases use WAL mode; on a
+    network filesystem, where WAL does not work, the rollback journal is used.
+    """
+    
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.journal_mode = 'DELETE' if is_network_filesystem(directory or '.') else 'WAL'
+    
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # isolation_level=None: statements autocommit unless transaction() is used
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute(f'PRAGMA journal_mode={self.journal_mode}')
+            # NORMAL is only durable with WAL
+            conn.execute(f"PRAGMA synchronous={'NORMAL' if self.journal_mode == 'WAL' else 'FULL'}")
+            conn.execute(f'PRAGMA busy_timeout={self.busy_timeout_ms}')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, params)
+    
+    @contextmanager
+    def transaction(self):
+        """Write transaction that takes the lock up front, so read-modify-write cannot interleave"""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
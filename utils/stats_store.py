@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from .sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+class UserStatsStore:
+    """Per-user conversion statistics in SQLite, written in batches.
+    
+    Updates accumulate as small in-memory deltas and are flushed in a single
+    transaction every flush_interval seconds (or once max_pending users are
+    waiting), so memory stays bounded no matter how many users the bot has
+    and a restart loses at most one interval of counts.
+    """
+    
+    def __init__(self, path: str, flush_interval: float = 10, max_pending: int = 1000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.db = SQLiteDatabase(path)
+        self._pending = {}
+        self._pending_ops = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS user_stats ('
+            'user_id INTEGER PRIMARY KEY, files_processed INTEGER NOT NULL DEFAULT 0, '
+            'total_size_saved INTEGER NOT NULL DEFAULT 0, first_use REAL NOT NULL)'
+        )
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS user_operations ('
+            'user_id INTEGER NOT NULL, operation TEXT NOT NULL, count INTEGER NOT NULL, '
+            'PRIMARY KEY (user_id, operation))'
+        )
+    
+    def _ensure_flusher(self):
+        # Started on first use so gunicorn's --preload fork happens before any thread exists
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._flush_loop, name="stats-flusher", daemon=True)
+            self._thread.start()
+    
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Stats flush failed: {e}")
+    
+    def _delta(self, user_id) -> list:
+        # Caller holds the lock; [files_processed, total_size_saved, first_use]
+        delta = self._pending.get(user_id)
+        if delta is None:
+            delta = self._pending[user_id] = [0, 0, time.time()]
+        return delta
+    
+    def touch(self, user_id):
+        """Register a user so their first_use is recorded"""
+        with self._lock:
+            self._delta(user_id)
+            full = len(self._pending) >= self.max_pending
+        self._after_write(full)
+    
+    def record(self, user_id, operation: str, size_saved: int = 0):
+        """Count one processed file for user_id"""
+        with self._lock:
+            delta = self._delta(user_id)
+            delta[0] += 1
+            delta[1] += size_saved
+            self._pending_ops[(user_id, operation)] += 1
+            full = len(self._pending) >= self.max_pending
+        self._after_write(full)
+    
+    def _after_write(self, full: bool):
+        self._ensure_flusher()
+        if full:
+            self.flush()
+    
+    def flush(self):
+        """Write all pending deltas in one transaction"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                pending_ops, self._pending_ops = self._pending_ops, Counter()
+            if not pending:
+                return
+            
+            try:
+                with self.db.transaction() as conn:
+                    conn.executemany(
+                        'INSERT INTO user_stats (user_id, files_processed, total_size_saved, first_use) '
+                        'VALUES (?, ?, ?, ?) ON CONFLICT (user_id) DO UPDATE SET '
+                        'files_processed = files_processed + excluded.files_processed, '
+                        'total_size_saved = total_size_saved + excluded.total_size_saved',
+                        [(user_id, files, saved, first_use)
+                         for user_id, (files, saved, first_use) in pending.items()]
+                    )
+                    conn.executemany(
+                        'INSERT INTO user_operations (user_id, operation, count) VALUES (?, ?, ?) '
+                        'ON CONFLICT (user_id, operation) DO UPDATE SET count = count + excluded.count',
+                        [(user_id, operation, count) for (user_id, operation), count in pending_ops.items()]
+                    )
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                with self._lock:
+                    for user_id, (files, saved, first_use) in pending.items():
+                        delta = self._delta(user_id)
+                        delta[0] += files
+                        delta[1] += saved
+                        delta[2] = min(delta[2], first_use)
+                    self._pending_ops.update(pending_ops)
+                raise
+    
+    def get(self, user_id) -> dict:
+        """Statistics for one user, including writes not flushed yet"""
+        row = self.db.execute(
+            'SELECT files_processed, total_size_saved, first_use FROM user_stats WHERE user_id = ?',
+            (user_id,)
+        ).fetchone()
+        operations = Counter(dict(self.db.execute(
+            'SELECT operation, count FROM user_operations WHERE user_id = ?', (user_id,)
+        ).fetchall()))
+        
+        files_processed, total_size_saved, first_use = row or (0, 0, None)
+        with self._lock:
+            delta = self._pending.get(user_id)
+            if delta:
+                files_processed += delta[0]
+                total_size_saved += delta[1]
+                first_use = min(first_use, delta[2]) if first_use else delta[2]
+            for (pending_user, operation), count in self._pending_ops.items():
+                if pending_user == user_id:
+                    operations[operation] += count
+        
+        favorite = operations.most_common(1)
+        return {
+            'files_processed': files_processed,
+            'total_size_saved': total_size_saved,
+            'first_use': first_use or time.time(),
+            'favorite_operation': favorite[0][0] if favorite else None,
+            'operations': dict(operations)
+        }
+    
+    def totals(self, top: int = 5) -> dict:
+        """Aggregates over all users, computed in SQLite from flushed data"""
+        users, files, saved = self.db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(files_processed), 0), COALESCE(SUM(total_size_saved), 0) '
+            'FROM user_stats'
+        ).fetchone()
+        top_operations = self.db.execute(
+            'SELECT operation, SUM(count) AS total FROM user_operations '
+            'GROUP BY operation ORDER BY total DESC LIMIT ?', (top,)
+        ).fetchall()
+        with self._lock:
+            pending_users = len(self._pending)
+        return {
+            'total_users': users,
+            'files_processed': files,
+            'total_size_saved': saved,
+            'top_operations': dict(top_operations),
+            'pending_users': pending_users
+        }
@@ -0,0 +1,197 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE_URL = "https://api.telegram.org"
+
+# Never sleep longer than this for a single 429, even if Telegram asks to
+MAX_RETRY_AFTER_SECONDS = 60
+
+# getFile links are guaranteed for at least an hour; stay just under that
+DEFAULT_FILE_PATH_TTL = 3500
+
+def configure_telebot(base_url: str = DEFAULT_API_BASE_URL):
+    """Point pyTelegramBotAPI's method and file URLs at base_url"""
+    from telebot import apihelper
+    
+    base_url = base_url.rstrip('/')
+    if base_url == DEFAULT_API_BASE_URL:
+        return
+    apihelper.API_URL = base_url + "/bot{0}/{1}"
+    apihelper.FILE_URL = base_url + "/file/bot{0}/{1}"
+
+def _file_objects(files) -> list:
+    """Seekable streams in a requests files= argument (dict or list of pairs)"""
+    if not files:
+        return []
+    values = files.values() if isinstance(files, dict) else (value for _, value in files)
+    streams = []
+    for value in values:
+        # Values are a file object or a (filename, fileobj[, content_type[, headers]]) tuple
+        if isinstance(value, (tuple, list)):
+            value = value[1] if len(value) > 1 else None
+        if hasattr(value, 'seek') and hasattr(value, 'tell') and getattr(value, 'seekable', lambda: True)():
+            streams.append(value)
+    return streams
+
+class TelegramAPIError(Exception):
+    """Raised when the Bot API answers with ok=false"""
+    
+    def __init__(self, method: str, description: str, error_code: Optional[int] = None,
+                 retry_after: Optional[int] = None):
+        super().__init__(f"{method} failed ({error_code}): {description}")
+        self.method = method
+        self.description = description
+        self.error_code = error_code
+        self.retry_after = retry_after
+
+class TelegramBotAPI:
+    """Pooled, keep-alive client for the Telegram Bot API"""
+    
+    def __init__(self, token: str, base_url: str = DEFAULT_API_BASE_URL,
+                 connect_timeout: float = 5, read_timeout: float = 60,
+                 max_retries: int = 3, pool_size: int = 16,
+                 file_path_ttl: float = DEFAULT_FILE_PATH_TTL):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.file_path_ttl = file_path_ttl
+        self.pool_size = pool_size
+        self._files = {}
+        self._files_lock = threading.Lock()
+        self._session = None
+        self._pid = None
+    
+    @property
+    def session(self) -> requests.Session:
+        """The pooled session, rebuilt in a forked child so it never shares the parent's sockets"""
+        if self._session is None or self._pid != os.getpid():
+            self._session = self._new_session()
+            self._pid = os.getpid()
+        return self._session
+    
+    def _new_session(self) -> requests.Session:
+        # Connection errors and gateway failures are retried by urllib3; read
+        # errors are not, since the request may already have been processed
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=self.max_retries,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=None,
+            backoff_factor=0.5,
+            raise_on_status=False,
+            respect_retry_after_header=False
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def method_url(self, method: str) -> str:
+        """URL of a Bot API method"""
+        return f"{self.base_url}/bot{self.token}/{method}"
+    
+    def file_url(self, file_path: str) -> str:
+        """Download URL for a file_path returned by getFile"""
+        return f"{self.base_url}/file/bot{self.token}/{file_path}"
+    
+    def request(self, method: str, url: str, retry_rate_limit: bool = True, **kwargs) -> requests.Response:
+        """Send an HTTP request over the pooled session, honoring 429 retry_after.
+        
+        The signature matches telebot's apihelper.CUSTOM_REQUEST_SENDER so the
+        telebot entry points can share the same connection pool. With
+        retry_rate_limit=False a 429 is returned at once, for callers that pace
+        their own retries (OutboundScheduler); uploads are rewound either way.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        # Where each upload starts, so a retry resends the whole file
+        streams = [(stream, stream.tell()) for stream in _file_objects(kwargs.get('files'))]
+        
+        for attempt in range(self.max_retries + 1):
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429:
+                return response
+            
+            # Uploaded file objects were consumed by this attempt
+            for stream, position in streams:
+                stream.seek(position)
+            if not retry_rate_limit or attempt == self.max_retries:
+                return response
+            
+            retry_after = self.retry_after(response)
+            logger.warning(f"Telegram rate limit hit, retrying in {retry_after}s")
+            time.sleep(retry_after)
+        
+        return response
+    
+    def call(self, method: str, data: Optional[dict] = None, files: Optional[dict] = None,
+             timeout=None, retry_rate_limit: bool = True):
+        """Call a Bot API method and return its result, raising TelegramAPIError on failure"""
+        response = self.request(
+            'POST',
+            self.method_url(method),
+            retry_rate_limit=retry_rate_limit,
+            data=data,
+            files=files,
+            timeout=timeout or self.timeout
+        )
+        
+        try:
+            payload = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise TelegramAPIError(method, f"Invalid JSON response (HTTP {response.status_code})")
+        
+        if not payload.get('ok'):
+            raise TelegramAPIError(
+                method,
+                payload.get('description', 'Unknown error'),
+                error_code=payload.get('error_code'),
+                retry_after=payload.get('parameters', {}).get('retry_after')
+            )
+        
+        return payload.get('result')
+    
+    def get_file(self, file_id: str) -> dict:
+        """getFile, reusing the returned file_path while its download link is still valid"""
+        now = time.monotonic()
+        with self._files_lock:
+            cached = self._files.get(file_id)
+            if cached and cached[0] > now:
+                return cached[1]
+        
+        file_info = self.call('getFile', data={'file_id': file_id})
+        
+        with self._files_lock:
+            # Prune lapsed links so the map only holds the last hour's files
+            for stale_id in [fid for fid, (expires, _) in self._files.items() if expires <= now]:
+                del self._files[stale_id]
+            self._files[file_id] = (now + self.file_path_ttl, file_info)
+        return file_info
+    
+    def forget_file(self, file_id: str):
+        """Drop a cached file_path, e.g. after its download link stopped working"""
+        with self._files_lock:
+            self._files.pop(file_id, None)
+    
+    @staticmethod
+    def retry_after(response: requests.Response) -> int:
+        """Seconds a 429 response asks the client to wait, capped at MAX_RETRY_AFTER_SECONDS"""
+        try:
+            retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+        except ValueError:
+            retry_after = response.headers.get('Retry-After', 1)
+        return min(int(retry_after), MAX_RETRY_AFTER_SECONDS)
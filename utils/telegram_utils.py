@@ -1,25 +1,121 @@
 import requests
 import os
+import time
+import logging
 from typing import Tuple, Optional
 
-def download_telegram_file(bot, file_id: str, save_path: str) -> bool:
-    """Download a file from Telegram and save it locally"""
-    try:
-        file_info = bot.get_file(file_id)
-        file_url = f"https://api.telegram.org/file/bot{bot.token}/{file_info.file_path}"
-        
-        response = requests.get(file_url)
-        response.raise_for_status()
+logger = logging.getLogger(__name__)
+
+# Streaming download settings
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_MAX_ATTEMPTS = 3
+DOWNLOAD_TIMEOUT = 60
+
+def _response_total(response, offset: int) -> Optional[int]:
+    """Full file size announced by a response that starts at offset, if any"""
+    length = response.headers.get('Content-Length')
+    return offset + int(length) if length and length.isdigit() else None
+
+def stream_download(url: str, save_path: str, expected_size: Optional[int] = None,
+                    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+                    max_attempts: int = DOWNLOAD_MAX_ATTEMPTS, session=None,
+                    progress=None) -> bool:
+    """Stream url to save_path in fixed-size chunks, resuming with HTTP Range on failure.
+    
+    Data is written to a .part file that is renamed into place only after the
+    byte count matches expected_size (when known), so memory use stays at one
+    chunk regardless of file size. progress(done, total) is called after each chunk.
+    """
+    http = session or requests
+    part_path = f"{save_path}.part"
+    save_dir = os.path.dirname(save_path)
+    if save_dir:
+        os.makedirs(save_dir, exist_ok=True)
+    
+    for attempt in range(1, max_attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
         
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        try:
+            with http.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                if response.status_code == 416 and offset and offset == (expected_size or offset):
+                    break  # Already have every byte from a previous attempt
+                response.raise_for_status()
+                
+                # A 200 means the server ignored the Range header; start over
+                mode = 'ab' if offset and response.status_code == 206 else 'wb'
+                done = offset if mode == 'ab' else 0
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            done += len(chunk)
+                            if progress:
+                                progress(done, expected_size)
+                
+                # A connection closed cleanly mid-body ends iteration without an
+                # error; resume it like any other interruption
+                total = expected_size or _response_total(response, offset if mode == 'ab' else 0)
+                if total and done < total:
+                    raise IOError(f"Connection closed after {done} of {total} bytes")
+            break
+        except (requests.RequestException, IOError) as e:
+            logger.warning(f"Download attempt {attempt}/{max_attempts} failed: {e}")
+            if attempt == max_attempts:
+                return False
+            time.sleep(min(2 ** attempt, 10))
+    
+    downloaded = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if expected_size and downloaded != expected_size:
+        logger.error(f"Download size mismatch: got {downloaded} bytes, expected {expected_size}")
+        os.remove(part_path)
+        return False
+    
+    os.replace(part_path, save_path)
+    return True
+
+def telegram_file_url(token: str, file_path: str) -> str:
+    """Download URL for a getFile path, honouring a base URL set with configure_telebot"""
+    from telebot import apihelper
+    
+    if apihelper.FILE_URL:
+        return apihelper.FILE_URL.format(token, file_path)
+    return f"https://api.telegram.org/file/bot{token}/{file_path}"
+
+def download_telegram_file(bot, file_id: str, save_path: str, expected_size: Optional[int] = None,
+                           session=None, progress=None, api=None) -> bool:
+    """Download a file from Telegram and save it locally.
+    
+    When api (a TelegramBotAPI) is given, getFile goes through its cached
+    file_path lookup and the download through its connection pool.
+    """
+    try:
+        if api is not None:
+            file_info = api.get_file(file_id)
+            downloaded = stream_download(
+                api.file_url(file_info['file_path']),
+                save_path,
+                expected_size=expected_size or file_info.get('file_size'),
+                session=session or api.session,
+                progress=progress
+            )
+            if not downloaded:
+                # The cached link may have lapsed early; resolve it afresh next time
+                api.forget_file(file_id)
+            return downloaded
         
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
+        file_info = bot.get_file(file_id)
+        file_url = telegram_file_url(bot.token, file_info.file_path)
         
-        return True
+        return stream_download(
+            file_url,
+            save_path,
+            expected_size=expected_size or file_info.file_size,
+            session=session,
+            progress=progress
+        )
     except Exception as e:
-        print(f"Error downloading file: {e}")
+        logger.error(f"Error downloading file: {e}")
         return False
 
 def get_file_info(message) -> Tuple[Optional[str], Optional[str], Optional[str]]:
@@ -44,6 +140,16 @@ def get_file_info(message) -> Tuple[Optional[str], Optional[str], Optional[str]]
     
     return file_id, file_name, file_size
 
+def get_file_unique_id(message) -> Optional[str]:
+    """Extract the file_unique_id, which is identical for identical file contents"""
+    if message.content_type == 'document':
+        return message.document.file_unique_id
+    elif message.content_type == 'photo':
+        return message.photo[-1].file_unique_id
+    elif message.content_type == 'video':
+        return message.video.file_unique_id
+    return None
+
 def validate_file_size(file_size: int, max_size_mb: int = 50) -> bool:
     """Check if file size is within limits"""
     if file_size is None:
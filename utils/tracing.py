@@ -0,0 +1,95 @@
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Span records go to their own logger so they can be routed or silenced separately
+span_logger = logging.getLogger('tracing')
+
+_trace_id: ContextVar[Optional[str]] = ContextVar('trace_id', default=None)
+_span_id: ContextVar[Optional[str]] = ContextVar('span_id', default=None)
+
+def current_trace_id() -> Optional[str]:
+    """Correlation id of the trace running in this context, if any"""
+    return _trace_id.get()
+
+@contextmanager
+def trace(trace_id: Optional[str] = None):
+    """Run the with-block under a correlation id (a new one unless given).
+    
+    Context variables do not follow work handed to other threads, so a job
+    running on a worker opens its own trace, keyed by its journal id.
+    """
+    trace_token = _trace_id.set(str(trace_id) if trace_id else uuid.uuid4().hex[:16])
+    span_token = _span_id.set(None)
+    try:
+        yield _trace_id.get()
+    finally:
+        _span_id.reset(span_token)
+        _trace_id.reset(trace_token)
+
+class Span:
+    """One timed stage of a job; attributes set on it are logged with the span"""
+    
+    __slots__ = ('name', 'span_id', 'parent_id', 'attributes', 'status', 'error')
+    
+    def __init__(self, name: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = 'ok'
+        self.error = None
+    
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+    
+    def fail(self, error):
+        """Mark the span failed without raising, for errors the caller recovers from"""
+        self.status = 'error'
+        self.error = str(error)[:200]
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the with-block and log it as one JSON record on the 'tracing' logger.
+    
+    Spans opened inside the block are logged as its children. An exception
+    leaving the block marks the span failed and is re-raised.
+    """
+    if _trace_id.get() is None:
+        # A span outside any trace starts its own
+        with trace():
+            with span(name, **attributes) as root:
+                yield root
+        return
+    
+    current = Span(name, _span_id.get(), attributes)
+    token = _span_id.set(current.span_id)
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(e)
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        _span_id.reset(token)
+        if span_logger.isEnabledFor(logging.INFO):
+            record = {
+                'event': 'span',
+                'trace_id': _trace_id.get(),
+                'span_id': current.span_id,
+                'parent_id': current.parent_id,
+                'name': current.name,
+                'start': round(started_at, 3),
+                'duration_ms': round(duration_ms, 2),
+                'status': current.status
+            }
+            if current.error:
+                record['error'] = current.error
+            record.update(current.attributes)
+            span_logger.info(json.dumps(record, default=str))
@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import OrderedDict
+
+class UpdateDeduplicator:
+    """Bounded, TTL-evicted index of recently seen Telegram update keys"""
+    
+    def __init__(self, ttl_seconds: int = 3600, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self.duplicates = 0
+    
+    def is_duplicate(self, key) -> bool:
+        """Record key and return True if it was already seen within the TTL"""
+        if key is None:
+            return False
+        
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            
+            if key in self._seen:
+                self.duplicates += 1
+                return True
+            
+            # Entries are inserted in expiry order, so eviction only ever
+            # has to look at the oldest end of the OrderedDict
+            self._seen[key] = now + self.ttl_seconds
+            if len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return False
+    
+    def forget(self, key):
+        """Drop key so its next delivery is processed again"""
+        with self._lock:
+            self._seen.pop(key, None)
+    
+    def _evict(self, now: float):
+        while self._seen:
+            oldest_key, expires_at = next(iter(self._seen.items()))
+            if expires_at > now:
+                break
+            del self._seen[oldest_key]
+    
+    def __len__(self):
+        return len(self._seen)